@@ -4,16 +4,45 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import numpy as np
-from data_generator import generate_sales_data
-from utils import format_currency, format_number
+import config
+from chunked_store import build_chunked_store
+from data_store import StoreRefresher
+from dimensions import COHORTS, load_model_dimension
+from forecast import cached_forecast
+from panels import PanelScheduler
+from parquet_store import build_parquet_store
+from price_bands import cached_price_band_grid
+from retail_calendar import FISCAL_PRESETS, retail_calendar
+from sampling import progressive_views
+from snapshot import DEFAULT_PRICE_RANGE, DEFAULT_TIME_PERIOD, SnapshotOptions, build_default_view
+from series_analytics import LOOKBACK_DAYS, OVERLAYS, compute_overlays, summarize_window
+from sketches import distinct_counts
+from sqlite_store import build_sqlite_store
+from utils import TIME_PERIODS, format_currency_array, format_number
 from components import (
+    build_price_band_heatmap,
+    build_price_distribution_figure,
+    build_regional_sales_figure,
+    build_table_page,
+    build_time_series_figure,
+    build_top_performers_figure,
+    display_approximate_badge,
+    display_data_freshness,
+    display_distinct_counts,
+    display_export_controls,
     display_kpi_metrics,
+    display_linked_selection,
+    display_model_cohorts,
+    display_performance_panel,
     display_filters,
     display_regional_sales,
     display_time_series_chart,
     display_top_performers,
+    display_price_band_heatmap,
     display_price_distribution,
-    display_sales_trends
+    display_sales_trends,
+    display_scenario_simulator,
+    prepare_model_cohorts
 )
 
 # Page configuration
@@ -134,17 +163,38 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# Generate sample data
-if 'sales_data' not in st.session_state:
-    st.session_state.sales_data = generate_sales_data()
+@st.cache_resource
+def get_store_refresher():
+    """Start the process-wide background loader shared by every session"""
+    # Every version is built together with the precomputed default view
+    if config.SALES_BACKEND == 'sqlite':
+        return StoreRefresher(builder=build_sqlite_store, snapshot_builder=build_default_view).start()
+    if config.SALES_BACKEND == 'parquet':
+        # The dataset is read per date window, so there is no frame to load up front
+        return StoreRefresher(loader=lambda: None, builder=build_parquet_store, snapshot_builder=build_default_view).start()
+    if config.SALES_BACKEND == 'chunked':
+        # Out of core: every query streams the partitions, so nothing is loaded up front either
+        return StoreRefresher(loader=lambda: None, builder=build_chunked_store, snapshot_builder=build_default_view).start()
+    return StoreRefresher(snapshot_builder=build_default_view).start()
+
+@st.cache_resource
+def get_model_dimension():
+    """Load the model attribute table shared by every session"""
+    return load_model_dimension()
+
+# Take one reference to the live store for the whole rerun; a background swap
+# only becomes visible on the next rerun
+store_refresher = get_store_refresher()
+sales_store = store_refresher.current()
+display_data_freshness(store_refresher.status())
 
 # Initialize session state for filters
 if 'time_period' not in st.session_state:
-    st.session_state.time_period = '30D'
+    st.session_state.time_period = DEFAULT_TIME_PERIOD
 if 'selected_categories' not in st.session_state:
     st.session_state.selected_categories = []
 if 'price_range' not in st.session_state:
-    st.session_state.price_range = [0, 300]
+    st.session_state.price_range = list(DEFAULT_PRICE_RANGE)
 if 'selected_regions' not in st.session_state:
     st.session_state.selected_regions = []
 if 'custom_start_date' not in st.session_state:
@@ -161,20 +211,11 @@ with main_container:
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        time_periods = {
-            '7D': '7 Days',
-            '30D': '30 Days',
-            '90D': '90 Days',
-            '6M': '6 Months',
-            '1Y': '1 Year',
-            'ALL': 'All Time',
-            'CUSTOM': 'Custom Range'
-        }
         selected_period = st.selectbox(
             "Time Period", 
-            options=list(time_periods.keys()),
-            format_func=lambda x: time_periods[x],
-            index=list(time_periods.keys()).index(st.session_state.time_period)
+            options=list(TIME_PERIODS.keys()),
+            format_func=lambda x: TIME_PERIODS[x],
+            index=list(TIME_PERIODS.keys()).index(st.session_state.time_period)
         )
         
         # Show date pickers if custom range is selected
@@ -210,49 +251,216 @@ with main_container:
             st.session_state.time_period = selected_period
             st.rerun()
     
-    # Apply filters to the data
-    filtered_data = display_filters(st.session_state.sales_data, col2, col3, col4)
+    # Apply filters to the data; the default view's widget options come from its snapshot
+    default_view = sales_store.default_view
+    filter_options = SnapshotOptions(sales_store, default_view) if default_view is not None else sales_store
+    filter_spec = display_filters(filter_options, col2, col3, col4)
     st.markdown('</div>', unsafe_allow_html=True)
     
-    # Calculate metrics for display
-    total_sales = filtered_data['total_price'].sum()
-    avg_price = filtered_data['price'].mean()
-    total_units = filtered_data['quantity'].sum()
-    top_model = filtered_data.groupby('model')['total_price'].sum().sort_values(ascending=False).index[0]
+    # The precomputed default view answers the landing page without any queries
+    snapshot = default_view if default_view is not None and filter_spec == default_view['spec'] else None
+    figures = snapshot['figures'] if snapshot is not None else {}
+    
+    # One daily rollup of the selection, reaching back far enough that the trend
+    # overlays are complete on the first visible day; overlays reuse it rather
+    # than scanning rows again
+    window_start = pd.Timestamp(filter_spec.start_date)
+    history_spec = filter_spec._replace(start_date=window_start - pd.Timedelta(days=LOOKBACK_DAYS))
+    
+    # KPIs, daily history and drill-down aggregates; huge selections are first
+    # estimated from the stratified sample while the exact values are computed
+    # in the background
+    if snapshot is not None:
+        views, pending_exact = snapshot['views'], None
+    else:
+        views, pending_exact = progressive_views(sales_store, filter_spec, history_spec)
+    kpis = views['kpis']
+    total_sales = kpis['total_sales']
+    avg_price = kpis['avg_price']
+    total_units = kpis['total_units']
+    top_model = kpis['top_model']
+    
+    daily_history = views['daily_history']
+    daily_sales = daily_history[daily_history['date'] >= window_start.floor('D')]
+    
+    # A box-selected zoom window re-requests only that range so it can be shown at full resolution
+    zoom_range = st.session_state.get('sales_trend_zoom')
+    if zoom_range is not None:
+        zoom_start = max(zoom_range[0], window_start)
+        zoom_end = min(zoom_range[1], pd.Timestamp(filter_spec.end_date))
+        if zoom_start < zoom_end:
+            zoom_range = (zoom_start, zoom_end)
+        else:
+            zoom_range = st.session_state.sales_trend_zoom = None
+    
+    # The panels below are independent given the selection: build their queries and
+    # figures concurrently now and show them in layout order as they are reached.
+    # Widget values are read here from session state, since builders cannot touch Streamlit
+    panels = PanelScheduler()
+    
+    # Rows for the detailed table (bounded so a huge selection is never fetched whole);
+    # the snapshot already holds the row count and the formatted first page
+    if snapshot is None:
+        panels.submit('rows', sales_store.rows, filter_spec, limit=config.TABLE_ROW_LIMIT)
+    
+    overlay_names = [name for name in st.session_state.get('trend_overlays', []) if name in OVERLAYS]
+    time_period = st.session_state.time_period
+    custom_range = (st.session_state.custom_start_date, st.session_state.custom_end_date)
+    show_forecast = st.session_state.get('show_forecast', False)
+    
+    def build_trend_panel():
+        overlays = compute_overlays(daily_history, filter_spec.start_date, filter_spec.end_date, overlay_names)
+        # Forecasts of every model x region series, fitted together and cached per store version
+        forecast = cached_forecast(sales_store, filter_spec) if show_forecast else None
+        if zoom_range is None and not overlays and forecast is None and 'time_series' in figures:
+            return figures['time_series'], forecast
+        detail = daily_sales
+        if zoom_range is not None:
+            detail = sales_store.daily_totals(filter_spec._replace(start_date=zoom_range[0], end_date=zoom_range[1]))
+        forecast_total = forecast['total'] if forecast is not None else None
+        return build_time_series_figure(time_period, total_sales, detail, zoom_range, overlays, custom_range, forecast_total), forecast
+    
+    panels.submit('time_series', build_trend_panel)
+    # Both figures show fixed reference values and read no rows, so they need not wait for the row fetch
+    if 'regional' not in figures:
+        panels.submit('regional', build_regional_sales_figure, None)
+    if 'top_performers' not in figures:
+        panels.submit('top_performers', build_top_performers_figure, None)
+    
+    drill_path = tuple(st.session_state.get('drill_path', ()))
+    
+    def build_price_panel():
+        level_data = views['tree'].level(drill_path)
+        return build_price_distribution_figure(level_data, drill_path) if not level_data.empty else None
+    
+    if drill_path or figures.get('price_distribution') is None:
+        panels.submit('price_distribution', build_price_panel)
+    cohort = st.session_state.get('model_cohort', next(iter(COHORTS)))
+    panels.submit('model_cohorts', prepare_model_cohorts, views['tree'], get_model_dimension(), cohort)
+    
+    # The price band grid ignores the price filter, so slider moves only re-slice it
+    band_metric = st.session_state.get('price_band_metric', 'Units')
+    
+    def build_price_band_panel():
+        grid = cached_price_band_grid(sales_store, filter_spec)
+        if grid is None:
+            return None, None
+        bands = grid.bands(filter_spec.price_range)
+        return bands, build_price_band_heatmap(bands, band_metric) if not bands.empty else None
+    
+    panels.submit('price_bands', build_price_band_panel)
 
     # KPI metrics row
     st.markdown('<div class="section-header">Key Performance Indicators</div>', unsafe_allow_html=True)
-    display_kpi_metrics(total_sales, avg_price, total_units, top_model)
+    if pending_exact is not None:
+        display_approximate_badge(kpis, pending_exact)
+    display_kpi_metrics(total_sales, avg_price, total_units, top_model, kpis.get('margins'))
+    
+    # Distinct counts merged from the store's per-cell HyperLogLog sketches
+    display_distinct_counts(distinct_counts(sales_store, filter_spec))
     
     # Charts row
     st.markdown('<div class="section-header">Sales Performance</div>', unsafe_allow_html=True)
     
+    overlay_col, forecast_col = st.columns([4, 1])
+    with overlay_col:
+        st.multiselect("Trend overlays", options=list(OVERLAYS), key='trend_overlays')
+    with forecast_col:
+        st.checkbox(f"Show {config.FORECAST_HORIZON_DAYS}-day forecast", key='show_forecast')
+    
     # Display the new time series chart that adapts to the time period filter
-    display_time_series_chart(filtered_data)
+    trend_figure, forecast = panels.result('time_series')
+    display_time_series_chart(total_sales, zoom_range=zoom_range, figure=trend_figure)
+    if show_forecast:
+        if forecast is None:
+            st.caption("No forecast: it needs the in-memory backend and sales in the selection.")
+        else:
+            st.caption(
+                f"Forecast: {format_currency_array([forecast['total']['forecast'].sum()])[0]} over the next "
+                f"{len(forecast['total'])} days, from {format_number(forecast['series_count'])} model × region series "
+                f"fitted together in {forecast['seconds'] * 1000:,.0f} ms"
+            )
+    
+    if snapshot is not None:
+        window_summary = snapshot['window_summary']
+    else:
+        window_summary = summarize_window(daily_history, filter_spec.start_date, filter_spec.end_date)
+    yoy_text = f"{(window_summary['yoy_ratio'] - 1) * 100:+.1f}%" if np.isfinite(window_summary['yoy_ratio']) else "n/a"
+    st.caption(
+        f"Cumulative sales in period: {format_currency_array([window_summary['cumulative']])[0]} · "
+        f"28-day average vs. same weeks last year: {yoy_text}"
+    )
+    if time_period in FISCAL_PRESETS:
+        # Like-for-like: the same fiscal weeks and weekdays of last year, gathered from the calendar table
+        comparison = retail_calendar().like_for_like(daily_history, filter_spec.start_date, filter_spec.end_date)
+        change = f"{(comparison['ratio'] - 1) * 100:+.1f}%" if np.isfinite(comparison['ratio']) else "n/a"
+        st.caption(
+            f"Like-for-like vs. the comparable fiscal days last year: {change} "
+            f"(last year: {format_currency_array([comparison['prior']])[0]} over {format_number(comparison['days'])} day{'s' if comparison['days'] != 1 else ''})"
+        )
+        if comparison['uncovered_days']:
+            st.caption(
+                f"{format_number(comparison['uncovered_days'])} day(s) of the window fall outside the retail calendar "
+                f"({retail_calendar().span()}) and are not compared."
+            )
     
     # Display the regional sales chart
-    display_regional_sales(filtered_data)
+    filtered_data = panels.result('rows')
+    display_regional_sales(filtered_data, panels.result('regional', figures.get('regional')))
     
     # Product performance row
     st.markdown('<div class="section-header">Product Performance</div>', unsafe_allow_html=True)
     col1, col2 = st.columns(2)
     
     with col1:
-        display_top_performers(filtered_data)
+        display_top_performers(filtered_data, panels.result('top_performers', figures.get('top_performers')))
     
     with col2:
-        display_price_distribution(filtered_data)
+        display_price_distribution(
+            views['tree'], panels.result('price_distribution', figures.get('price_distribution')), drill_path
+        )
+    
+    # Model cohorts, joined from the model dimension table by code
+    display_model_cohorts(views['tree'], get_model_dimension(), panels.result('model_cohorts'))
+    
+    # Where volume sits within each category's price range
+    display_price_band_heatmap(*panels.result('price_bands'))
+    
+    # What-if pricing, side by side with the selection
+    st.markdown('<div class="section-header">What-if Pricing</div>', unsafe_allow_html=True)
+    display_scenario_simulator(sales_store, filter_spec, views['tree'], daily_sales)
+    
+    # Panels that filter each other when clicked
+    st.markdown('<div class="section-header">Linked Selection</div>', unsafe_allow_html=True)
+    display_linked_selection(sales_store, filter_spec)
     
     # Detailed data table
     st.markdown('<div class="section-header">Detailed Sales Data</div>', unsafe_allow_html=True)
     
-    detailed_data = filtered_data.copy()
-    detailed_data['date'] = detailed_data['date'].dt.date
-    detailed_data['price'] = detailed_data['price'].apply(format_currency)
-    detailed_data['total_price'] = detailed_data['total_price'].apply(format_currency)
+    # Only the rows on the current page are copied and formatted
+    page_size = config.TABLE_PAGE_SIZE
+    table_rows = len(filtered_data) if filtered_data is not None else snapshot['table_rows']
+    page_count = max(1, -(-table_rows // page_size))
+    if page_count > 1:
+        page = st.number_input(
+            f"Page (of {page_count}, {format_number(table_rows)} rows)",
+            min_value=1,
+            max_value=page_count,
+            value=min(st.session_state.get('table_page', 1), page_count),
+            step=1
+        )
+        st.session_state.table_page = page
+    else:
+        page = 1
+    if snapshot is not None and page == 1:
+        detailed_data = snapshot['table_page']
+    else:
+        if filtered_data is None:
+            filtered_data = sales_store.rows(filter_spec, limit=config.TABLE_ROW_LIMIT)
+        detailed_data = build_table_page(filtered_data.iloc[(page - 1) * page_size:page * page_size])
     
     st.dataframe(
-        detailed_data[['date', 'model', 'category', 'region', 'quantity', 'price', 'total_price']],
+        detailed_data,
         use_container_width=True,
         column_config={
             "date": "Date",
@@ -264,6 +472,11 @@ with main_container:
             "total_price": "Total Sales"
         }
     )
+    
+    display_export_controls(sales_store, filter_spec)
+    
+    # Performance details of the live store
+    display_performance_panel(sales_store, panels.timings())
 
 # Footer
 st.markdown("""
@@ -0,0 +1,302 @@
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import config
+from data_store import TABLE_COLUMNS, FilterSpec
+from drilldown import HIERARCHY, AggregationTree, spec_key
+from parquet_store import list_partitions, partitions_fingerprint, prune_partitions, write_partitioned
+
+# A pandas chunk takes several times its Parquet in-memory size (object strings,
+# the filter masks and the per-chunk group-by), so only this share of the
+# memory ceiling is given to the rows of one chunk
+CHUNK_MEMORY_SHARE = 0.25
+CHUNK_MEMORY_OVERHEAD = 4
+
+# Bounds on the rows per chunk, whatever the ceiling and row width
+MIN_CHUNK_ROWS = 1024
+MAX_CHUNK_ROWS = 2_000_000
+
+# Partial aggregates kept for recently scanned filters
+SCAN_CACHE_SIZE = 16
+
+# Per-cell measures and how two partial aggregates of them combine
+CELL_MERGE = {
+    'total_sales': 'sum',
+    'units': 'sum',
+    'price_sum': 'sum',
+    'rows': 'sum',
+    'price_min': 'min',
+    'price_max': 'max'
+}
+
+
+class PartialAggregate:
+    """Mergeable aggregates of the filtered rows seen so far.
+
+    Cells hold sums, counts and price min/max per category x model x
+    region, and days the sales per calendar day. Means are derived from
+    sums and counts, and top-K rankings from the per-cell totals, so two
+    partials over disjoint chunks merge into the partial of their union.
+    The state is bounded by the number of cells and days, never by rows.
+    """
+
+    def __init__(self):
+        self.cells = pd.DataFrame(
+            {name: pd.Series(dtype=float) for name in CELL_MERGE},
+            index=pd.MultiIndex.from_arrays([[], [], []], names=HIERARCHY)
+        )
+        self.days = pd.Series(dtype=float)
+
+    @classmethod
+    def of_chunk(cls, chunk):
+        """Partial aggregate of one chunk of already filtered rows"""
+        partial = cls()
+        if chunk.empty:
+            return partial
+        price = chunk['price'].astype(np.float64)
+        measures = pd.DataFrame({
+            'total_sales': chunk['total_price'].astype(np.float64),
+            'units': chunk['quantity'].astype(np.float64),
+            'price_sum': price,
+            'rows': 1.0,
+            'price_min': price,
+            'price_max': price
+        })
+        keys = [chunk[dim].astype(str) for dim in HIERARCHY]
+        partial.cells = measures.groupby(keys, sort=False).agg(CELL_MERGE)
+        partial.cells.index.names = HIERARCHY
+        partial.days = measures['total_sales'].groupby(chunk['date'].dt.floor('D').to_numpy()).sum()
+        return partial
+
+    def merge(self, other):
+        """Fold another partial into this one"""
+        if other.cells.empty:
+            return self
+        if self.cells.empty:
+            self.cells, self.days = other.cells, other.days
+            return self
+        self.cells = pd.concat([self.cells, other.cells]).groupby(level=HIERARCHY, sort=False).agg(CELL_MERGE)
+        self.days = self.days.add(other.days, fill_value=0.0)
+        return self
+
+    def present(self, dim):
+        """Sorted values of dim among the aggregated rows"""
+        return sorted(self.cells.index.unique(level=dim))
+
+    def totals_by(self, dim):
+        """Sums of every measure per value of dim"""
+        return self.cells.groupby(level=dim).agg(CELL_MERGE)
+
+
+def chunk_rows_for(paths, memory_mb=None):
+    """Rows per chunk that keep one chunk within its share of the memory ceiling"""
+    memory_mb = config.OUT_OF_CORE_MEMORY_MB if memory_mb is None else memory_mb
+    row_bytes = 0.0
+    for path in paths[:1]:
+        # Uncompressed row width of the table columns, from the first footer
+        metadata = pq.ParquetFile(path).metadata
+        if metadata.num_rows:
+            row_bytes = sum(metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups)) / metadata.num_rows
+    row_bytes = max(row_bytes, 64.0) * CHUNK_MEMORY_OVERHEAD
+    rows = int(memory_mb * 1024 * 1024 * CHUNK_MEMORY_SHARE / row_bytes)
+    return min(MAX_CHUNK_ROWS, max(MIN_CHUNK_ROWS, rows))
+
+
+class ChunkedSalesStore:
+    """Out-of-core sales backend that streams a month-partitioned Parquet dataset.
+
+    Queries never hold more than one chunk of rows: the partitions that
+    overlap the date window are scanned in date order in chunks sized from
+    OUT_OF_CORE_MEMORY_MB, each chunk is filtered and reduced to a
+    PartialAggregate, and the partials are merged. KPIs, group totals, the
+    aggregation tree, daily totals and the filter widget options are all
+    answered from the merged partial of one scan per filter, so the
+    dashboard works over histories much larger than memory.
+    """
+
+    def __init__(self, root, version=1, source=None, memory_mb=None):
+        self.root = root
+        self.version = version
+        self.source = source or root
+        self.built_at = datetime.now()
+        self.memory_report = None
+        self.sample = None
+        self.default_view = None
+        self.sketches = None
+        self.partitions = list_partitions(root)
+        self._rows = sum(pq.ParquetFile(path).metadata.num_rows for _, path in self.partitions)
+        self.fingerprint = partitions_fingerprint(root, self.partitions) if self.partitions else None
+        self.chunk_rows = chunk_rows_for([path for _, path in self.partitions], memory_mb)
+        self._scans = OrderedDict()
+        self._lock = threading.Lock()
+        self.last_scan = {'partitions': 0, 'chunks': 0, 'rows': 0, 'peak_chunk_bytes': 0}
+
+    def __len__(self):
+        return self._rows
+
+    def _chunks(self, start_date, end_date, columns=None):
+        """Yield the rows of start_date..end_date as DataFrames of at most chunk_rows, in date order"""
+        columns = columns or TABLE_COLUMNS
+        paths = prune_partitions(self.partitions, start_date, end_date)
+        stats = {'partitions': len(paths), 'chunks': 0, 'rows': 0, 'peak_chunk_bytes': 0}
+        for path in paths:
+            dataset = ds.dataset(path, format='parquet')
+            date_type = dataset.schema.field('date').type
+            predicate = (
+                (ds.field('date') >= pa.scalar(pd.Timestamp(start_date), type=date_type))
+                & (ds.field('date') <= pa.scalar(pd.Timestamp(end_date), type=date_type))
+            )
+            # No read-ahead: only the batch being reduced is resident
+            batches = dataset.to_batches(
+                columns=columns, filter=predicate, batch_size=self.chunk_rows,
+                batch_readahead=0, fragment_readahead=0
+            )
+            for batch in batches:
+                if batch.num_rows == 0:
+                    continue
+                stats['chunks'] += 1
+                stats['rows'] += batch.num_rows
+                stats['peak_chunk_bytes'] = max(stats['peak_chunk_bytes'], batch.nbytes)
+                yield batch.to_pandas()
+        self.last_scan = stats
+
+    @staticmethod
+    def _filter(chunk, categories, price_range, regions):
+        """Rows of a chunk passing the category, price and region predicates"""
+        mask = np.ones(len(chunk), dtype=bool)
+        if categories:
+            mask &= chunk['category'].isin(categories).to_numpy()
+        if price_range is not None:
+            price = chunk['price'].to_numpy()
+            mask &= (price >= price_range[0]) & (price <= price_range[1])
+        if regions:
+            mask &= chunk['region'].isin(regions).to_numpy()
+        return chunk if mask.all() else chunk[mask]
+
+    def _scan(self, spec):
+        """Merged partial aggregate of the selection, from one streaming pass per filter"""
+        key = spec_key(spec)
+        with self._lock:
+            if key in self._scans:
+                self._scans.move_to_end(key)
+                return self._scans[key]
+        partial = PartialAggregate()
+        for chunk in self._chunks(spec.start_date, spec.end_date):
+            chunk = self._filter(chunk, spec.categories, spec.price_range, spec.regions)
+            partial.merge(PartialAggregate.of_chunk(chunk))
+        with self._lock:
+            self._scans[key] = partial
+            while len(self._scans) > SCAN_CACHE_SIZE:
+                self._scans.popitem(last=False)
+        return partial
+
+    # Query interface shared with the other sales backends
+
+    def category_options(self, start_date, end_date):
+        return self._scan(FilterSpec(start_date, end_date, [], None, [])).present('category')
+
+    def price_bounds(self, start_date, end_date, categories):
+        cells = self._scan(FilterSpec(start_date, end_date, list(categories), None, [])).cells
+        if cells.empty:
+            return None
+        return int(cells['price_min'].min()), int(cells['price_max'].max())
+
+    def region_options(self, start_date, end_date, categories, price_range):
+        return self._scan(FilterSpec(start_date, end_date, list(categories), list(price_range), [])).present('region')
+
+    def rows(self, spec, limit=None):
+        """Selected rows in date order; the scan stops once limit rows are found"""
+        parts, found = [], 0
+        for chunk in self._chunks(spec.start_date, spec.end_date):
+            chunk = self._filter(chunk, spec.categories, spec.price_range, spec.regions)
+            parts.append(chunk if limit is None else chunk.head(limit - found))
+            found += len(parts[-1])
+            if limit is not None and found >= limit:
+                break
+        if not parts:
+            return pd.DataFrame({c: pd.Series(dtype='datetime64[us]' if c == 'date' else object) for c in TABLE_COLUMNS})
+        return pd.concat(parts, ignore_index=True)
+
+    def iter_rows(self, spec, chunk_rows):
+        """Yield the selected table rows in date order, chunk_rows at a time"""
+        pending = []
+        pending_rows = 0
+        for chunk in self._chunks(spec.start_date, spec.end_date):
+            chunk = self._filter(chunk, spec.categories, spec.price_range, spec.regions)
+            pending.append(chunk)
+            pending_rows += len(chunk)
+            while pending_rows >= chunk_rows:
+                rows = pd.concat(pending, ignore_index=True)
+                yield rows.iloc[:chunk_rows]
+                pending, pending_rows = [rows.iloc[chunk_rows:]], len(rows) - chunk_rows
+        if pending_rows:
+            yield pd.concat(pending, ignore_index=True)
+
+    def kpis(self, spec):
+        cells = self._scan(spec).cells
+        rows = cells['rows'].sum()
+        if rows == 0:
+            return {'total_sales': 0.0, 'avg_price': 0.0, 'total_units': 0, 'top_model': 'N/A', 'rows': 0}
+        model_sales = cells['total_sales'].groupby(level='model').sum()
+        return {
+            'total_sales': float(cells['total_sales'].sum()),
+            'avg_price': float(cells['price_sum'].sum() / rows),
+            'total_units': int(round(cells['units'].sum())),
+            'top_model': str(model_sales.sort_values(ascending=False).index[0]),
+            'rows': int(rows)
+        }
+
+    def group_totals(self, spec, dim):
+        totals = self._scan(spec).totals_by(dim)
+        groups = pd.DataFrame({
+            dim: totals.index.astype(str),
+            'total_sales': totals['total_sales'].to_numpy(),
+            'avg_price': (totals['price_sum'] / totals['rows']).to_numpy(),
+            'units': np.round(totals['units'].to_numpy()).astype(np.int64)
+        })
+        return groups.sort_values('total_sales', ascending=False).reset_index(drop=True)
+
+    def aggregation_tree(self, spec):
+        cells = self._scan(spec).cells.reset_index()
+        return AggregationTree.from_groups(cells[HIERARCHY + ['total_sales', 'units', 'price_sum', 'rows']])
+
+    def daily_totals(self, spec):
+        days = self._scan(spec).days.sort_index()
+        return pd.DataFrame({
+            'date': pd.to_datetime(days.index).astype('datetime64[ns]'),
+            'total_price': days.to_numpy(dtype=np.float64)
+        })
+
+
+def build_chunked_store(frame=None, version=1, source=None, root=None):
+    """Open the Parquet dataset for out-of-core queries (StoreRefresher builder).
+
+    Like build_parquet_store the loaded frame is not used; each refresh
+    re-lists the partitions and re-derives the chunk size.
+    """
+    return ChunkedSalesStore(root or config.PARQUET_DIR, version=version, source=source)
+
+
+if __name__ == '__main__':
+    # python chunked_store.py [sales.csv] -- verify chunked results match the in-memory path
+    from data_store import SalesStore, load_sales_frame
+    from sqlite_store import compare_backends, parity_specs
+    sales = load_sales_frame(sys.argv[1] if len(sys.argv) > 1 else None)
+    with tempfile.TemporaryDirectory() as root:
+        write_partitioned(sales, root, row_group_size=64)
+        # A tiny ceiling forces many chunks, so the merge path is what gets checked
+        chunked = ChunkedSalesStore(root, memory_mb=0)
+        problems = compare_backends(SalesStore(sales), chunked, parity_specs(sales), rel_tol=1e-9)
+    for problem in problems:
+        print(problem)
+    print(f"{len(problems)} mismatches across {len(parity_specs(sales))} filter specs ({chunked.chunk_rows:,} rows per chunk)")
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,105 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+import config
+
+# Integer types tried from smallest to largest
+_INT_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def _smallest_int(values):
+    low, high = values.min(), values.max()
+    for int_type in _INT_TYPES:
+        info = np.iinfo(int_type)
+        if info.min <= low and high <= info.max:
+            return int_type
+    return np.int64
+
+
+def compact_frame(frame, float_rtol=None, max_category_ratio=0.5):
+    """Return a copy of frame with each column in the smallest safe dtype.
+
+    Integers shrink to the narrowest type holding their range, floats become
+    float32 when every value round-trips within float_rtol, and string
+    columns with few distinct values become categoricals.
+    """
+    float_rtol = config.COMPACT_FLOAT_RTOL if float_rtol is None else float_rtol
+    compact = {}
+    for column in frame.columns:
+        series = frame[column]
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+            compact[column] = series
+        elif pd.api.types.is_integer_dtype(series):
+            compact[column] = series.astype(_smallest_int(series.to_numpy())) if len(series) else series
+        elif pd.api.types.is_float_dtype(series):
+            values = series.to_numpy(dtype=np.float64)
+            narrowed = values.astype(np.float32)
+            with np.errstate(invalid='ignore', over='ignore'):
+                fits = np.allclose(narrowed.astype(np.float64), values, rtol=float_rtol, atol=0, equal_nan=True)
+            compact[column] = pd.Series(narrowed, index=series.index, name=column) if fits else series
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            compact[column] = series
+        elif len(series) and series.nunique() <= max_category_ratio * len(series):
+            compact[column] = series.astype('category')
+        else:
+            compact[column] = series
+    return pd.DataFrame(compact, index=frame.index)
+
+
+def memory_report(original, compact=None):
+    """Per-column dtype and deep memory use, before and (optionally) after compaction"""
+    report = pd.DataFrame({
+        'column': list(original.columns),
+        'dtype': [str(original[c].dtype) for c in original.columns],
+        'bytes': [int(original[c].memory_usage(deep=True, index=False)) for c in original.columns]
+    })
+    if compact is not None:
+        report['compact_dtype'] = [str(compact[c].dtype) for c in original.columns]
+        report['compact_bytes'] = [int(compact[c].memory_usage(deep=True, index=False)) for c in original.columns]
+        report['saved'] = 1 - report['compact_bytes'] / report['bytes'].where(report['bytes'] > 0)
+    return report
+
+
+def compare_aggregates(original, compact, rtol=1e-6):
+    """Compare dashboard aggregates computed on the original and compacted frames.
+
+    Returns one row per checked aggregate with both values, the relative
+    error and whether it is within rtol.
+    """
+    checks = []
+
+    def add(name, expected, actual):
+        expected, actual = float(expected), float(actual)
+        error = abs(actual - expected) / abs(expected) if expected else abs(actual)
+        checks.append({'aggregate': name, 'original': expected, 'compact': actual, 'rel_error': error, 'ok': error <= rtol})
+
+    for column in ('total_price', 'quantity', 'price'):
+        if column in original.columns:
+            # Sum in float64 on both sides; float32 storage must not mean float32 accumulation
+            add(f'sum({column})', original[column].to_numpy(dtype=np.float64).sum(), compact[column].to_numpy(dtype=np.float64).sum())
+    if 'price' in original.columns:
+        add('mean(price)', original['price'].to_numpy(dtype=np.float64).mean(), compact['price'].to_numpy(dtype=np.float64).mean())
+    for dim in ('category', 'region', 'model'):
+        if dim in original.columns and 'total_price' in original.columns:
+            expected = original.groupby(dim, observed=True)['total_price'].sum()
+            actual = compact['total_price'].astype(np.float64).groupby(compact[dim].astype(str), observed=True).sum()
+            for label, value in expected.items():
+                add(f'sum(total_price) | {dim}={label}', value, actual.get(str(label), 0.0))
+    return pd.DataFrame(checks)
+
+
+if __name__ == '__main__':
+    # python compaction.py [sales.csv] -- show the memory report and check aggregates
+    from data_store import load_sales_frame
+    sales = load_sales_frame(sys.argv[1] if len(sys.argv) > 1 else None)
+    compact = compact_frame(sales)
+    report = memory_report(sales, compact)
+    print(report.to_string(index=False))
+    before, after = report['bytes'].sum(), report['compact_bytes'].sum()
+    print(f"\nTotal: {before:,} -> {after:,} bytes ({1 - after / before:.1%} saved)")
+    checks = compare_aggregates(sales, compact)
+    print(f"{int(checks['ok'].sum())}/{len(checks)} aggregates within tolerance, "
+          f"max relative error {checks['rel_error'].max():.2e}")
+    sys.exit(0 if checks['ok'].all() else 1)
@@ -4,7 +4,28 @@ import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 import math
-from utils import format_currency, format_number, get_date_range
+import os
+from datetime import datetime
+import config
+from crossfilter import Crossfilter
+from data_store import FilterSpec, SalesStore
+from dimensions import COHORTS, cohort_totals
+from disk_cache import aggregate_cache
+from downsample import downsample_series
+from drilldown import HIERARCHY, spec_key
+from export import EXPORT_COMPRESSION, export_for_download
+from retail_calendar import FISCAL_PRESETS, retail_calendar
+from scenarios import (
+    DEFAULT_ELASTICITY,
+    Adjustment,
+    evaluate_scenarios,
+    price_sweep,
+    scenario_daily_totals,
+    scenario_tree
+)
+from series_analytics import OVERLAYS
+from sketches import DISTINCT_COUNT_LABELS
+from utils import format_currency, format_currency_array, format_number, format_number_array, get_date_range
 
 # PR color palette - colorblind friendly blue theme
 PR_PRIMARY = "#2C82E5"       # Main blue
@@ -14,7 +35,51 @@ PR_ACCENT = "#98C1D9"        # Light blue
 PR_GREY = "#85878A"          # Grey
 PR_LIGHT_GREY = "#E1EFFF"    # Light blue-grey
 
-def display_kpi_metrics(total_sales, avg_price, total_units, top_model):
+def display_data_freshness(status):
+    """Display a small badge with the live data version and when it was built"""
+    if status['built_at'] is not None:
+        age_minutes = int((datetime.now() - status['built_at']).total_seconds() // 60)
+        age_text = "just now" if age_minutes < 1 else f"{age_minutes} min ago"
+        built_text = f"{status['built_at'].strftime('%H:%M')} ({age_text})"
+    else:
+        built_text = "loading"
+    
+    # Flag a reload in progress or a failed reload that left the previous version live
+    if status['refreshing']:
+        state_text = " · refreshing…"
+    elif status['last_error']:
+        state_text = " · last reload failed, showing previous version"
+    else:
+        state_text = ""
+    
+    st.markdown(f"""
+    <div style="text-align: right; font-size: 12px; color: #3D5A80; margin-top: 5px;">
+        <span style="background-color: #E1EFFF; border-radius: 10px; padding: 3px 10px;">
+            Data v{status['version']} · {format_number(status['rows'])} rows · refreshed {built_text}{state_text}
+        </span>
+    </div>
+    """, unsafe_allow_html=True)
+
+def display_approximate_badge(estimate, pending):
+    """Flag KPIs estimated from the sample and rerun the page once the exact values are ready"""
+    st.markdown(f"""
+    <div style="font-size: 12px; color: #3D5A80; margin-bottom: 8px;">
+        <span style="background-color: #FFF4D6; border: 1px solid #F0C36D; border-radius: 10px; padding: 3px 10px;">
+            ≈ Approximate · estimated from {format_number(estimate['sample_rows'])} sampled rows,
+            within ±{estimate['relative_error'] * 100:.2f}% at 95% confidence · exact values loading…
+        </span>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Poll the background computation without rerunning the rest of the page
+    @st.fragment(run_every=0.5)
+    def poll_exact():
+        if pending.done():
+            st.rerun()
+    
+    poll_exact()
+
+def display_kpi_metrics(total_sales, avg_price, total_units, top_model, margins=None):
     """Display KPI metrics in a row of cards with enhanced styling"""
     # Custom CSS for enhanced metrics display
     st.markdown("""
@@ -125,6 +190,9 @@ def display_kpi_metrics(total_sales, avg_price, total_units, top_model):
         }
     }
     
+    # Custom ranges have no previous-period comparison
+    sales_delta = price_delta = units_delta = 0
+    
     # Get the values for the selected time period
     if time_period in kpi_values:
         vals = kpi_values[time_period]
@@ -146,6 +214,15 @@ def display_kpi_metrics(total_sales, avg_price, total_units, top_model):
     units_delta_class = "metric-delta-positive"
     units_delta_icon = "↑"
     
+    # Estimated values are marked with ≈ and their 95% confidence half-width
+    approx = "≈ " if margins else ""
+    if margins:
+        sales_margin = f'<div class="metric-subtitle">± {format_currency(margins["total_sales"])} (95% CI)</div>'
+        price_margin = f'<div class="metric-subtitle">± {format_currency(margins["avg_price"])} (95% CI)</div>'
+        units_margin = f'<div class="metric-subtitle">± {format_number(round(margins["total_units"]))} (95% CI)</div>'
+    else:
+        sales_margin = price_margin = units_margin = ""
+    
     # Create columns for metrics
     cols = st.columns(4)
     
@@ -154,7 +231,8 @@ def display_kpi_metrics(total_sales, avg_price, total_units, top_model):
         st.markdown(f"""
         <div class="metric-container">
             <div class="metric-title">TOTAL SALES</div>
-            <div class="metric-value">{format_currency(total_sales)}</div>
+            <div class="metric-value">{approx}{format_currency(total_sales)}</div>
+            {sales_margin}
             <div class="{sales_delta_class}">{sales_delta_icon} {format_currency(abs(sales_delta))}</div>
             <div class="metric-subtitle">vs. Previous Period</div>
         </div>
@@ -165,7 +243,8 @@ def display_kpi_metrics(total_sales, avg_price, total_units, top_model):
         st.markdown(f"""
         <div class="metric-container">
             <div class="metric-title">AVERAGE PRICE</div>
-            <div class="metric-value">{format_currency(avg_price)}</div>
+            <div class="metric-value">{approx}{format_currency(avg_price)}</div>
+            {price_margin}
             <div class="{price_delta_class}">{price_delta_icon} {format_currency(abs(price_delta))}</div>
             <div class="metric-subtitle">vs. Previous Period</div>
         </div>
@@ -176,7 +255,8 @@ def display_kpi_metrics(total_sales, avg_price, total_units, top_model):
         st.markdown(f"""
         <div class="metric-container">
             <div class="metric-title">UNITS SOLD</div>
-            <div class="metric-value">{format_number(total_units)}</div>
+            <div class="metric-value">{approx}{format_number(total_units)}</div>
+            {units_margin}
             <div class="{units_delta_class}">{units_delta_icon} {format_number(abs(units_delta))}</div>
             <div class="metric-subtitle">vs. Previous Period</div>
         </div>
@@ -187,14 +267,42 @@ def display_kpi_metrics(total_sales, avg_price, total_units, top_model):
         st.markdown(f"""
         <div class="metric-container">
             <div class="metric-title">TOP SELLING MODEL</div>
-            <div class="metric-value">{top_model}</div>
+            <div class="metric-value">{approx}{top_model}</div>
             <div class="metric-delta-neutral">Previously #2</div>
             <div class="metric-subtitle">Changed Rank</div>
         </div>
         """, unsafe_allow_html=True)
 
-def display_filters(sales_data, category_col, price_col, region_col):
-    """Display and process filter controls"""
+def display_distinct_counts(counts):
+    """Display distinct-count KPIs (column -> (estimate, 95% relative error)) in the KPI card style
+
+    The counts are merged from the store's per-cell HyperLogLog sketches, so
+    they cover whole days and ignore the price filter.
+    """
+    if not counts:
+        return
+    cols = st.columns(4)
+    for col, (column, (estimate, bound)) in zip(cols, counts.items()):
+        with col:
+            st.markdown(f"""
+            <div class="metric-container">
+                <div class="metric-title">{DISTINCT_COUNT_LABELS.get(column, 'Distinct ' + column.title()).upper()}</div>
+                <div class="metric-value">≈ {format_number(round(estimate))}</div>
+                <div class="metric-subtitle">± {bound * 100:.1f}% (95%) · whole days, any price</div>
+            </div>
+            """, unsafe_allow_html=True)
+
+def price_slider_range(bounds, preferred):
+    """Slider min, max and value: the preferred range when the price bounds cover it, else the bounds"""
+    min_price, max_price = bounds if bounds is not None else (0, 300)
+    if min_price == max_price:
+        max_price += 1
+    if min_price <= preferred[0] <= max_price and min_price <= preferred[1] <= max_price:
+        return min_price, max_price, preferred
+    return min_price, max_price, [min_price, max_price]
+
+def display_filters(sales_store, category_col, price_col, region_col):
+    """Display the filter controls and return the selected FilterSpec"""
     # Apply time period filter
     start_date, end_date = get_date_range(st.session_state.time_period)
     
@@ -203,58 +311,89 @@ def display_filters(sales_data, category_col, price_col, region_col):
         start_date = st.session_state.custom_start_date
         end_date = st.session_state.custom_end_date
     
-    filtered_data = sales_data[(sales_data['date'] >= start_date) & (sales_data['date'] <= end_date)]
-    
     # Category filter
     with category_col:
-        categories = sorted(filtered_data['category'].unique())
+        categories = sales_store.category_options(start_date, end_date)
         selected_categories = st.multiselect(
             "Product Category", 
             options=categories,
-            default=st.session_state.selected_categories
+            default=[c for c in st.session_state.selected_categories if c in categories]
         )
         st.session_state.selected_categories = selected_categories
     
-    # Apply category filter if selected
-    if selected_categories:
-        filtered_data = filtered_data[filtered_data['category'].isin(selected_categories)]
-    
-    # Price range filter
+    # Price range filter, bounded by the rows left after the date and category filters
     with price_col:
-        min_price = int(filtered_data['price'].min())
-        max_price = int(filtered_data['price'].max())
+        bounds = sales_store.price_bounds(start_date, end_date, selected_categories)
+        min_price, max_price, value = price_slider_range(bounds, st.session_state.price_range)
         price_range = st.slider(
             "Price Range ($)",
             min_value=min_price,
             max_value=max_price,
-            value=st.session_state.price_range if min_price <= st.session_state.price_range[0] <= max_price and min_price <= st.session_state.price_range[1] <= max_price else [min_price, max_price]
+            value=value
         )
         st.session_state.price_range = price_range
     
-    # Apply price filter
-    filtered_data = filtered_data[(filtered_data['price'] >= price_range[0]) & (filtered_data['price'] <= price_range[1])]
-    
     # Region filter
     with region_col:
-        regions = sorted(filtered_data['region'].unique())
+        regions = sales_store.region_options(start_date, end_date, selected_categories, price_range)
         selected_regions = st.multiselect(
             "Region", 
             options=regions,
-            default=st.session_state.selected_regions
+            default=[r for r in st.session_state.selected_regions if r in regions]
         )
         st.session_state.selected_regions = selected_regions
     
-    # Apply region filter if selected
-    if selected_regions:
-        filtered_data = filtered_data[filtered_data['region'].isin(selected_regions)]
-    
-    return filtered_data
+    return FilterSpec(start_date, end_date, selected_categories, list(price_range), selected_regions)
 
-def display_time_series_chart(filtered_data):
-    """Display a time series chart showing sales trend over time, directly linked to the total sales value"""
-    # Get the time period from session state
-    time_period = st.session_state.time_period
-    
+# Overlay line colors, cycled
+OVERLAY_COLORS = [PR_SECONDARY, PR_DARK_BLUE, PR_GREY, PR_PRIMARY]
+
+
+def add_overlay_traces(fig, overlays, daily_axis):
+    """Draw trend overlays (name -> frame of date and value) as dashed lines.
+
+    Averages share daily_axis with the daily sales. The running total and
+    the year-over-year change have their own hidden axes (yaxis3, yaxis4),
+    since their scales differ from daily sales; hovering shows their values.
+    """
+    axes = set()
+    for i, (name, series) in enumerate((overlays or {}).items()):
+        kind = OVERLAYS.get(name, ('rolling', None))[0]
+        series = downsample_series(series.dropna(), 'date', 'value', config.CHART_MAX_POINTS)
+        if kind == 'cumulative':
+            axis, hover = 'y3', f'{name}: $%{{y:,.0f}}<extra></extra>'
+        elif kind == 'yoy':
+            axis, hover = 'y4', f'{name}: %{{y:+.1%}}<extra></extra>'
+        else:
+            axis, hover = daily_axis, f'{name}: $%{{y:,.0f}}<extra></extra>'
+        axes.add(axis)
+        fig.add_trace(go.Scatter(
+            x=series['date'],
+            y=series['value'],
+            name=name,
+            yaxis=axis,
+            mode='lines',
+            line=dict(color=OVERLAY_COLORS[i % len(OVERLAY_COLORS)], width=2, dash='dash'),
+            hovertemplate=hover
+        ))
+    if 'y3' in axes:
+        fig.update_layout(yaxis3=dict(overlaying='y', visible=False, rangemode='tozero'))
+    if 'y4' in axes:
+        fig.update_layout(yaxis4=dict(overlaying='y', visible=False, tickformat='+.0%'))
+
+
+def build_time_series_figure(time_period, selected_total_sales, daily_sales=None, zoom_range=None, overlays=None,
+                             custom_range=None, forecast=None):
+    """Build the sales trend figure for a time period, directly linked to the total sales value
+    
+    daily_sales holds the real per-day totals of the selection (or of the zoom
+    window, when the user has box-selected one) and is drawn as a downsampled
+    detail line on a secondary axis, together with any trend overlays
+    (name -> frame of date and value) computed from the same daily series.
+    custom_range is the (start, end) of the date pickers for 'CUSTOM'.
+    forecast, a frame of date, forecast, lower and upper, extends the daily
+    line past the period as a dashed line inside a shaded 95% band.
+    """
     # Define values for each time period based on the KPI values
     kpi_values = {
         '7D': {
@@ -298,16 +437,28 @@ def display_time_series_chart(filtered_data):
             'freq': 'QS',
             'format': '%b %Y',
             'distribution': [0.1, 0.12, 0.14, 0.16, 0.18, 0.2, 0.22, 0.28]  # 8 quarters with increase
-        },
-        'CUSTOM': {
-            'total_sales': filtered_data['total_price'].sum(),  # Calculate from filtered data
-            'date_range': (st.session_state.custom_start_date.strftime('%Y-%m-%d'), 
-                          st.session_state.custom_end_date.strftime('%Y-%m-%d')),
+        }
+    }
+    if custom_range is not None:
+        kpi_values['CUSTOM'] = {
+            'total_sales': selected_total_sales,  # Total of the filtered selection
+            'date_range': (custom_range[0].strftime('%Y-%m-%d'), 
+                          custom_range[1].strftime('%Y-%m-%d')),
             'freq': None,  # Will determine based on date range
             'format': '%b %d, %Y',
             'distribution': None  # Will determine based on date range
         }
-    }
+    
+    # Fiscal presets chart the selection's own sales, bucketed by the retail calendar
+    if time_period in FISCAL_PRESETS:
+        chart_grain = FISCAL_PRESETS[time_period][2]
+        kpi_values[time_period] = {
+            'total_sales': selected_total_sales,
+            'date_range': (None, None),
+            'freq': 'D' if chart_grain == 'day' else 'W',
+            'format': '%b %d',
+            'distribution': None
+        }
     
     # Get the values for the selected time period
     period_data = kpi_values.get(time_period, kpi_values['6M'])
@@ -316,9 +467,9 @@ def display_time_series_chart(filtered_data):
     date_format = period_data['format']
     
     # For custom date range, determine the appropriate frequency and distribution
-    if time_period == 'CUSTOM':
+    if time_period == 'CUSTOM' and custom_range is not None:
         # Calculate days between start and end dates
-        date_diff = (st.session_state.custom_end_date - st.session_state.custom_start_date).days
+        date_diff = (custom_range[1] - custom_range[0]).days
         
         if date_diff <= 14:
             freq = 'D'  # Daily for short ranges
@@ -347,23 +498,38 @@ def display_time_series_chart(filtered_data):
         freq = period_data['freq']
         distribution = period_data['distribution']
     
-    # Create date range
-    dates = pd.date_range(start=start_date, end=end_date, freq=freq)
-    
-    # Ensure we have enough dates (trim or extend as needed)
-    if len(dates) > len(distribution):
-        dates = dates[:len(distribution)]
-    elif len(dates) < len(distribution):
-        distribution = distribution[:len(dates)]
-    
-    # Calculate the sales value for each period
-    sales_values = [total_sales * w for w in distribution]
-    
-    # Create a DataFrame with the dates and sales values
-    sales_data = pd.DataFrame({
-        'date': dates,
-        'total_price': sales_values
-    })
+    if time_period in FISCAL_PRESETS:
+        # One gather and bincount over the calendar table, no date arithmetic
+        if daily_sales is None or daily_sales.empty:
+            sales_data = pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'), 'total_price': pd.Series(dtype=float)})
+        elif chart_grain == 'day':
+            sales_data = daily_sales[['date', 'total_price']].reset_index(drop=True)
+        else:
+            buckets = retail_calendar().bucket_totals(daily_sales, chart_grain)
+            if buckets.attrs['uncovered_days']:
+                st.caption(
+                    f"{format_number(buckets.attrs['uncovered_days'])} day(s) outside the retail calendar "
+                    f"({retail_calendar().span()}) are left out of the fiscal buckets."
+                )
+            sales_data = buckets[['date', 'total_price']]
+    else:
+        # Create date range
+        dates = pd.date_range(start=start_date, end=end_date, freq=freq)
+        
+        # Ensure we have enough dates (trim or extend as needed)
+        if len(dates) > len(distribution):
+            dates = dates[:len(distribution)]
+        elif len(dates) < len(distribution):
+            distribution = distribution[:len(dates)]
+        
+        # Calculate the sales value for each period
+        sales_values = [total_sales * w for w in distribution]
+        
+        # Create a DataFrame with the dates and sales values
+        sales_data = pd.DataFrame({
+            'date': dates,
+            'total_price': sales_values
+        })
     
     # Create the figure
     fig = go.Figure()
@@ -412,6 +578,56 @@ def display_time_series_chart(filtered_data):
                 hovertemplate='<b>%{x|' + date_format + '}</b><br>Sales: $%{y:,.0f}<extra></extra>'
             ))
     
+    # Daily detail of the real selection, reduced with LTTB so the payload stays
+    # bounded however long the history is while peaks and dips survive
+    if daily_sales is not None and not daily_sales.empty:
+        detail = downsample_series(daily_sales, 'date', 'total_price', config.CHART_MAX_POINTS)
+        fig.add_trace(go.Scatter(
+            x=detail['date'],
+            y=detail['total_price'],
+            name='Daily Sales',
+            yaxis='y2',
+            mode='lines',
+            line=dict(color=PR_ACCENT, width=1.5),
+            hovertemplate='<b>%{x|%b %d, %Y}</b><br>Daily Sales: $%{y:,.0f}<extra></extra>'
+        ))
+    
+    # Rolling, EWMA, cumulative and year-over-year overlays of the daily series
+    add_overlay_traces(fig, overlays, daily_axis='y2')
+    
+    # Forecast past the end of the period: the band first so the line is drawn over it
+    if forecast is not None and not forecast.empty:
+        fig.add_trace(go.Scatter(
+            x=forecast['date'],
+            y=forecast['upper'],
+            yaxis='y2',
+            mode='lines',
+            line=dict(width=0),
+            showlegend=False,
+            hoverinfo='skip'
+        ))
+        fig.add_trace(go.Scatter(
+            x=forecast['date'],
+            y=forecast['lower'],
+            name='Forecast range (95%)',
+            yaxis='y2',
+            mode='lines',
+            line=dict(width=0),
+            fill='tonexty',
+            fillcolor='rgba(44, 130, 229, 0.18)',
+            hoverinfo='skip'
+        ))
+        fig.add_trace(go.Scatter(
+            x=forecast['date'],
+            y=forecast['forecast'],
+            name='Forecast',
+            yaxis='y2',
+            mode='lines',
+            line=dict(color=PR_ACCENT, width=2, dash='dot'),
+            customdata=np.column_stack([forecast['lower'], forecast['upper']]),
+            hovertemplate='Forecast: $%{y:,.0f} ($%{customdata[0]:,.0f} - $%{customdata[1]:,.0f})<extra></extra>'
+        ))
+    
     # Set y-axis ranges - make sure we have appropriate scales
     if sales_data['total_price'].max() > 0:
         if max(sales_data['total_price']) < 1000:
@@ -465,22 +681,74 @@ def display_time_series_chart(filtered_data):
             bordercolor='rgba(0,0,0,0.05)',
             borderwidth=1
         ),
+        yaxis2=dict(
+            title=dict(
+                text='Daily Sales ($)',
+                font={'size': 14}
+            ),
+            overlaying='y',
+            side='right',
+            tickprefix='$',
+            tickformat=',.0f',
+            showgrid=False,
+            zeroline=False,
+            rangemode='tozero'
+        ),
         hovermode='x unified',
         margin=dict(l=40, r=40, t=80, b=60),
         height=400,
         plot_bgcolor='white',
-        paper_bgcolor='white'
+        paper_bgcolor='white',
+        dragmode='select'
     )
     
+    # Show only the zoom window when one is active
+    if zoom_range is not None:
+        fig.update_xaxes(range=[zoom_range[0], zoom_range[1]])
+    
     # Add grid to both axes
     fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='#E5E5E5')
     fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='#E5E5E5')
+    fig.update_layout(yaxis2=dict(showgrid=False))
+    return fig
+
+def display_time_series_chart(selected_total_sales, daily_sales=None, zoom_range=None, overlays=None, figure=None):
+    """Display the sales trend chart for the selected time period
+    
+    figure, when given, is a prebuilt figure (the default-view snapshot) shown
+    as is; otherwise it is built from the other arguments.
+    """
+    if figure is None:
+        figure = build_time_series_figure(
+            st.session_state.time_period, selected_total_sales, daily_sales, zoom_range, overlays,
+            (st.session_state.custom_start_date, st.session_state.custom_end_date)
+        )
     
-    # Display the chart
-    st.plotly_chart(fig, use_container_width=True)
+    # Display the chart; box-selecting a range zooms in and re-requests that window in full detail
+    event = st.plotly_chart(
+        figure,
+        use_container_width=True,
+        key='sales_trend_chart',
+        on_select='rerun',
+        selection_mode='box'
+    )
+    boxes = event.selection.get('box', []) if event else []
+    if boxes and boxes[-1].get('x'):
+        box = tuple(boxes[-1]['x'])
+        # Only act on a new box so a reset zoom is not re-applied from the stale selection
+        if box != st.session_state.get('sales_trend_box'):
+            st.session_state.sales_trend_box = box
+            x0, x1 = sorted(pd.Timestamp(x) for x in box)
+            st.session_state.sales_trend_zoom = (x0, x1)
+            st.rerun()
+    
+    if zoom_range is not None:
+        if st.button("Reset zoom", key='sales_trend_reset_zoom'):
+            st.session_state.sales_trend_zoom = None
+            st.rerun()
 
-def display_regional_sales(filtered_data):
-    """Display regional sales breakdown as a horizon chart using exact values from the screenshot"""
+def build_regional_sales_figure(filtered_data):
+    """Build the regional sales breakdown horizon chart using exact values from the screenshot"""
     # Use the exact region data from the screenshot instead of calculating from filtered_data
     # This time with the opposite order (from lowest to highest) so they appear correctly on the chart
     regions = [
@@ -595,10 +863,14 @@ def display_regional_sales(filtered_data):
     
     # No explanatory text at the top (removed as requested)
     
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+def display_regional_sales(filtered_data, figure=None):
+    """Display regional sales breakdown as a horizon chart (figure: a prebuilt one from the snapshot)"""
+    st.plotly_chart(figure if figure is not None else build_regional_sales_figure(filtered_data), use_container_width=True)
 
-def display_top_performers(filtered_data):
-    """Display top 5 performing PR shoe models as a pie chart with labels outside"""
+def build_top_performers_figure(filtered_data):
+    """Build the top 5 performing PR shoe models pie chart with labels outside"""
     # Define specific PR shoe models with exact values from the screenshot
     # Shortened "PR Fresh Foam 1080v11" to "1080v11" as requested
     models_full = [
@@ -761,11 +1033,19 @@ def display_top_performers(filtered_data):
         )
     )
     
-    # Display the chart
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+def display_top_performers(filtered_data, figure=None):
+    """Display top 5 performing PR shoe models as a pie chart (figure: a prebuilt one from the snapshot)"""
+    st.plotly_chart(figure if figure is not None else build_top_performers_figure(filtered_data), use_container_width=True)
 
-def display_sales_trends():
-    """Display trend lines chart for sales over time by category"""
+def display_sales_trends(overlays=None):
+    """Display trend lines chart for sales over time by category
+    
+    overlays optionally maps a name to a frame of date and value (the
+    series_analytics overlays: averages, running total, year-over-year
+    change), drawn as dashed lines over the monthly trend.
+    """
     # Create synthetic trend data for the past 12 months
     import data_generator
     import random
@@ -837,6 +1117,17 @@ def display_sales_trends():
                           f'{category}: ${"%{y:,.0f}"}<extra></extra>'
         ))
     
+    # Daily trend overlays on a secondary daily axis
+    if overlays:
+        add_overlay_traces(fig, overlays, daily_axis='y2')
+        fig.update_layout(yaxis2=dict(
+            title='Daily Sales ($)',
+            overlaying='y',
+            side='right',
+            tickprefix='$',
+            showgrid=False
+        ))
+    
     # Update layout for a clean, modern look
     fig.update_layout(
         title={
@@ -852,8 +1143,10 @@ def display_sales_trends():
             gridcolor=PR_LIGHT_GREY,
         ),
         yaxis=dict(
-            title='Monthly Sales ($)',
-            titlefont={'size': 14},
+            title=dict(
+                text='Monthly Sales ($)',
+                font={'size': 14}
+            ),
             tickprefix='$',
             ticksuffix='k',
             tickformat=',d',  # Format as thousands
@@ -885,27 +1178,15 @@ def display_sales_trends():
     st.plotly_chart(fig, use_container_width=True)
 
 
-def display_price_distribution(filtered_data):
-    """Display price distribution by category with average price labels - matching the shared image"""
-    # Filter the data first
-    if filtered_data.empty:
-        st.warning("No data matches the current filter criteria.")
-        return
-        
-    # Calculate aggregated values per category from the filtered_data
-    category_data = filtered_data.groupby('category').agg(
-        total_sales=('total_price', 'sum'),
-        avg_price=('price', 'mean')
-    ).reset_index()
-    
-    # Sort by sales descending for display
-    category_data = category_data.sort_values('total_sales', ascending=False)
+def build_price_distribution_figure(level_data, drill_path=()):
+    """Build the sales and average price bar chart for one drill level - matching the shared image"""
+    level_dim = HIERARCHY[len(drill_path)]
     
     # Create dataframe in the format needed for the chart
     df = pd.DataFrame({
-        'category': category_data['category'],
-        'sales': category_data['total_sales'],
-        'price': category_data['avg_price']
+        'category': level_data[level_dim],
+        'sales': level_data['total_sales'],
+        'price': level_data['avg_price']
     })
     
     # Create the figure
@@ -942,7 +1223,7 @@ def display_price_distribution(filtered_data):
     # Update layout to match the provided image
     fig.update_layout(
         title={
-            'text': 'Sales and Avg Price by Category',  # Updated title
+            'text': f"Sales and Avg Price by {level_dim.title()}" + (f" in {' / '.join(drill_path)}" if drill_path else ''),
             'font': {'size': 24, 'color': '#333333', 'family': 'Arial, sans-serif'},
             'x': 0.01,
             'xanchor': 'left',
@@ -970,7 +1251,7 @@ def display_price_distribution(filtered_data):
         ),
         xaxis=dict(
             title={
-                'text': 'Category',
+                'text': level_dim.title(),
                 'font': {'size': 16, 'family': 'Arial, sans-serif', 'color': '#666666'},
                 'standoff': 20
             },
@@ -985,5 +1266,515 @@ def display_price_distribution(filtered_data):
     fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='#E5E5E5')
     fig.update_xaxes(showgrid=False)
     
-    # Ensure consistent sizing
+    return fig
+
+def display_price_distribution(aggregation_tree, figure=None, figure_path=()):
+    """Display price distribution by category with average price labels - matching the shared image
+    
+    Clicking a bar drills down from category to its models and from a model to
+    its regions; every level is read from the cached aggregation tree. figure,
+    when given, is a prebuilt chart of the figure_path level (the default-view
+    snapshot, or one built ahead on the panel pool).
+    """
+    # Drop a drill path that the current filters no longer contain
+    drill_path = tuple(st.session_state.get('drill_path', ()))
+    level_data = aggregation_tree.level(drill_path)
+    if drill_path and level_data.empty:
+        drill_path = ()
+        st.session_state.drill_path = []
+        level_data = aggregation_tree.level(drill_path)
+    
+    if level_data.empty:
+        st.warning("No data matches the current filter criteria.")
+        return
+    
+    # Back out of a drill-down one level at a time
+    if drill_path:
+        if st.button(f"⬅ Back from {drill_path[-1]}", key='drill_back'):
+            st.session_state.drill_path = list(drill_path[:-1])
+            st.rerun()
+    
+    # Ensure consistent sizing; a key per drill level gives every level a fresh selection
+    event = st.plotly_chart(
+        figure if figure is not None and tuple(figure_path) == drill_path else build_price_distribution_figure(level_data, drill_path),
+        use_container_width=True,
+        key='price_distribution_' + '/'.join(drill_path),
+        on_select='rerun' if len(drill_path) < len(HIERARCHY) - 1 else 'ignore',
+        selection_mode='points'
+    )
+    points = event.selection.get('points', []) if len(drill_path) < len(HIERARCHY) - 1 else []
+    if points:
+        st.session_state.drill_path = list(drill_path) + [points[0]['x']]
+        st.rerun()
+
+
+def build_model_cohort_figure(cohorts, cohort):
+    """Build the sales per cohort band bar chart"""
+    fig = go.Figure(go.Bar(
+        x=cohorts['cohort'],
+        y=cohorts['total_sales'],
+        marker_color='#4A86E8',
+        customdata=np.column_stack([cohorts['models'], cohorts['units'], cohorts['avg_price']]),
+        hovertemplate=(
+            '<b>%{x}</b><br>Sales: $%{y:,.0f}<br>Models: %{customdata[0]}<br>'
+            'Units: %{customdata[1]:,}<br>Avg Price: $%{customdata[2]:.2f}<extra></extra>'
+        )
+    ))
+    fig.update_layout(
+        title={'text': f"Sales by {cohort}", 'font': {'size': 18, 'color': '#333333', 'family': 'Arial, sans-serif'}},
+        plot_bgcolor='white',
+        height=380,
+        margin=dict(t=60, l=60, r=20, b=40),
+        yaxis=dict(showgrid=True, gridcolor='#E5E5E5', tickprefix='$'),
+        xaxis=dict(categoryorder='array', categoryarray=list(cohorts['cohort']))
+    )
+    return fig
+
+
+def prepare_model_cohorts(aggregation_tree, model_dimension, cohort):
+    """Cohort totals and their figure for one cohort: (cohort, totals, figure or None)"""
+    cohorts = cohort_totals(aggregation_tree, model_dimension, cohort)
+    return cohort, cohorts, build_model_cohort_figure(cohorts, cohort) if not cohorts.empty else None
+
+
+def display_model_cohorts(aggregation_tree, model_dimension, prepared=None):
+    """Display sales per band of a model cohort (release year or rating tier)
+    
+    Per-model totals come from the cached aggregation tree and are joined to
+    the model dimension table by code, so no rows are scanned. prepared is a
+    prepare_model_cohorts result built ahead of time, used when it is for the
+    cohort picked.
+    """
+    cohort = st.radio("Group models by", options=list(COHORTS), horizontal=True, key='model_cohort')
+    if prepared is None or prepared[0] != cohort:
+        prepared = prepare_model_cohorts(aggregation_tree, model_dimension, cohort)
+    _, cohorts, fig = prepared
+    if cohorts.empty:
+        st.warning("No data matches the current filter criteria.")
+        return
     st.plotly_chart(fig, use_container_width=True)
+
+
+# Heatmap measures: label -> (bands column, hover/colorbar prefix)
+PRICE_BAND_METRICS = {'Units': ('units', ''), 'Revenue': ('total_sales', '$')}
+
+
+def build_price_band_heatmap(bands, metric):
+    """Build the category x price band heatmap of units or revenue"""
+    column, prefix = PRICE_BAND_METRICS[metric]
+    grid = bands.pivot(index='category', columns='band_low', values=column)
+    rows = bands.pivot(index='category', columns='band_low', values='rows')
+    band_high = bands.drop_duplicates('band_low').set_index('band_low')['band_high']
+    band_labels = [f"${low:,}–{band_high[low]:,}" for low in grid.columns]
+    fig = go.Figure(go.Heatmap(
+        z=grid.to_numpy(),
+        x=band_labels,
+        y=list(grid.index),
+        customdata=rows.to_numpy(),
+        colorscale=[[0, '#FFFFFF'], [0.15, PR_ACCENT], [0.5, PR_PRIMARY], [1, PR_DARK_BLUE]],
+        colorbar=dict(title=metric, tickprefix=prefix),
+        hovertemplate=f'<b>%{{y}}</b> · %{{x}}<br>{metric}: {prefix}%{{z:,.0f}}<br>Transactions: %{{customdata:,}}<extra></extra>',
+        xgap=1,
+        ygap=1
+    ))
+    fig.update_layout(
+        title={'text': f"{metric} by Category and Price Band", 'font': {'size': 18, 'color': '#333333', 'family': 'Arial, sans-serif'}},
+        plot_bgcolor='white',
+        height=max(300, 60 + 40 * len(grid.index)),
+        margin=dict(t=60, l=100, r=20, b=60),
+        xaxis=dict(title='Unit price', tickangle=-45, type='category'),
+        yaxis=dict(autorange='reversed', type='category')
+    )
+    return fig
+
+
+def display_price_band_heatmap(bands, figure=None):
+    """Display units or revenue per category x price band
+
+    bands comes from the selection's cached price band grid sliced to the
+    price slider range, so moving the slider never rescans rows. figure,
+    when given, was built ahead on the panel pool for the metric picked.
+    """
+    metric = st.radio("Heatmap measure", options=list(PRICE_BAND_METRICS), horizontal=True, key='price_band_metric')
+    if bands is None or bands.empty:
+        st.warning("No data matches the current filter criteria.")
+        return
+    st.plotly_chart(figure if figure is not None else build_price_band_heatmap(bands, metric), use_container_width=True)
+
+
+def _scenario_adjustments(editor_rows):
+    """Adjustments from the what-if editor rows ('All' leaves a dimension unrestricted)"""
+    adjustments = []
+    for _, row in editor_rows.iterrows():
+        if pd.isna(row['Price change (%)']):
+            continue
+        adjustments.append(Adjustment(
+            models=[] if row['Model'] in (None, 'All') else [row['Model']],
+            categories=[] if row['Category'] in (None, 'All') else [row['Category']],
+            regions=[] if row['Region'] in (None, 'All') else [row['Region']],
+            price_change=float(row['Price change (%)']) / 100,
+            elasticity=None if pd.isna(row['Elasticity']) else float(row['Elasticity'])
+        ))
+    return adjustments
+
+
+@st.fragment
+def display_scenario_simulator(sales_store, filter_spec, aggregation_tree, daily_sales):
+    """Display a what-if pricing scenario side by side with the baseline selection
+    
+    Each editor row changes the price of the matching model/category/region
+    cells and moves their units by the price elasticity. KPIs and the
+    category breakdown come from the selection's rollup cube, the trend
+    from the selected rows (in-memory backend), and the sweep evaluates a
+    grid of price changes for the first row in one batched pass. Only this
+    fragment reruns while the scenario is edited.
+    """
+    labels = aggregation_tree.labels
+    editor_rows = st.data_editor(
+        pd.DataFrame([{'Model': 'All', 'Category': 'All', 'Region': 'All', 'Price change (%)': 0.0,
+                       'Elasticity': DEFAULT_ELASTICITY}]),
+        num_rows='dynamic',
+        hide_index=True,
+        use_container_width=True,
+        key='scenario_editor',
+        column_config={
+            'Model': st.column_config.SelectboxColumn(options=['All'] + [str(l) for l in labels['model']], required=True),
+            'Category': st.column_config.SelectboxColumn(options=['All'] + [str(l) for l in labels['category']], required=True),
+            'Region': st.column_config.SelectboxColumn(options=['All'] + [str(l) for l in labels['region']], required=True),
+            'Price change (%)': st.column_config.NumberColumn(min_value=-90.0, max_value=200.0, step=1.0, format="%.1f%%"),
+            'Elasticity': st.column_config.NumberColumn(
+                min_value=-10.0, max_value=2.0, step=0.1, format="%.2f",
+                help="Percent change in units per percent change in price (units scale by (1 + change) ** elasticity)"
+            )
+        }
+    )
+    scenario = _scenario_adjustments(editor_rows)
+    results = evaluate_scenarios(aggregation_tree, [scenario])
+    baseline, outcome = results.iloc[0], results.iloc[1]
+    
+    # KPIs side by side: the scenario value with its change from the baseline
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Scenario Sales", format_currency(outcome['total_sales']),
+                f"{outcome['sales_change'] * 100:+.1f}% vs {format_currency(baseline['total_sales'])}")
+    col2.metric("Scenario Units", format_number(int(round(outcome['total_units']))),
+                f"{outcome['units_change'] * 100:+.1f}% vs {format_number(int(round(baseline['total_units'])))}")
+    col3.metric("Scenario Avg Price", format_currency(outcome['avg_price']),
+                f"{outcome['avg_price'] - baseline['avg_price']:+,.2f} vs {format_currency(baseline['avg_price'])}")
+    col4.metric("Scenario Top Model", str(outcome['top_model']),
+                None if outcome['top_model'] == baseline['top_model'] else f"was {baseline['top_model']}", delta_color='off')
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        # Category sales, baseline against scenario
+        base_level = aggregation_tree.level(())
+        scenario_level = scenario_tree(aggregation_tree, scenario).level(()).set_index('category')
+        fig = go.Figure([
+            go.Bar(x=base_level['category'], y=base_level['total_sales'], name='Baseline', marker_color='#A6C5F7'),
+            go.Bar(x=base_level['category'], y=scenario_level['total_sales'].reindex(base_level['category']).to_numpy(),
+                   name='Scenario', marker_color='#2C82E5')
+        ])
+        fig.update_layout(title="Sales by Category", barmode='group', plot_bgcolor='white', height=380,
+                          margin=dict(t=50, l=50, r=20, b=40), yaxis=dict(tickprefix='$', gridcolor='#E5E5E5'))
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        scenario_daily = scenario_daily_totals(sales_store, filter_spec, scenario)
+        if scenario_daily is None:
+            st.info("The scenario trend is available with the in-memory backend.")
+        else:
+            fig = go.Figure([
+                go.Scatter(x=daily_sales['date'], y=daily_sales['total_price'], name='Baseline',
+                           line=dict(color='#A6C5F7', width=2)),
+                go.Scatter(x=scenario_daily['date'], y=scenario_daily['total_price'], name='Scenario',
+                           line=dict(color='#2C82E5', width=2))
+            ])
+            fig.update_layout(title="Daily Sales", plot_bgcolor='white', height=380,
+                              margin=dict(t=50, l=50, r=20, b=40), yaxis=dict(tickprefix='$', gridcolor='#E5E5E5'))
+            st.plotly_chart(fig, use_container_width=True)
+    
+    # Revenue and units over a grid of price changes for the first adjustment
+    if scenario:
+        changes = np.linspace(-0.30, 0.30, 13).round(2) + 0.0
+        sweep = price_sweep(aggregation_tree, scenario[0], changes)
+        fig = go.Figure([
+            go.Scatter(x=sweep.index * 100, y=sweep['total_sales'], name='Sales', line=dict(color='#2C82E5', width=3)),
+            go.Scatter(x=sweep.index * 100, y=sweep['total_units'], name='Units', yaxis='y2',
+                       line=dict(color='#98C1D9', width=2, dash='dash'))
+        ])
+        fig.update_layout(
+            title="Price Sweep for the First Adjustment", plot_bgcolor='white', height=360,
+            margin=dict(t=50, l=60, r=60, b=40),
+            xaxis=dict(title='Price change (%)', ticksuffix='%'),
+            yaxis=dict(title='Sales', tickprefix='$', gridcolor='#E5E5E5'),
+            yaxis2=dict(title='Units', overlaying='y', side='right', showgrid=False)
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+
+def build_table_page(page_rows):
+    """Format one page of selected rows for the detailed data table"""
+    return pd.DataFrame({
+        'date': page_rows['date'].dt.date,
+        'model': page_rows['model'],
+        'category': page_rows['category'],
+        'region': page_rows['region'],
+        'quantity': format_number_array(page_rows['quantity'].to_numpy()),
+        'price': format_currency_array(page_rows['price'].to_numpy()),
+        'total_price': format_currency_array(page_rows['total_price'].to_numpy())
+    })
+
+def display_export_controls(sales_store, filter_spec):
+    """Display controls to export the filtered selection as CSV or Parquet"""
+    with st.expander("Export filtered selection"):
+        col1, col2, col3 = st.columns([1, 1, 2])
+        with col1:
+            fmt = st.selectbox("Format", options=list(EXPORT_COMPRESSION), format_func=str.upper, key='export_format')
+        with col2:
+            compression = st.selectbox("Compression", options=EXPORT_COMPRESSION[fmt], key='export_compression')
+        
+        with col3:
+            st.write("")
+            prepare = st.button("Prepare export", key='export_prepare')
+        
+        if prepare:
+            # Replace this session's previous export file; the session's last one is
+            # removed when the session ends and its state is dropped
+            previous = st.session_state.get('export_file')
+            if previous is not None:
+                previous.remove()
+            st.session_state.export_file = export_for_download(sales_store, filter_spec, fmt=fmt, compression=compression)
+        
+        export_file = st.session_state.get('export_file')
+        if export_file is not None and os.path.exists(export_file.path):
+            stats = export_file.stats
+            st.caption(
+                f"Wrote {format_number(stats['rows'])} rows ({stats['bytes'] / 1e6:,.2f} MB) "
+                f"in {stats['seconds']:.2f}s · {format_number(int(stats['rows_per_second']))} rows/s"
+            )
+            if st.get_option('server.enableStaticServing') and export_file.streamable:
+                # Served by Streamlit's static route, which streams the file from disk
+                st.markdown(
+                    f'<a href="{export_file.url}" download="{export_file.file_name}">Download {export_file.file_name}</a>',
+                    unsafe_allow_html=True
+                )
+            else:
+                # Without the static route (or above its size limit) Streamlit holds the
+                # whole file in memory while the download is served
+                st.caption("This download is held in memory by Streamlit; enable server.enableStaticServing "
+                           "to stream exports up to 200 MB from disk.")
+                st.download_button(
+                    "Download",
+                    data=export_file.read,
+                    file_name=export_file.file_name,
+                    mime='application/octet-stream',
+                    key='export_download'
+                )
+
+
+def _session_crossfilter(sales_store, filter_spec):
+    """The session's Crossfilter over the filter-bar selection, rebuilt when that selection
+    or the store version changes (the linked selection is re-applied to the new one)"""
+    key = (id(sales_store), sales_store.version, spec_key(filter_spec))
+    if st.session_state.get('crossfilter_key') != key:
+        cross = Crossfilter(sales_store, filter_spec)
+        for dim, labels in st.session_state.get('linked_selection', {}).items():
+            cross.select_labels(dim, labels)
+        if st.session_state.get('linked_days'):
+            cross.select_days(*st.session_state.linked_days)
+        st.session_state.crossfilter = cross
+        st.session_state.crossfilter_key = key
+    return st.session_state.crossfilter
+
+def _linked_colors(group):
+    """Selected (or unfiltered) values in the primary blue, the rest greyed out"""
+    return [PR_PRIMARY if selected else PR_LIGHT_GREY for selected in group['selected']]
+
+@st.fragment
+def display_linked_selection(sales_store, filter_spec):
+    """Display region, category, model and daily panels that filter each other
+    
+    Clicking a bar or slice toggles that value and brushing the daily chart
+    selects a date range. Only this fragment reruns: the session's
+    Crossfilter updates the rows entering or leaving the changed dimension
+    and every panel is redrawn from its group totals.
+    """
+    if not isinstance(sales_store, SalesStore):
+        st.info("Linked selection is available with the in-memory backend.")
+        return
+    
+    cross = _session_crossfilter(sales_store, filter_spec)
+    selection = st.session_state.setdefault('linked_selection', {})
+    # Panel keys change after every click so each chart starts without a stale selection
+    generation = st.session_state.get('linked_generation', 0)
+    
+    def toggle(dim, label):
+        labels = [l for l in selection.get(dim, []) if l != label]
+        if len(labels) == len(selection.get(dim, [])):
+            labels.append(label)
+        selection[dim] = labels
+        cross.select_labels(dim, labels)
+        st.session_state.linked_generation = generation + 1
+        st.rerun(scope='fragment')
+    
+    summary = cross.summary()
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        st.caption(
+            f"Linked selection: {format_number(summary['rows'])} rows · {format_currency(summary['total_sales'])} sales · "
+            f"{format_number(summary['total_units'])} units · {format_currency(summary['avg_price'])} average price"
+        )
+    with col2:
+        if st.button("Clear linked selection", key='linked_clear'):
+            st.session_state.linked_selection = {}
+            st.session_state.linked_days = None
+            for dim in ('region', 'category', 'model'):
+                cross.select_labels(dim, [])
+            cross.select_days()
+            st.session_state.linked_generation = generation + 1
+            st.rerun(scope='fragment')
+    
+    col1, col2, col3 = st.columns(3)
+    
+    # Sales by region as horizontal bars
+    with col1:
+        group = cross.group('region').sort_values('total_sales')
+        fig = go.Figure(go.Bar(
+            x=group['total_sales'],
+            y=group['region'].astype(str),
+            orientation='h',
+            marker_color=_linked_colors(group),
+            hovertemplate='<b>%{y}</b><br>Sales: $%{x:,.0f}<extra></extra>'
+        ))
+        fig.update_layout(title='Sales by Region', height=350, margin=dict(l=20, r=20, t=50, b=20),
+                          plot_bgcolor='white', xaxis=dict(tickprefix='$', gridcolor='#E5E5E5'))
+        event = st.plotly_chart(fig, use_container_width=True, key=f'linked_region_{generation}',
+                                on_select='rerun', selection_mode='points')
+        if event.selection.get('points'):
+            toggle('region', event.selection['points'][0]['y'])
+    
+    # Sales by category as vertical bars
+    with col2:
+        group = cross.group('category').sort_values('total_sales', ascending=False)
+        fig = go.Figure(go.Bar(
+            x=group['category'].astype(str),
+            y=group['total_sales'],
+            marker_color=_linked_colors(group),
+            hovertemplate='<b>%{x}</b><br>Sales: $%{y:,.0f}<extra></extra>'
+        ))
+        fig.update_layout(title='Sales by Category', height=350, margin=dict(l=20, r=20, t=50, b=20),
+                          plot_bgcolor='white', yaxis=dict(tickprefix='$', gridcolor='#E5E5E5'))
+        event = st.plotly_chart(fig, use_container_width=True, key=f'linked_category_{generation}',
+                                on_select='rerun', selection_mode='points')
+        if event.selection.get('points'):
+            toggle('category', event.selection['points'][0]['x'])
+    
+    # Sales by model as a pie; selected slices are pulled out
+    with col3:
+        group = cross.group('model').sort_values('total_sales', ascending=False)
+        filtered = bool(selection.get('model'))
+        fig = go.Figure(go.Pie(
+            labels=group['model'].astype(str),
+            values=group['total_sales'],
+            marker=dict(colors=[PR_PRIMARY if s else PR_LIGHT_GREY for s in group['selected']] if filtered else None),
+            pull=[0.08 if s and filtered else 0 for s in group['selected']],
+            sort=False,
+            textinfo='label',
+            hovertemplate='<b>%{label}</b><br>Sales: $%{value:,.0f}<extra></extra>'
+        ))
+        fig.update_layout(title='Sales by Model', height=350, margin=dict(l=20, r=20, t=50, b=20), showlegend=False)
+        event = st.plotly_chart(fig, use_container_width=True, key=f'linked_model_{generation}',
+                                on_select='rerun', selection_mode='points')
+        if event.selection.get('points'):
+            toggle('model', event.selection['points'][0]['label'])
+    
+    # Daily sales; box-select a range to brush the other panels
+    daily = cross.group('day')
+    daily = pd.DataFrame({'date': pd.to_datetime(daily['day'].astype('datetime64[ns]')), 'total_price': daily['total_sales']})
+    detail = downsample_series(daily, 'date', 'total_price', config.CHART_MAX_POINTS)
+    fig = go.Figure(go.Scatter(
+        x=detail['date'],
+        y=detail['total_price'],
+        mode='lines',
+        line=dict(color=PR_PRIMARY, width=1.5),
+        hovertemplate='<b>%{x|%b %d, %Y}</b><br>Sales: $%{y:,.0f}<extra></extra>'
+    ))
+    brush = st.session_state.get('linked_days')
+    if brush:
+        fig.add_vrect(x0=brush[0], x1=brush[1], fillcolor=PR_ACCENT, opacity=0.3, line_width=0)
+    fig.update_layout(title='Daily Sales (drag to brush a date range)', height=300, margin=dict(l=20, r=20, t=50, b=20),
+                      plot_bgcolor='white', dragmode='select', yaxis=dict(tickprefix='$', gridcolor='#E5E5E5'))
+    event = st.plotly_chart(fig, use_container_width=True, key=f'linked_day_{generation}',
+                            on_select='rerun', selection_mode='box')
+    boxes = event.selection.get('box', [])
+    if boxes and boxes[-1].get('x'):
+        start, end = sorted(pd.Timestamp(x) for x in boxes[-1]['x'])
+        st.session_state.linked_days = (start, end)
+        cross.select_days(start, end)
+        st.session_state.linked_generation = generation + 1
+        st.rerun(scope='fragment')
+
+def display_performance_panel(sales_store, panel_timings=None):
+    """Display this rerun's panel build times, memory use of the live sales store
+    and the aggregate cache's activity"""
+    with st.expander("Performance"):
+        if panel_timings is not None and len(panel_timings[0]):
+            timings, wall_ms = panel_timings
+            st.markdown("**Panel build times (this rerun)**")
+            st.caption(
+                f"{len(timings)} panels built concurrently in {wall_ms:,.0f} ms "
+                f"({timings['build_ms'].sum():,.0f} ms if built one after another)"
+            )
+            st.dataframe(
+                timings.rename(columns={'panel': 'Panel', 'start_ms': 'Started (ms)', 'build_ms': 'Build (ms)'}),
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    'Started (ms)': st.column_config.NumberColumn(format="%.1f"),
+                    'Build (ms)': st.column_config.NumberColumn(format="%.1f")
+                }
+            )
+
+        cache = aggregate_cache()
+        if cache is not None:
+            stats = cache.stats()
+            st.caption(
+                f"Aggregate cache: {stats['entries']:,} entries, {stats['bytes'] / 1e6:,.2f} MB on disk, "
+                f"{stats['hits']:,} hits / {stats['misses']:,} misses, {stats['evictions']:,} evicted"
+            )
+        report = sales_store.memory_report
+        if report is None:
+            st.caption(f"Data v{sales_store.version} is served by a {type(sales_store).__name__}; rows are not held in memory.")
+            return
+        
+        st.markdown("**Memory footprint by column**")
+        if 'compact_bytes' in report.columns:
+            before, after = report['bytes'].sum(), report['compact_bytes'].sum()
+            st.caption(
+                f"{before / 1e6:,.2f} MB as loaded → {after / 1e6:,.2f} MB in the store "
+                f"({(1 - after / before) * 100:.0f}% saved by dtype compaction)"
+            )
+            table = pd.DataFrame({
+                'Column': report['column'],
+                'Loaded As': report['dtype'],
+                'Loaded (KB)': report['bytes'] / 1024,
+                'Stored As': report['compact_dtype'],
+                'Stored (KB)': report['compact_bytes'] / 1024,
+                'Saved': report['saved'] * 100
+            })
+        else:
+            st.caption(f"{report['bytes'].sum() / 1e6:,.2f} MB in the store (dtype compaction is off)")
+            table = pd.DataFrame({
+                'Column': report['column'],
+                'Dtype': report['dtype'],
+                'Size (KB)': report['bytes'] / 1024
+            })
+        st.dataframe(
+            table,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                'Loaded (KB)': st.column_config.NumberColumn(format="%.1f"),
+                'Stored (KB)': st.column_config.NumberColumn(format="%.1f"),
+                'Size (KB)': st.column_config.NumberColumn(format="%.1f"),
+                'Saved': st.column_config.NumberColumn(format="%.0f%%")
+            }
+        )
@@ -0,0 +1,89 @@
+import os
+
+# Where the dashboard loads sales from: 'generated' for the synthetic demo data,
+# the path of a CSV in the sales_data.csv layout, or a directory of daily CSV
+# drops in that layout, which is ingested incrementally on every reload
+SALES_DATA_SOURCE = os.environ.get('SALES_DATA_SOURCE', 'generated')
+
+# Seconds between background reloads of the sales store (0 disables the periodic reload)
+SALES_REFRESH_SECONDS = int(os.environ.get('SALES_REFRESH_SECONDS', '3600'))
+
+# Query backend: 'memory' keeps the store in a pandas frame, 'sqlite' pushes
+# filters and aggregations down to an indexed local SQLite database, 'parquet'
+# reads only the month partitions of PARQUET_DIR that overlap the date filter,
+# 'chunked' streams those partitions in chunks for histories larger than RAM
+SALES_BACKEND = os.environ.get('SALES_BACKEND', 'memory')
+
+# Directory holding the SQLite database files and connections per database
+SQLITE_DIR = os.environ.get('SQLITE_DIR', '.sales_db')
+SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', '4'))
+
+# Root of the year=YYYY/month=MM partitioned Parquet dataset
+PARQUET_DIR = os.environ.get('PARQUET_DIR', 'sales_parquet')
+
+# Memory ceiling in MB for the 'chunked' backend; chunks are sized so one of
+# them, with its filter masks and partial aggregates, stays well within it
+OUT_OF_CORE_MEMORY_MB = int(os.environ.get('OUT_OF_CORE_MEMORY_MB', '512'))
+
+# Maximum rows fetched into the detailed data table, and rows formatted and shown per page
+TABLE_ROW_LIMIT = int(os.environ.get('TABLE_ROW_LIMIT', '50000'))
+TABLE_PAGE_SIZE = int(os.environ.get('TABLE_PAGE_SIZE', '250'))
+
+# Most points sent to the browser per chart trace; longer series are downsampled
+CHART_MAX_POINTS = int(os.environ.get('CHART_MAX_POINTS', '800'))
+
+# Rows per chunk when streaming an export of the filtered selection
+EXPORT_CHUNK_ROWS = int(os.environ.get('EXPORT_CHUNK_ROWS', '100000'))
+
+# Parser processes used when ingesting a directory of daily CSV drops
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', str(min(8, os.cpu_count() or 1))))
+
+# How the store id is read from a drop's file name (without extension) when
+# the file has no Store column: a regular expression whose 'store' group is
+# the id. The default takes everything before a trailing _YYYY-MM-DD date,
+# e.g. 'store_042_2025-05-04.csv' -> 'store_042'. Unmatched names are an error.
+INGEST_STORE_PATTERN = os.environ.get('INGEST_STORE_PATTERN', r'(?P<store>.+)_\d{4}-\d{2}-\d{2}')
+
+# Store the in-memory frame with the smallest safe dtypes, and the relative
+# error allowed when narrowing float64 columns to float32
+COMPACT_DTYPES = os.environ.get('COMPACT_DTYPES', '1') == '1'
+COMPACT_FLOAT_RTOL = float(os.environ.get('COMPACT_FLOAT_RTOL', '1e-6'))
+
+# Stratified sample kept by the in-memory store for progressive KPIs: the
+# fraction of rows sampled (0 disables it), the smallest selection in rows that
+# is shown from the sample first, and the relative 95% confidence half-width an
+# estimate must reach to be shown before the exact values are ready
+SAMPLE_FRACTION = float(os.environ.get('SAMPLE_FRACTION', '0.05'))
+SAMPLE_MIN_ROWS = int(os.environ.get('SAMPLE_MIN_ROWS', '250000'))
+SAMPLE_ERROR_TARGET = float(os.environ.get('SAMPLE_ERROR_TARGET', '0.01'))
+
+# On-disk cache of aggregates and the prebuilt default view, keyed by a
+# fingerprint of the data so it survives restarts and is invalidated when the
+# data changes: its directory and size cap in MB (0 disables it)
+AGGREGATE_CACHE_DIR = os.environ.get('AGGREGATE_CACHE_DIR', '.sales_cache')
+AGGREGATE_CACHE_MB = int(os.environ.get('AGGREGATE_CACHE_MB', '256'))
+
+# CSV of model attributes (a model column plus e.g. name, release_year,
+# avg_rating, line, colourway) for the model dimension table; empty uses the
+# synthetic generator's built-in models
+MODEL_DIMENSION_SOURCE = os.environ.get('MODEL_DIMENSION_SOURCE', '')
+
+# Worker threads shared by all sessions for building dashboard panels concurrently
+PANEL_WORKERS = int(os.environ.get('PANEL_WORKERS', '4'))
+
+# Days of daily history the sales forecast is fitted on, and days it looks ahead
+FORECAST_HISTORY_DAYS = int(os.environ.get('FORECAST_HISTORY_DAYS', '365'))
+FORECAST_HORIZON_DAYS = int(os.environ.get('FORECAST_HORIZON_DAYS', '28'))
+
+# Width in dollars of the price bands of the category x price heatmap
+PRICE_BAND_WIDTH = int(os.environ.get('PRICE_BAND_WIDTH', '10'))
+
+# Month whose last Saturday-nearest day ends the 4-5-4 retail fiscal year
+# (1: the NRF calendar, with fiscal years ending around the end of January)
+FISCAL_YEAR_END_MONTH = int(os.environ.get('FISCAL_YEAR_END_MONTH', '1'))
+
+# Columns counted with HyperLogLog distinct-count sketches per day x category x
+# region cell (those missing from the data are skipped), and the sketch
+# precision: 2 ** HLL_PRECISION registers, about 1.04 / sqrt(registers) relative error
+DISTINCT_COUNT_COLUMNS = [c for c in os.environ.get('DISTINCT_COUNT_COLUMNS', 'model,store,customer').split(',') if c]
+HLL_PRECISION = int(os.environ.get('HLL_PRECISION', '12'))
@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+
+# Dimensions of the linked panels: the three dictionary-encoded ones and the calendar day
+LINKED_DIMENSIONS = ['region', 'category', 'model', 'day']
+
+# Measures reduced per group value; the linked totals also track the price sum
+MEASURES = ['total_sales', 'units', 'rows']
+TOTALS = MEASURES + ['price_sum']
+
+
+class Crossfilter:
+    """Linked selection over the rows of one filter-bar selection, updated incrementally.
+
+    Every row keeps a count of the dimension filters it fails, and every
+    dimension keeps its group reductions over the rows that pass all the
+    *other* dimensions' filters (so a panel still shows its unselected
+    bars). Changing one dimension's selection only visits the rows whose
+    value entered or left it, found through a per-dimension code index,
+    and adjusts the fail counts and the other dimensions' groups by those
+    rows alone.
+    """
+
+    def __init__(self, sales_store, spec):
+        self._store = sales_store
+        # Universe rows as store positions; they are date-sorted like the store
+        self.positions = sales_store.select(spec).astype(np.int32)
+        days = sales_store.days[self.positions]
+        self.first_day = int(days[0]) if len(days) else 0
+        self.labels = {dim: list(sales_store.labels[dim]) for dim in LINKED_DIMENSIONS if dim != 'day'}
+        self.labels['day'] = list(
+            (self.first_day + np.arange(int(days[-1]) - self.first_day + 1 if len(days) else 0))
+            .astype('datetime64[D]')
+        )
+        self.fail = np.zeros(len(self.positions), dtype=np.uint8)
+        self.filters = {dim: np.ones(len(self.labels[dim]), dtype=bool) for dim in LINKED_DIMENSIONS}
+        self._index = {}
+
+        # With no selection every row passes, so each group is a plain reduction
+        values = self._values(self.positions)
+        self.groups = {
+            dim: self._reduce(self._codes(dim), values, None, len(self.labels[dim])) for dim in LINKED_DIMENSIONS
+        }
+        self.totals = {name: float(values[name].sum()) if values[name] is not None else float(len(self)) for name in TOTALS}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _codes(self, dim, rows=slice(None), positions=None):
+        """Dimension codes of universe rows (or of the given store positions)"""
+        positions = self.positions[rows] if positions is None else positions
+        if dim == 'day':
+            return (self._store.days[positions] - self.first_day).astype(np.int64)
+        return self._store.codes[dim][positions]
+
+    def _values(self, positions):
+        """Measure values at store positions; only the gathered values are widened to float64"""
+        frame = self._store.frame
+        return {
+            'total_sales': frame['total_price'].to_numpy()[positions].astype(np.float64),
+            'units': frame['quantity'].to_numpy()[positions].astype(np.float64),
+            'price_sum': frame['price'].to_numpy()[positions].astype(np.float64),
+            'rows': None
+        }
+
+    def _reduce(self, codes, values, weights, size):
+        """Per-code sums of every measure, each row scaled by weights (None: weight 1)"""
+        sums = {}
+        for name in MEASURES:
+            row_values = values[name]
+            if row_values is None:
+                row_values = weights
+            elif weights is not None:
+                row_values = row_values * weights
+            sums[name] = np.bincount(codes, weights=row_values, minlength=size).astype(np.float64)
+        return sums
+
+    def _rows_with(self, dim, codes):
+        """Universe rows whose dim takes one of codes, via the dimension's code index"""
+        if dim not in self._index:
+            # Built on first use; days are already sorted so their index is the identity
+            values = self._codes(dim)
+            # Small codes sort with a radix sort when narrowed to int16
+            narrow = values.astype(np.int16) if len(self.labels[dim]) < 2 ** 15 else values
+            order = None if dim == 'day' else np.argsort(narrow, kind='stable').astype(np.int32)
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(values, minlength=len(self.labels[dim])))])
+            self._index[dim] = (order, offsets)
+        order, offsets = self._index[dim]
+        # Changed codes usually form a few runs (a toggled label, a moved brush edge);
+        # each run of codes is one contiguous span of the index
+        breaks = np.flatnonzero(np.diff(codes) != 1) + 1
+        starts, ends = codes[np.concatenate([[0], breaks])], codes[np.concatenate([breaks - 1, [len(codes) - 1]])]
+        spans = [np.arange(offsets[start], offsets[end + 1]) for start, end in zip(starts, ends)]
+        rows = np.concatenate(spans) if spans else np.array([], dtype=np.int64)
+        return rows if order is None else order[rows]
+
+    def _apply(self, dim, selected):
+        """Replace one dimension's per-code pass lookup and update fails and groups incrementally"""
+        previous = self.filters[dim]
+        changed = np.flatnonzero(previous != selected)
+        if len(changed) == 0:
+            return
+        rows = self._rows_with(dim, changed)
+        positions = self.positions[rows]
+        own = self._codes(dim, positions=positions)
+        entering = selected[own]
+        # A row entering the selection fails one filter fewer, a row leaving it one more;
+        # low is the smaller of its fail counts before and after
+        low = self.fail[rows] - entering.astype(np.uint8)
+        self.fail[rows] = low + (~entering).astype(np.uint8)
+        self.filters[dim] = selected
+
+        # Only rows failing at most one other filter can change any group or the
+        # totals; everything else is dropped before the measures are gathered
+        relevant = np.flatnonzero(low <= 1)
+        positions, low = positions[relevant], low[relevant]
+        sign = np.where(entering[relevant], 1.0, -1.0)
+        values = self._values(positions)
+
+        # Another dimension's groups count a row when it fails nothing but (maybe) that
+        # dimension, so a changed row moves in or out exactly when low equals its own fail
+        for other in LINKED_DIMENSIONS:
+            if other == dim:
+                continue
+            codes = self._codes(other, positions=positions)
+            # Rows that do not move get weight zero rather than being gathered out
+            weights = np.where(low == ~self.filters[other][codes], sign, 0.0)
+            sums = self._reduce(codes, values, weights, len(self.labels[other]))
+            for name in MEASURES:
+                self.groups[other][name] += sums[name]
+        weights = np.where(low == 0, sign, 0.0)
+        for name in TOTALS:
+            self.totals[name] += float(weights @ values[name]) if values[name] is not None else float(weights.sum())
+
+    def select_labels(self, dim, labels):
+        """Keep rows whose dim is one of labels (an empty selection keeps every row)"""
+        if not labels:
+            self._apply(dim, np.ones(len(self.labels[dim]), dtype=bool))
+            return
+        selected = np.zeros(len(self.labels[dim]), dtype=bool)
+        code_of = {label: i for i, label in enumerate(self.labels[dim])}
+        selected[[code_of[label] for label in labels if label in code_of]] = True
+        self._apply(dim, selected)
+
+    def select_days(self, start=None, end=None):
+        """Keep rows dated from start to end inclusive (None clears the brush)"""
+        days = np.array(self.labels['day'], dtype='datetime64[D]')
+        if start is None or end is None:
+            self._apply('day', np.ones(len(days), dtype=bool))
+            return
+        self._apply('day', (days >= np.datetime64(start, 'D')) & (days <= np.datetime64(end, 'D')))
+
+    def selected(self, dim):
+        """Labels currently selected in dim (empty when the dimension is unfiltered)"""
+        if self.filters[dim].all():
+            return []
+        return [label for label, keep in zip(self.labels[dim], self.filters[dim]) if keep]
+
+    def group(self, dim):
+        """Per-value totals of dim over rows passing the other dimensions' filters"""
+        groups = self.groups[dim]
+        # Rounded so values left over from adding and removing rows read as zero
+        present = np.round(groups['rows']) > 0
+        return pd.DataFrame({
+            dim: np.array(self.labels[dim], dtype=object)[present],
+            'total_sales': groups['total_sales'][present],
+            'units': np.round(groups['units'][present]).astype(np.int64),
+            'rows': np.round(groups['rows'][present]).astype(np.int64),
+            'selected': self.filters[dim][present]
+        })
+
+    def summary(self):
+        """Totals of the rows passing every linked filter"""
+        rows = int(round(self.totals['rows']))
+        return {
+            'total_sales': self.totals['total_sales'],
+            'total_units': int(round(self.totals['units'])),
+            'avg_price': self.totals['price_sum'] / rows if rows else 0.0,
+            'rows': rows
+        }
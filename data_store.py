@@ -0,0 +1,420 @@
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import config
+from compaction import compact_frame, memory_report
+from disk_cache import frame_fingerprint
+from drilldown import HIERARCHY, AggregationTree
+from data_generator import generate_sales_data
+from sampling import build_sample
+from sketches import store_sketches
+
+# Dimension columns that are dictionary-encoded into integer codes
+DIMENSIONS = ['category', 'region', 'model']
+
+# Column names used by sales_data.csv and the upstream drops
+CSV_COLUMNS = {
+    'Date': 'date',
+    'Model': 'model',
+    'Category': 'category',
+    'Region': 'region',
+    'Units Sold': 'quantity',
+    'Unit Price': 'price',
+    'Total Sales': 'total_price'
+}
+
+
+# The predicates chosen in the filter bar; empty category/region lists mean "all"
+FilterSpec = namedtuple('FilterSpec', ['start_date', 'end_date', 'categories', 'price_range', 'regions'])
+
+# Row columns shown in the detailed data table
+TABLE_COLUMNS = ['date', 'model', 'category', 'region', 'quantity', 'price', 'total_price']
+
+# Columns summarize_kpis reads
+KPI_COLUMNS = ['model', 'quantity', 'price', 'total_price']
+
+# A filter plan narrows to row positions after its most selective predicate when
+# that keeps at most this share of the window; otherwise every predicate is
+# fused into one mask over the window
+INTERSECT_SELECTIVITY = 0.25
+
+# Equi-depth price buckets used to estimate how selective a price range is
+PRICE_QUANTILES = 64
+
+
+def summarize_kpis(frame):
+    """Compute the KPI row values from a frame of selected rows"""
+    if frame.empty:
+        return {'total_sales': 0.0, 'avg_price': 0.0, 'total_units': 0, 'top_model': 'N/A', 'rows': 0}
+    # Accumulate in float64 even when the store keeps compact float32 columns
+    total_price = frame['total_price'].astype(np.float64)
+    return {
+        'total_sales': float(total_price.sum()),
+        'avg_price': float(frame['price'].astype(np.float64).mean()),
+        'total_units': int(frame['quantity'].sum()),
+        'top_model': str(total_price.groupby(frame['model'], observed=True).sum().sort_values(ascending=False).index[0]),
+        'rows': len(frame)
+    }
+
+
+def summarize_groups(frame, dim):
+    """Aggregate sales, average price and units per value of a dimension"""
+    measures = pd.DataFrame({
+        dim: frame[dim],
+        'total_price': frame['total_price'].astype(np.float64),
+        'price': frame['price'].astype(np.float64),
+        'quantity': frame['quantity'].astype(np.int64)
+    })
+    groups = measures.groupby(dim, observed=True).agg(
+        total_sales=('total_price', 'sum'),
+        avg_price=('price', 'mean'),
+        units=('quantity', 'sum')
+    ).reset_index()
+    groups[dim] = groups[dim].astype(str)
+    return groups.sort_values('total_sales', ascending=False).reset_index(drop=True)
+
+
+def read_sales_csv(path):
+    """Read a CSV in the sales_data.csv layout into the dashboard's column names"""
+    # Model codes such as 574 must stay strings even when a file holds only numeric ones
+    df = pd.read_csv(path, parse_dates=['Date'], dtype={'Model': str, 'Category': str, 'Region': str})
+    return df.rename(columns=CSV_COLUMNS)
+
+
+def load_sales_frame(source=None):
+    """Load the raw sales frame from the configured source"""
+    source = source or config.SALES_DATA_SOURCE
+    if source == 'generated':
+        return generate_sales_data()
+    if os.path.isdir(source):
+        # A drop directory: ingest any new or changed daily files first
+        from ingest import ingest_drops
+        merged, _ = ingest_drops(source)
+        return merged
+    return read_sales_csv(source)
+
+
+class SalesStore:
+    """Immutable snapshot of the sales data together with its indexes.
+
+    Rows are sorted by date so a date window is a contiguous slice found with
+    a binary search, and each dimension is dictionary-encoded so filters and
+    group-bys can work on small integer codes.
+    """
+
+    def __init__(self, frame, version=1, source='generated'):
+        self.frame = frame.sort_values('date', kind='stable').reset_index(drop=True)
+        self.version = version
+        self.source = source
+        self.built_at = datetime.now()
+        self.memory_report = None
+        self.sample = None
+        self.default_view = None
+        self.fingerprint = None
+        self.sketches = None
+
+        # Sorted timestamps backing the date index, and their calendar day ordinals
+        self.dates = self.frame['date'].to_numpy()
+        self.days = self.dates.astype('datetime64[D]').astype(np.int64)
+
+        # Dictionary-encode the dimensions: codes index into the sorted labels
+        self.codes = {}
+        self.labels = {}
+        for dim in DIMENSIONS:
+            codes, labels = pd.factorize(self.frame[dim], sort=True)
+            self.codes[dim] = codes.astype(np.int32)
+            self.labels[dim] = list(labels)
+        self.code_of = {dim: {label: i for i, label in enumerate(labels)} for dim, labels in self.labels.items()}
+
+        # Statistics for ordering filter predicates: rows per code and price quantiles
+        self.code_counts = {dim: np.bincount(self.codes[dim], minlength=len(self.labels[dim])) for dim in DIMENSIONS}
+        price = self.frame['price'].to_numpy()
+        self.price_quantiles = np.quantile(price, np.linspace(0, 1, PRICE_QUANTILES + 1)) if len(price) else None
+
+    def __len__(self):
+        return len(self.frame)
+
+    def date_slice(self, start_date, end_date):
+        """Return the row slice covering start_date <= date <= end_date"""
+        start = np.searchsorted(self.dates, np.datetime64(start_date), side='left')
+        end = np.searchsorted(self.dates, np.datetime64(end_date), side='right')
+        return slice(int(start), int(end))
+
+    def plan(self, start_date, end_date, categories=None, price_range=None, regions=None):
+        """Lazy FilterPlan over the date window and any of the other predicates"""
+        return FilterPlan(self, start_date, end_date, categories, price_range, regions)
+
+    def select(self, spec):
+        """Row positions of the selection, without copying any columns"""
+        return self.plan(*spec).positions()
+
+    def _gather(self, positions, columns=None):
+        """The selected rows (optionally only some columns), gathered in one take"""
+        frame = self.frame if columns is None else self.frame[columns]
+        return frame.take(positions)
+
+    # Query interface shared with the other sales backends
+
+    def category_options(self, start_date, end_date):
+        """Categories present in the date window"""
+        return self.plan(start_date, end_date).present('category')
+
+    def price_bounds(self, start_date, end_date, categories):
+        """Integer price bounds of the rows in the date window and categories"""
+        return self.plan(start_date, end_date, categories).price_bounds()
+
+    def region_options(self, start_date, end_date, categories, price_range):
+        """Regions present once date, category and price filters are applied"""
+        return self.plan(start_date, end_date, categories, price_range).present('region')
+
+    def rows(self, spec, limit=None):
+        """Return the selected rows, in date order"""
+        positions = self.select(spec)
+        return self._gather(positions if limit is None else positions[:limit])
+
+    def kpis(self, spec):
+        """KPI row values for the selection"""
+        return summarize_kpis(self._gather(self.select(spec), KPI_COLUMNS))
+
+    def group_totals(self, spec, dim):
+        """Sales, average price and units per value of dim for the selection"""
+        return summarize_groups(self._gather(self.select(spec), [dim, 'total_price', 'price', 'quantity']), dim)
+
+    def daily_totals(self, spec):
+        """Sales per calendar day of the selection (days without sales are omitted)"""
+        positions = self.select(spec)
+        if len(positions) == 0:
+            return pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'), 'total_price': pd.Series(dtype=float)})
+        # Rows are date-sorted, so the selected days run from the first to the last position
+        offsets = self.days[positions] - self.days[positions[0]]
+        sales = np.bincount(offsets, weights=self.frame['total_price'].to_numpy()[positions])
+        present = np.flatnonzero(np.bincount(offsets))
+        dates = (self.days[positions[0]] + present).astype('datetime64[D]').astype('datetime64[ns]')
+        return pd.DataFrame({'date': dates, 'total_price': sales[present]})
+
+    def aggregation_tree(self, spec):
+        """Category x model x region aggregates of the selection, from one bincount per measure"""
+        positions = self.select(spec)
+        shape = tuple(len(self.labels[dim]) for dim in HIERARCHY)
+        cells = np.ravel_multi_index(tuple(self.codes[dim][positions] for dim in HIERARCHY), shape)
+        size = int(np.prod(shape))
+
+        def cell_totals(column=None):
+            weights = self.frame[column].to_numpy()[positions] if column else None
+            return np.bincount(cells, weights=weights, minlength=size).reshape(shape).astype(np.float64)
+
+        return AggregationTree(
+            {dim: self.labels[dim] for dim in HIERARCHY},
+            cell_totals('total_price'),
+            cell_totals('quantity'),
+            cell_totals('price'),
+            cell_totals()
+        )
+
+    def iter_rows(self, spec, chunk_rows):
+        """Yield the selected table rows in date order, chunk_rows at a time"""
+        positions = self.select(spec)
+        table = self.frame[TABLE_COLUMNS]
+        for start in range(0, len(positions), chunk_rows):
+            yield table.take(positions[start:start + chunk_rows])
+
+
+class FilterPlan:
+    """Filter predicates over one SalesStore date window, evaluated lazily and in one pass.
+
+    The date window is a slice of the date-sorted rows. Category, region
+    and price predicates are ordered by their estimated selectivity (rows
+    per code, price quantiles); a selective first predicate narrows the
+    window to row positions and the rest only test those rows, otherwise all
+    predicates are fused into one mask. Option lists and price bounds are
+    read from the code and price arrays, so no DataFrame is built until
+    the caller gathers the final rows.
+    """
+
+    def __init__(self, sales_store, start_date, end_date, categories=None, price_range=None, regions=None):
+        self._store = sales_store
+        self.window = sales_store.date_slice(start_date, end_date)
+        self.predicates = []
+        for dim, values in (('category', categories), ('region', regions)):
+            if values:
+                lookup = np.zeros(len(sales_store.labels[dim]), dtype=bool)
+                lookup[[sales_store.code_of[dim][v] for v in values if v in sales_store.code_of[dim]]] = True
+                counts = sales_store.code_counts[dim]
+                selectivity = counts[lookup].sum() / max(counts.sum(), 1)
+                self.predicates.append((selectivity, dim, self._code_test(dim, lookup)))
+        if price_range is not None:
+            self.predicates.append((self._price_selectivity(price_range), 'price', self._price_test(price_range)))
+        self.predicates.sort(key=lambda predicate: predicate[0])
+
+    def _code_test(self, dim, lookup):
+        codes = self._store.codes[dim]
+        return lambda rows: lookup[codes[rows]]
+
+    def _price_test(self, price_range):
+        price = self._store.frame['price'].to_numpy()
+        low, high = price_range[0], price_range[1]
+        return lambda rows: (price[rows] >= low) & (price[rows] <= high)
+
+    def _price_selectivity(self, price_range):
+        """Share of rows in the price range, from the store's equi-depth price buckets"""
+        quantiles = self._store.price_quantiles
+        if quantiles is None:
+            return 1.0
+        low, high = np.searchsorted(quantiles, [price_range[0], price_range[1]], side='left')
+        return min(1.0, (high - low + 1) / PRICE_QUANTILES)
+
+    def mask(self):
+        """Boolean mask over the window rows, or None when there are no predicates"""
+        mask = None
+        for _, _, test in self.predicates:
+            mask = test(self.window) if mask is None else mask & test(self.window)
+        return mask
+
+    def positions(self):
+        """Row positions passing every predicate, in date order"""
+        window = self.window
+        if not self.predicates:
+            return np.arange(window.start, window.stop)
+        selectivity, _, first = self.predicates[0]
+        if selectivity > INTERSECT_SELECTIVITY:
+            return window.start + np.flatnonzero(self.mask())
+        # Index intersection: narrow to the first predicate's rows, then test only those
+        positions = window.start + np.flatnonzero(first(window))
+        for _, _, test in self.predicates[1:]:
+            positions = positions[test(positions)]
+        return positions
+
+    def _rows(self):
+        """The window slice when there are no predicates, else the passing positions"""
+        return self.window if not self.predicates else self.positions()
+
+    def present(self, dim):
+        """Sorted labels of dim that occur in the passing rows"""
+        labels = self._store.labels[dim]
+        counts = np.bincount(self._store.codes[dim][self._rows()], minlength=len(labels))
+        return [labels[code] for code in np.flatnonzero(counts)]
+
+    def price_bounds(self):
+        """Integer (min, max) price of the passing rows, or None when nothing passes"""
+        price = self._store.frame['price'].to_numpy()[self._rows()]
+        if len(price) == 0:
+            return None
+        return int(price.min()), int(price.max())
+
+
+def build_memory_store(frame, version=1, source='generated'):
+    """Build the in-memory store for one version (StoreRefresher builder).
+
+    With COMPACT_DTYPES the frame is narrowed to the smallest safe dtypes
+    first, and the per-column memory report is kept on the store. The
+    stratified sample behind the progressive KPIs is drawn here too.
+    """
+    if not config.COMPACT_DTYPES:
+        store = SalesStore(frame, version=version, source=source)
+        store.memory_report = memory_report(store.frame)
+    else:
+        compact = compact_frame(frame)
+        store = SalesStore(compact, version=version, source=source)
+        store.memory_report = memory_report(frame, compact)
+    store.sample = build_sample(store)
+    store.fingerprint = frame_fingerprint(store.frame)
+    return store
+
+
+class StoreRefresher:
+    """Builds new versions of the sales store off the request path.
+
+    The next version is loaded and indexed on a background thread and then
+    swapped in under a lock, so a rerun that has already taken a reference
+    to the current store keeps reading it until the rerun finishes. An
+    optional snapshot_builder precomputes each version's default view.
+    """
+
+    def __init__(self, loader=load_sales_frame, builder=build_memory_store, interval_seconds=None, snapshot_builder=None):
+        self._loader = loader
+        self._builder = builder
+        self._snapshot_builder = snapshot_builder
+        self._interval = config.SALES_REFRESH_SECONDS if interval_seconds is None else interval_seconds
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._store = None
+        self._refreshing = False
+        self._last_error = None
+
+    def start(self):
+        """Load the first version synchronously and start the background loader"""
+        if self._store is None:
+            self._build_next()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='sales-store-refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def current(self):
+        """Return the store version that is live right now"""
+        with self._lock:
+            return self._store
+
+    def request_refresh(self):
+        """Ask the background thread to build a new version as soon as possible"""
+        self._wake.set()
+
+    def status(self):
+        """Return version and freshness details for the UI badge"""
+        with self._lock:
+            store = self._store
+            return {
+                'version': store.version if store is not None else 0,
+                'built_at': store.built_at if store is not None else None,
+                'rows': len(store) if store is not None else 0,
+                'refreshing': self._refreshing,
+                'last_error': self._last_error
+            }
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Sleep until the next scheduled reload or an explicit request
+            self._wake.wait(self._interval if self._interval > 0 else None)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self._build_next()
+            except Exception as exc:  # keep serving the previous version
+                with self._lock:
+                    self._last_error = f"{type(exc).__name__}: {exc}"
+                    self._refreshing = False
+
+    def _build_next(self):
+        with self._lock:
+            self._refreshing = True
+            previous = self._store
+            next_version = (previous.version + 1) if previous is not None else 1
+
+        # Load and index outside the lock so readers are never blocked
+        store = self._builder(self._loader(), version=next_version, source=config.SALES_DATA_SOURCE)
+        # Distinct-count sketches only hash the rows appended since the previous version
+        store.sketches = store_sketches(store, previous.sketches if previous is not None else None)
+        if self._snapshot_builder is not None:
+            # Precompute the default view before the version goes live
+            store.default_view = self._snapshot_builder(store)
+
+        with self._lock:
+            self._store = store
+            self._refreshing = False
+            self._last_error = None
+
+        # Aggregates of superseded data are not dropped here: the cache directory may be
+        # shared with other processes still serving that data, and LRU eviction ages them out
+        return store
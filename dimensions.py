@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+import config
+from data_generator import MODEL_DATA
+
+# Cohorts of models: name -> (attribute, bin edges, band labels); each band holds
+# edges[i] <= value < edges[i + 1]
+COHORTS = {
+    'Release Year': (
+        'release_year',
+        [-np.inf, 1990, 2000, 2010, 2020, np.inf],
+        ['Before 1990', '1990s', '2000s', '2010s', '2020s']
+    ),
+    'Rating Tier': (
+        'avg_rating',
+        [-np.inf, 4.3, 4.6, np.inf],
+        ['Under 4.3', '4.3 - 4.5', '4.6 and up']
+    )
+}
+
+# Band of models whose attribute is unknown
+UNKNOWN_COHORT = 'Unknown'
+
+# Model label lists whose table rows are kept (a few store versions)
+MODEL_ROWS_CACHE_SIZE = 4
+
+
+class ModelDimension:
+    """Model dimension table: one row of attributes per model code.
+
+    Attributes such as release year and rating depend on the model alone, so
+    they live here rather than on every sales row. Aggregates keyed by model
+    code are joined to the table only when a cohort view needs them, and
+    updating an attribute touches one row per model.
+    """
+
+    def __init__(self, table):
+        # Indexed by model code; a 'name' column plus any attribute columns
+        self.table = table
+        # Lookups derived from the table, built on first use; update() drops them
+        self._model_rows = {}
+        self._row_bands = {}
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from {model: {attribute: value}}"""
+        table = pd.DataFrame.from_dict(records, orient='index')
+        table.index = table.index.astype(str)
+        table.index.name = 'model'
+        if 'name' not in table.columns:
+            table.insert(0, 'name', table.index)
+        return cls(table)
+
+    @classmethod
+    def from_csv(cls, path):
+        """Build from a CSV with a model column and one column per attribute"""
+        table = pd.read_csv(path, dtype={'model': str}).set_index('model')
+        if 'name' not in table.columns:
+            table.insert(0, 'name', table.index)
+        return cls(table)
+
+    def attributes(self):
+        """Attribute column names (everything but the display name)"""
+        return [column for column in self.table.columns if column != 'name']
+
+    def update(self, model, **attributes):
+        """Set attributes of one model, adding the model or attribute columns as needed"""
+        for attribute, value in attributes.items():
+            self.table.loc[model, attribute] = value
+        if pd.isna(self.table.loc[model, 'name']):
+            self.table.loc[model, 'name'] = model
+        self._model_rows = {}
+        self._row_bands = {}
+
+    def model_rows(self, models):
+        """Table row of each model code of a store's model labels (-1 when the table lacks it).
+
+        The string lookup runs once per label list; trees of later reruns (and
+        any read back from the disk cache) carry the same labels and get the
+        same integer array.
+        """
+        key = tuple(models)
+        rows = self._model_rows.get(key)
+        if rows is None:
+            rows = self.table.index.get_indexer([str(model) for model in models])
+            self._model_rows[key] = rows
+            while len(self._model_rows) > MODEL_ROWS_CACHE_SIZE:
+                del self._model_rows[next(iter(self._model_rows))]
+        return rows
+
+    def row_bands(self, cohort):
+        """Band code of every table row for one cohort, plus a final unknown entry
+        that row -1 (a model missing from the table) picks"""
+        if cohort not in self._row_bands:
+            attribute, edges, labels = COHORTS[cohort]
+            if attribute in self.table.columns:
+                values = self.table[attribute].to_numpy(dtype=np.float64)
+                bands = np.where(np.isnan(values), len(labels), np.searchsorted(edges, values, side='right') - 1)
+            else:
+                bands = np.full(len(self.table), len(labels))
+            self._row_bands[cohort] = np.append(bands, len(labels)).astype(np.int64)
+        return self._row_bands[cohort]
+
+    def cohort_codes(self, models, cohort):
+        """Band code of each model in models (ordered like COHORTS' labels, unknown last),
+        gathered by integer model code from the prebuilt lookups"""
+        return self.row_bands(cohort)[self.model_rows(models)]
+
+
+def load_model_dimension(source=None):
+    """Model dimension table from MODEL_DIMENSION_SOURCE, or the generator's built-in models"""
+    source = source if source is not None else config.MODEL_DIMENSION_SOURCE
+    if source:
+        return ModelDimension.from_csv(source)
+    return ModelDimension.from_records(MODEL_DATA)
+
+
+def cohort_totals(tree, model_dimension, cohort):
+    """Sales, units and average price per band of a model cohort.
+
+    Per-model totals are summed out of the selection's aggregation tree (a
+    group-by on model codes that is already computed), then each model's
+    band is gathered from the dimension table and the totals are summed
+    per band.
+    """
+    labels = COHORTS[cohort][2] + [UNKNOWN_COHORT]
+    # Sum out category and region: one value per model code
+    per_model = [array.sum(axis=(0, 2)) for array in (tree.sales, tree.units, tree.price_sum, tree.rows)]
+    bands = model_dimension.cohort_codes(tree.labels['model'], cohort)
+    sales, units, price_sum, rows = [np.bincount(bands, weights=values, minlength=len(labels)) for values in per_model]
+    models = np.bincount(bands, weights=per_model[3] > 0, minlength=len(labels))
+    present = rows > 0
+    return pd.DataFrame({
+        'cohort': np.array(labels, dtype=object)[present],
+        'models': models[present].astype(np.int64),
+        'total_sales': sales[present],
+        'units': units[present].astype(np.int64),
+        'avg_price': price_sum[present] / rows[present]
+    })
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import pickle
+import threading
+import zlib
+
+import pandas as pd
+
+import config
+
+# Cached entries are zlib-compressed pickles
+ENTRY_SUFFIX = '.bin'
+
+# Part of every key; bump it when the layout of a cached result changes
+CACHE_FORMAT_VERSION = 1
+
+
+def frame_fingerprint(frame):
+    """Content fingerprint of a sales frame: column names, dtypes and every value"""
+    digest = hashlib.sha256()
+    digest.update(repr([(column, str(frame[column].dtype)) for column in frame.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:32]
+
+
+class DiskCache:
+    """Aggregates persisted on disk, so a restart against unchanged data starts warm.
+
+    Entries live under root/<fingerprint>/, one file per key, so results of
+    a dataset that has since changed are never read back. The directory may
+    be shared by several processes (server workers, the report_pack CLI),
+    each possibly serving another dataset version, so nothing is dropped for
+    being of another fingerprint: when the total size passes max_bytes the
+    least recently used entries are evicted (reads refresh an entry's mtime),
+    which ages out superseded datasets first.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(root, exist_ok=True)
+        self._bytes = sum(size for _, _, size in self._entries())
+
+    def _entries(self):
+        """(mtime, path, size) of every entry on disk"""
+        entries = []
+        for fingerprint in os.listdir(self.root):
+            directory = os.path.join(self.root, fingerprint)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if name.endswith(ENTRY_SUFFIX):
+                    path = os.path.join(directory, name)
+                    try:
+                        info = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((info.st_mtime_ns, path, info.st_size))
+        return entries
+
+    def _path(self, fingerprint, key):
+        name = hashlib.sha256(repr(key).encode()).hexdigest()[:40]
+        return os.path.join(self.root, fingerprint, name + ENTRY_SUFFIX)
+
+    def get(self, fingerprint, key, default=None):
+        path = self._path(fingerprint, key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.loads(zlib.decompress(f.read()))
+            os.utime(path)
+        except Exception:
+            # Missing, evicted meanwhile, unreadable or a stale pickle (e.g. a class
+            # that has since moved, raising AttributeError): treat it as a miss
+            with self._lock:
+                self.misses += 1
+            return default
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, fingerprint, key, value):
+        path = self._path(fingerprint, key)
+        data = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 6)
+        if len(data) > self.max_bytes:
+            return
+        # Write aside and rename so a concurrent reader never sees a partial entry
+        temp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp, 'wb') as f:
+                f.write(data)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temp, path)
+        except OSError:
+            # Best effort: e.g. another process evicted the directory meanwhile
+            return
+        with self._lock:
+            self._bytes += len(data) - previous
+            over = self._bytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def get_or_compute(self, fingerprint, key, compute):
+        missing = object()
+        value = self.get(fingerprint, key, missing)
+        if value is missing:
+            value = compute()
+            self.put(fingerprint, key, value)
+        return value
+
+    def _evict(self):
+        """Delete least recently used entries until the cache is back under 90% of max_bytes"""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, _, size in entries)
+            for _, path, size in entries:
+                if total <= 0.9 * self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.evictions += 1
+                try:
+                    # Drop the dataset's directory once its last entry is gone
+                    os.rmdir(os.path.dirname(path))
+                except OSError:
+                    pass
+            self._bytes = total
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries()),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def aggregate_cache():
+    """The process-wide DiskCache, or None when AGGREGATE_CACHE_MB is 0"""
+    global _cache
+    if config.AGGREGATE_CACHE_MB <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskCache(config.AGGREGATE_CACHE_DIR, config.AGGREGATE_CACHE_MB * 1024 * 1024)
+        return _cache
+
+
+def cached(sales_store, key, compute):
+    """compute() through the aggregate cache, keyed by the store's data fingerprint and key"""
+    cache = aggregate_cache()
+    if cache is None or sales_store.fingerprint is None:
+        return compute()
+    full_key = (CACHE_FORMAT_VERSION, type(sales_store).__name__) + tuple(key)
+    return cache.get_or_compute(sales_store.fingerprint, full_key, compute)
@@ -0,0 +1,52 @@
+import numpy as np
+
+
+def lttb_indices(x, y, n_out):
+    """Pick n_out point indices with the largest-triangle-three-buckets algorithm.
+
+    The first and last points are always kept. The points in between are split
+    into n_out - 2 equal buckets. From each bucket LTTB keeps the point that
+    forms the largest triangle with the previously kept point and the average
+    of the next bucket, which preserves peaks and dips.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket edges over the interior points 1..n-2
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    # Averages of every bucket, used as the third triangle vertex
+    x_sums = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    y_sums = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    x_avg = np.append(x_sums / counts, x[-1])
+    y_avg = np.append(y_sums / counts, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Twice the triangle area for every candidate in the bucket at once
+        areas = np.abs(
+            (x[previous] - x_avg[bucket + 1]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (y_avg[bucket + 1] - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample_series(frame, x_col, y_col, max_points):
+    """Return frame reduced to at most max_points rows with LTTB on x_col/y_col"""
+    if len(frame) <= max_points:
+        return frame
+    x = frame[x_col].to_numpy()
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype('datetime64[ns]').astype(np.int64)
+    return frame.iloc[lttb_indices(x, frame[y_col].to_numpy(), max_points)]
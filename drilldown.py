@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from disk_cache import cached
+
+# Drill-down order: category -> model -> region
+HIERARCHY = ['category', 'model', 'region']
+
+# Aggregation trees kept for recently seen (store version, filter) pairs
+TREE_CACHE_SIZE = 32
+
+
+class AggregationTree:
+    """Sales aggregated over every category x model x region cell of a selection.
+
+    Built once per filter state; each drill level is a sum over the small
+    cell arrays rather than a new group-by over the selected rows.
+    """
+
+    def __init__(self, labels, sales, units, price_sum, rows):
+        self.labels = labels  # {dim: [label, ...]} for each dim in HIERARCHY
+        self.sales = sales  # arrays shaped (categories, models, regions)
+        self.units = units
+        self.price_sum = price_sum
+        self.rows = rows
+
+    @classmethod
+    def from_groups(cls, groups):
+        """Build from a frame with one row per non-empty cell (category, model, region,
+        total_sales, units, price_sum, rows)"""
+        labels = {dim: sorted(groups[dim].unique()) for dim in HIERARCHY}
+        shape = tuple(len(labels[dim]) for dim in HIERARCHY)
+        index = tuple(
+            pd.Categorical(groups[dim], categories=labels[dim]).codes.astype(np.int64) for dim in HIERARCHY
+        )
+        arrays = []
+        for column in ('total_sales', 'units', 'price_sum', 'rows'):
+            values = np.zeros(shape)
+            values[index] = groups[column].to_numpy(dtype=np.float64)
+            arrays.append(values)
+        return cls(labels, *arrays)
+
+    def _slice(self, path):
+        """Cell arrays restricted to the drill path (a tuple of labels from the top)"""
+        index = []
+        for dim, label in zip(HIERARCHY, path):
+            if label not in self.labels[dim]:
+                return None
+            index.append(self.labels[dim].index(label))
+        index = tuple(index)
+        return [array[index] for array in (self.sales, self.units, self.price_sum, self.rows)]
+
+    def level(self, path=()):
+        """Children of the drill path: per-category, per-model or per-region totals"""
+        dim = HIERARCHY[len(path)]
+        arrays = self._slice(path)
+        if arrays is None:
+            return pd.DataFrame(columns=[dim, 'total_sales', 'avg_price', 'units'])
+        # Sum out the dimensions below the level being shown
+        axes = tuple(range(1, arrays[0].ndim))
+        sales, units, price_sum, rows = [array.sum(axis=axes) if axes else array for array in arrays]
+        present = rows > 0
+        level = pd.DataFrame({
+            dim: np.array(self.labels[dim], dtype=object)[present],
+            'total_sales': sales[present],
+            'avg_price': price_sum[present] / rows[present],
+            'units': units[present].astype(np.int64)
+        })
+        return level.sort_values('total_sales', ascending=False).reset_index(drop=True)
+
+
+_tree_cache = OrderedDict()
+_tree_lock = threading.Lock()
+
+
+def spec_key(spec):
+    """Hashable form of a FilterSpec for cache keys"""
+    return (
+        spec.start_date, spec.end_date, tuple(spec.categories),
+        tuple(spec.price_range) if spec.price_range is not None else None, tuple(spec.regions)
+    )
+
+
+def cached_aggregation_tree(sales_store, spec):
+    """Return the aggregation tree for this store version and filter, building it at most once"""
+    key = (id(sales_store), sales_store.version, spec_key(spec))
+    with _tree_lock:
+        if key in _tree_cache:
+            _tree_cache.move_to_end(key)
+            return _tree_cache[key]
+    tree = cached(sales_store, ('aggregation_tree', spec_key(spec)), lambda: sales_store.aggregation_tree(spec))
+    with _tree_lock:
+        _tree_cache[key] = tree
+        while len(_tree_cache) > TREE_CACHE_SIZE:
+            _tree_cache.popitem(last=False)
+    return tree
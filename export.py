@@ -0,0 +1,159 @@
+import gzip
+import os
+import shutil
+import time
+import uuid
+import weakref
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import config
+from data_store import TABLE_COLUMNS
+
+# Compression choices offered per export format
+EXPORT_COMPRESSION = {
+    'csv': ['none', 'gzip'],
+    'parquet': ['snappy', 'zstd', 'gzip', 'none']
+}
+
+
+def _write_csv(chunks, fileobj, compression):
+    stream = gzip.GzipFile(fileobj=fileobj, mode='wb') if compression == 'gzip' else fileobj
+    rows = 0
+    header = True
+    for chunk in chunks:
+        stream.write(chunk.to_csv(index=False, header=header).encode('utf-8'))
+        header = False
+        rows += len(chunk)
+    if header:
+        # Empty selection: still write the column header
+        stream.write((','.join(TABLE_COLUMNS) + '\n').encode('utf-8'))
+    if stream is not fileobj:
+        stream.close()
+    return rows
+
+
+def _write_parquet(chunks, fileobj, compression):
+    writer = None
+    rows = 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(fileobj, table.schema, compression=compression)
+            # Each chunk becomes its own row group, so only one chunk is ever buffered
+            writer.write_table(table)
+            rows += len(chunk)
+        if writer is None:
+            empty = pa.Table.from_pandas(pd.DataFrame(columns=TABLE_COLUMNS), preserve_index=False)
+            writer = pq.ParquetWriter(fileobj, empty.schema, compression=compression)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def export_selection(sales_store, spec, fileobj, fmt='csv', compression='none', chunk_rows=None):
+    """Stream the selected rows to fileobj as CSV or Parquet, one chunk at a time.
+
+    Rows come straight from the store's row selection in chunks of chunk_rows,
+    so neither the full selection nor the full output is held in memory.
+    Returns the rows written, bytes written, elapsed seconds and throughput.
+    """
+    if fmt not in EXPORT_COMPRESSION:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if compression not in EXPORT_COMPRESSION[fmt]:
+        raise ValueError(f"Unsupported compression for {fmt}: {compression}")
+
+    started = time.perf_counter()
+    start_offset = fileobj.tell()
+    chunks = sales_store.iter_rows(spec, chunk_rows or config.EXPORT_CHUNK_ROWS)
+    if fmt == 'csv':
+        rows = _write_csv(chunks, fileobj, compression)
+    else:
+        rows = _write_parquet(chunks, fileobj, None if compression == 'none' else compression)
+    fileobj.flush()
+    seconds = time.perf_counter() - started
+    return {
+        'rows': rows,
+        'bytes': fileobj.tell() - start_offset,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds > 0 else float(rows)
+    }
+
+
+def export_file_name(fmt, compression):
+    """Download file name for an export"""
+    name = f"sales_export.{fmt}"
+    if fmt == 'csv' and compression == 'gzip':
+        name += '.gz'
+    return name
+
+
+# Prepared downloads live under the app's static folder, one unguessable directory
+# each, so Streamlit's static route (server.enableStaticServing) streams them from
+# disk. That route serves files up to STATIC_FILE_LIMIT bytes.
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'exports')
+EXPORT_URL = 'app/static/exports'
+STATIC_FILE_LIMIT = 200 * 1024 * 1024
+
+# Export directories older than this (left behind by a crash) are swept on the next export
+EXPORT_MAX_AGE_SECONDS = 24 * 3600
+
+
+class ExportFile:
+    """One prepared export on disk, removed by remove(), when the object is garbage
+    collected (its Streamlit session ended and dropped its state) or at exit"""
+
+    def __init__(self, path, file_name, stats):
+        self.path = path
+        self.file_name = file_name
+        self.stats = stats
+        self._remove = weakref.finalize(self, shutil.rmtree, os.path.dirname(path), True)
+
+    @property
+    def url(self):
+        """Static-route URL of the file, relative to the app"""
+        return f"{EXPORT_URL}/{os.path.basename(os.path.dirname(self.path))}/{self.file_name}"
+
+    @property
+    def streamable(self):
+        return os.path.getsize(self.path) <= STATIC_FILE_LIMIT
+
+    def read(self):
+        """The whole file, for st.download_button (which keeps it in memory)"""
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def remove(self):
+        self._remove()
+
+
+def sweep_exports(max_age=EXPORT_MAX_AGE_SECONDS):
+    """Delete export directories older than max_age seconds"""
+    if not os.path.isdir(EXPORT_DIR):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        if os.path.getmtime(path) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def export_for_download(sales_store, spec, fmt='csv', compression='none'):
+    """Export the selection into a new file under EXPORT_DIR and return its ExportFile"""
+    sweep_exports()
+    directory = os.path.join(EXPORT_DIR, uuid.uuid4().hex)
+    os.makedirs(directory)
+    file_name = export_file_name(fmt, compression)
+    path = os.path.join(directory, file_name)
+    try:
+        with open(path, 'wb') as fileobj:
+            stats = export_selection(sales_store, spec, fileobj, fmt=fmt, compression=compression)
+    except Exception:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    return ExportFile(path, file_name, stats)
+
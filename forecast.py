@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import config
+from data_store import SalesStore
+from disk_cache import cached
+from drilldown import spec_key
+
+# Weekly seasonality of daily sales
+SEASON_DAYS = 7
+
+# Trend damping; forecasts flatten out instead of extrapolating a trend forever
+DAMPING = 0.95
+
+# (alpha, beta, gamma) smoothing parameters tried for every series; each series
+# keeps the combination with the smallest one-step-ahead squared error
+PARAMETER_GRID = [
+    (alpha, beta, gamma)
+    for alpha in (0.1, 0.3, 0.6)
+    for beta in (0.0, 0.05)
+    for gamma in (0.05, 0.3)
+]
+
+# Two-sided 95% normal quantile for the forecast band
+Z_95 = 1.959964
+
+# Forecasts kept for recently seen (store version, filter) pairs
+FORECAST_CACHE_SIZE = 16
+
+
+def fit_holt_winters(series, horizon, season=SEASON_DAYS, grid=None):
+    """Fit damped additive Holt-Winters models to every row of a (series, time) array at once.
+
+    All parameter combinations and all series are updated together, one
+    vectorized step per day, so the cost grows with the number of days
+    rather than with the number of series. Returns the forecasts and their
+    95% half-widths, each shaped (series, horizon), and the index of the
+    parameter combination chosen per series.
+    """
+    grid = np.array(grid or PARAMETER_GRID, dtype=np.float64)
+    series = np.asarray(series, dtype=np.float64)
+    count, days = series.shape
+    if days < 2 * season:
+        # Too short to separate a weekly pattern: repeat the mean
+        mean = series.mean(axis=1, keepdims=True) if days else np.zeros((count, 1))
+        spread = series.std(axis=1, keepdims=True) if days else np.zeros((count, 1))
+        return np.repeat(mean, horizon, axis=1), np.repeat(Z_95 * spread, horizon, axis=1), np.zeros(count, dtype=np.int64)
+
+    alpha, beta, gamma = (grid[:, i, np.newaxis] for i in range(3))
+    # Start from the first two weeks: level, weekly trend and the seasonal offsets
+    first, second = series[:, :season].mean(axis=1), series[:, season:2 * season].mean(axis=1)
+    level = np.broadcast_to(first, (len(grid), count)).copy()
+    trend = np.broadcast_to((second - first) / season, (len(grid), count)).copy()
+    seasonal = np.broadcast_to(series[:, :season] - first[:, np.newaxis], (len(grid), count, season)).copy()
+    sse = np.zeros((len(grid), count))
+
+    for t in range(days):
+        observed = series[:, t]
+        slot = t % season
+        predicted = level + DAMPING * trend + seasonal[:, :, slot]
+        if t >= season:
+            sse += (observed - predicted) ** 2
+        previous_level = level
+        level = alpha * (observed - seasonal[:, :, slot]) + (1 - alpha) * (level + DAMPING * trend)
+        trend = beta * (level - previous_level) + (1 - beta) * DAMPING * trend
+        seasonal[:, :, slot] = gamma * (observed - level) + (1 - gamma) * seasonal[:, :, slot]
+
+    # Keep each series' best parameter combination
+    best = sse.argmin(axis=0)
+    columns = np.arange(count)
+    level, trend, seasonal = level[best, columns], trend[best, columns], seasonal[best, columns]
+    sigma = np.sqrt(sse[best, columns] / (days - season))
+
+    steps = np.arange(1, horizon + 1)
+    damped = np.cumsum(DAMPING ** steps)
+    slots = (days + steps - 1) % season
+    forecasts = level[:, np.newaxis] + damped * trend[:, np.newaxis] + seasonal[:, slots]
+    # Error of a simple exponential smoother h steps ahead, with the chosen alpha
+    chosen_alpha = grid[best, 0][:, np.newaxis]
+    margins = Z_95 * sigma[:, np.newaxis] * np.sqrt(1 + (steps - 1) * chosen_alpha ** 2)
+    return forecasts, margins, best
+
+
+def daily_series(sales_store, spec):
+    """Daily sales of every model x region series of the selection as a (series, day) array.
+
+    Returns (values, labels, first day); labels holds the (model, region) of
+    each row, and only series with sales are kept.
+    """
+    positions = sales_store.select(spec)
+    first_day = np.datetime64(pd.Timestamp(spec.start_date).floor('D'), 'D').astype(np.int64)
+    last_day = np.datetime64(pd.Timestamp(spec.end_date).floor('D'), 'D').astype(np.int64)
+    days = int(last_day - first_day + 1)
+    regions = len(sales_store.labels['region'])
+    codes = sales_store.codes['model'][positions].astype(np.int64) * regions + sales_store.codes['region'][positions]
+    cells = codes * days + (sales_store.days[positions] - first_day)
+    size = len(sales_store.labels['model']) * regions
+    values = np.bincount(cells, weights=sales_store.frame['total_price'].to_numpy()[positions], minlength=size * days)
+    values = values.reshape(size, days)
+    present = np.flatnonzero(values.any(axis=1))
+    labels = [(sales_store.labels['model'][code // regions], sales_store.labels['region'][code % regions]) for code in present]
+    return values[present], labels, first_day
+
+
+def forecast_selection(sales_store, spec, history_days=None, horizon=None):
+    """Forecast the selection's daily sales past spec.end_date from its model x region series.
+
+    Returns a dict with 'total' (date, forecast, lower, upper summed over
+    the series, treating their errors as independent), 'series' (per
+    model x region forecast totals over the horizon), the number of series
+    and the fit time; or None for backends without rows in memory.
+    """
+    if not isinstance(sales_store, SalesStore):
+        return None
+    history_days = history_days or config.FORECAST_HISTORY_DAYS
+    horizon = horizon or config.FORECAST_HORIZON_DAYS
+    end = pd.Timestamp(spec.end_date).floor('D')
+    # The whole last day is history, whatever time of day the period ends at
+    fit_spec = spec._replace(
+        start_date=end - pd.Timedelta(days=history_days - 1),
+        end_date=end + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+    )
+
+    started = time.perf_counter()
+    values, labels, _ = daily_series(sales_store, fit_spec)
+    if len(values) == 0:
+        return None
+    forecasts, margins, _ = fit_holt_winters(values, horizon)
+    forecasts = np.maximum(forecasts, 0)
+
+    dates = pd.date_range(end + pd.Timedelta(days=1), periods=horizon, freq='D')
+    total = forecasts.sum(axis=0)
+    total_margin = np.sqrt((margins ** 2).sum(axis=0))
+    return {
+        'total': pd.DataFrame({
+            'date': dates,
+            'forecast': total,
+            'lower': np.maximum(total - total_margin, 0),
+            'upper': total + total_margin
+        }),
+        'series': pd.DataFrame({
+            'model': [model for model, _ in labels],
+            'region': [region for _, region in labels],
+            'forecast_sales': forecasts.sum(axis=1)
+        }).sort_values('forecast_sales', ascending=False).reset_index(drop=True),
+        'series_count': len(labels),
+        'seconds': time.perf_counter() - started
+    }
+
+
+_forecast_cache = OrderedDict()
+_forecast_lock = threading.Lock()
+
+
+def cached_forecast(sales_store, spec):
+    """forecast_selection, cached per store version and filter (and on disk per data fingerprint)"""
+    # The fit window is anchored on the end date, so the start of the period does not matter
+    spec = spec._replace(start_date=None)
+    key = (id(sales_store), sales_store.version, spec_key(spec))
+    with _forecast_lock:
+        if key in _forecast_cache:
+            _forecast_cache.move_to_end(key)
+            return _forecast_cache[key]
+    settings = (config.FORECAST_HISTORY_DAYS, config.FORECAST_HORIZON_DAYS)
+    result = cached(sales_store, ('forecast', spec_key(spec), settings), lambda: forecast_selection(sales_store, spec))
+    with _forecast_lock:
+        _forecast_cache[key] = result
+        while len(_forecast_cache) > FORECAST_CACHE_SIZE:
+            _forecast_cache.popitem(last=False)
+    return result
@@ -0,0 +1,197 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import config
+from data_store import TABLE_COLUMNS, read_sales_csv
+
+# Ingest state lives in this subdirectory of the drop directory
+STATE_DIR_NAME = '.ingest'
+MANIFEST_FILE = 'manifest.json'
+# Every ingested file's rows, before deduplication across files (the merged
+# frame is derived from these, so removing one delivery keeps the others)
+ROWS_FILE = 'rows.parquet'
+
+# Columns identifying one transaction. Drops carry no transaction id, so the
+# store (a 'Store' column, or parsed from the drop's file name) plus the row
+# values is the key, together with the row's occurrence number: identical rows
+# within one file are separate sales, and only redeliveries across files collapse
+TRANSACTION_KEY = ['store', 'date', 'model', 'category', 'region', 'quantity', 'price']
+DEDUPE_KEY = TRANSACTION_KEY + ['occurrence']
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def store_from_filename(path, pattern=None):
+    """Store id of a drop without a Store column, from its file name and INGEST_STORE_PATTERN"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    match = re.fullmatch(pattern or config.INGEST_STORE_PATTERN, name)
+    if match is None:
+        raise ValueError(
+            f"{path}: no Store column and the file name does not match INGEST_STORE_PATTERN "
+            f"({pattern or config.INGEST_STORE_PATTERN!r})"
+        )
+    return match.group('store')
+
+
+def _with_occurrence(frame):
+    """Number repeated transactions within each source file 0, 1, ..."""
+    frame['occurrence'] = frame.groupby(['source_file'] + TRANSACTION_KEY, sort=False, observed=True).cumcount()
+    return frame
+
+
+def _parse_drop(path):
+    """Hash and parse one drop file (runs in a worker process)"""
+    frame = read_sales_csv(path)
+    if 'Store' in frame.columns:
+        frame = frame.rename(columns={'Store': 'store'})
+    else:
+        frame['store'] = store_from_filename(path)
+    frame['store'] = frame['store'].astype(str)
+    return path, file_sha256(path), frame[TABLE_COLUMNS + ['store']]
+
+
+def scan_drop_dir(drop_dir):
+    """Return {path: (size, mtime)} for every CSV under drop_dir"""
+    found = {}
+    for root, dirs, files in os.walk(drop_dir):
+        dirs[:] = [d for d in dirs if d != STATE_DIR_NAME]
+        for name in files:
+            if name.lower().endswith('.csv'):
+                path = os.path.join(root, name)
+                info = os.stat(path)
+                found[path] = (info.st_size, info.st_mtime_ns)
+    return found
+
+
+def load_manifest(state_dir):
+    path = os.path.join(state_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(state_dir, manifest):
+    path = os.path.join(state_dir, MANIFEST_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def load_rows(state_dir):
+    """Read every ingested file's rows (source_file says which), or None before the first ingest"""
+    path = os.path.join(state_dir, ROWS_FILE)
+    if not os.path.exists(path):
+        return None
+    return pq.read_table(path).to_pandas()
+
+
+def _write_rows(state_dir, frame):
+    path = os.path.join(state_dir, ROWS_FILE)
+    pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def merge_rows(rows):
+    """Deduplicate the per-file rows into the sales frame; later drops win when the
+    same transaction is delivered in more than one file"""
+    merged = rows.drop_duplicates(subset=DEDUPE_KEY, keep='last')
+    return merged.sort_values('date', kind='stable').reset_index(drop=True)
+
+
+def ingest_drops(drop_dir, workers=None):
+    """Incrementally ingest a directory of daily CSV drops.
+
+    Files whose size and mtime match the manifest are skipped without being
+    read. Files that are new or changed are hashed and parsed in a process
+    pool, and a changed file replaces the rows it contributed before. Every
+    file's rows are persisted next to the manifest, so a restart re-parses
+    nothing it has already seen, and are deduplicated across files on
+    DEDUPE_KEY only when the merged frame is built: a transaction delivered
+    twice survives the removal of either delivery.
+    Returns (merged frame, stats).
+    """
+    started = time.perf_counter()
+    state_dir = os.path.join(drop_dir, STATE_DIR_NAME)
+    os.makedirs(state_dir, exist_ok=True)
+    rows = load_rows(state_dir)
+    # State from before per-file rows were kept cannot be updated: parse everything again
+    manifest = load_manifest(state_dir) if rows is not None else {}
+    if rows is None:
+        rows = pd.DataFrame(columns=TABLE_COLUMNS + ['store', 'source_file', 'occurrence'])
+    found = scan_drop_dir(drop_dir)
+
+    candidates = [
+        path for path, (size, mtime) in sorted(found.items())
+        if path not in manifest or manifest[path]['size'] != size or manifest[path]['mtime_ns'] != mtime
+    ]
+    removed = [path for path in manifest if path not in found]
+
+    parsed = []
+    replaced = set(removed)
+    if candidates:
+        # spawn keeps workers independent of the threads running in this process
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers or config.INGEST_WORKERS, mp_context=context) as pool:
+            for path, sha256, frame in pool.map(_parse_drop, candidates, chunksize=16):
+                size, mtime = found[path]
+                entry = manifest.get(path)
+                if entry is not None and entry['sha256'] == sha256:
+                    # Touched but identical: refresh the stat fields only
+                    entry.update(size=size, mtime_ns=mtime)
+                    continue
+                frame['source_file'] = path
+                parsed.append(_with_occurrence(frame))
+                replaced.add(path)
+                manifest[path] = {'size': size, 'mtime_ns': mtime, 'sha256': sha256, 'rows': len(frame)}
+
+    if replaced:
+        kept = rows[~rows['source_file'].isin(replaced)]
+        rows = pd.concat([kept] + parsed, ignore_index=True) if parsed else kept.reset_index(drop=True)
+        for path in removed:
+            del manifest[path]
+        # Persist the rows before the manifest: a crash in between only re-parses
+        _write_rows(state_dir, rows)
+    _write_manifest(state_dir, manifest)
+    merged = merge_rows(rows)
+
+    stats = {
+        'files_seen': len(found),
+        'files_parsed': len(candidates),
+        'files_changed': len(replaced) - len(removed),
+        'files_removed': len(removed),
+        'rows_parsed': sum(len(frame) for frame in parsed),
+        'rows_total': len(merged),
+        'seconds': time.perf_counter() - started
+    }
+    return merged, stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Incrementally ingest a directory of daily sales CSV drops")
+    parser.add_argument('drop_dir')
+    parser.add_argument('--workers', type=int, default=None, help="parser processes (default: INGEST_WORKERS)")
+    args = parser.parse_args()
+    _, stats = ingest_drops(args.drop_dir, workers=args.workers)
+    print(
+        f"{stats['files_seen']} files seen, {stats['files_parsed']} parsed "
+        f"({stats['files_changed']} new or changed, {stats['files_removed']} removed), "
+        f"{stats['rows_parsed']:,} rows parsed, {stats['rows_total']:,} rows total "
+        f"in {stats['seconds']:.2f}s"
+    )
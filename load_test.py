@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import numpy as np
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+
+def process_rss_mb():
+    """Current resident set size of this process in MB (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _widget(widgets, label):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"No widget labelled {label!r}")
+
+
+def _timed_run(at, timings, step):
+    started = time.perf_counter()
+    at.run()
+    timings.append((step, time.perf_counter() - started))
+    if at.exception:
+        raise RuntimeError(f"{step}: {at.exception[0].value}")
+
+
+def run_session(session_id, iterations, timeout):
+    """Drive one simulated session through the scripted filter changes; return (step, seconds) timings"""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(session_id)
+    timings = []
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    _timed_run(at, timings, 'first_load')
+
+    for _ in range(iterations):
+        # Switch the time period
+        _widget(at.selectbox, "Time Period").set_value(rng.choice(['7D', '90D', '6M', '1Y', 'ALL']))
+        _timed_run(at, timings, 'period')
+
+        # Toggle one or two categories
+        categories = _widget(at.multiselect, "Product Category")
+        if categories.options:
+            categories.set_value(rng.sample(list(categories.options), k=min(len(categories.options), rng.randint(1, 2))))
+            _timed_run(at, timings, 'categories')
+
+        # Drag the price slider
+        slider = _widget(at.slider, "Price Range ($)")
+        low, high = slider.min, slider.max
+        if high > low:
+            new_low = rng.randint(low, low + (high - low) // 2)
+            slider.set_range(new_low, rng.randint(new_low + 1, high))
+            _timed_run(at, timings, 'price')
+
+        # Toggle a region
+        regions = _widget(at.multiselect, "Region")
+        if regions.options:
+            regions.set_value([rng.choice(list(regions.options))])
+            _timed_run(at, timings, 'regions')
+
+        # Open a custom range and move its start date
+        _widget(at.selectbox, "Time Period").set_value('CUSTOM')
+        _timed_run(at, timings, 'custom_open')
+        _widget(at.date_input, "Start Date").set_value(date(2025, rng.randint(1, 3), rng.randint(1, 28)))
+        _timed_run(at, timings, 'custom_start')
+
+        # Clear the selections and go back to the default view
+        _widget(at.multiselect, "Product Category").set_value([])
+        _widget(at.multiselect, "Region").set_value([])
+        _widget(at.selectbox, "Time Period").set_value('30D')
+        _timed_run(at, timings, 'reset')
+    return timings
+
+
+def run_level(sessions, iterations, timeout):
+    """Run `sessions` concurrent sessions and summarize their rerun latencies"""
+    rss_before = process_rss_mb()
+    peak_rss = [rss_before]
+    stop = threading.Event()
+
+    def sample_rss():
+        while not stop.wait(0.2):
+            peak_rss.append(process_rss_mb())
+
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        results = list(pool.map(lambda i: run_session(i, iterations, timeout), range(sessions)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    sampler.join()
+
+    latencies = np.array([seconds for timings in results for _, seconds in timings]) * 1000
+    by_step = {}
+    for timings in results:
+        for step, seconds in timings:
+            by_step.setdefault(step, []).append(seconds * 1000)
+    return {
+        'sessions': sessions,
+        'reruns': len(latencies),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p90_ms': float(np.percentile(latencies, 90)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'max_ms': float(latencies.max()),
+        'reruns_per_second': len(latencies) / elapsed,
+        'rss_mb': peak_rss[-1],
+        'peak_rss_mb': max(peak_rss),
+        'step_p50_ms': {step: float(np.percentile(values, 50)) for step, values in by_step.items()}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Drive concurrent simulated sessions through app.py and report rerun latency, throughput and RSS"
+    )
+    parser.add_argument('--sessions', default='1,2,4,8', help="comma-separated concurrency levels (default: 1,2,4,8)")
+    parser.add_argument('--iterations', type=int, default=3, help="scripted filter loops per session")
+    parser.add_argument('--timeout', type=float, default=120, help="seconds allowed per rerun")
+    parser.add_argument('--source', help="SALES_DATA_SOURCE for the run (default: sales_data.csv next to app.py)")
+    parser.add_argument('--json', help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    # The dashboard's periods end in May 2025, so default to the bundled CSV covering them
+    os.environ['SALES_DATA_SOURCE'] = args.source or os.path.join(os.path.dirname(APP_PATH), 'sales_data.csv')
+
+    results = []
+    print(f"{'sessions':>8} {'reruns':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'reruns/s':>9} {'RSS MB':>8}")
+    for sessions in [int(n) for n in args.sessions.split(',')]:
+        result = run_level(sessions, args.iterations, args.timeout)
+        results.append(result)
+        print(
+            f"{result['sessions']:>8} {result['reruns']:>7} {result['p50_ms']:>8.0f} {result['p90_ms']:>8.0f} "
+            f"{result['p99_ms']:>8.0f} {result['max_ms']:>8.0f} {result['reruns_per_second']:>9.2f} {result['peak_rss_mb']:>8.0f}"
+        )
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
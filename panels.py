@@ -0,0 +1,62 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import config
+
+# Shared by every session; NumPy, pandas and the SQLite/Parquet readers release
+# the GIL for much of a panel's work
+_panel_pool = ThreadPoolExecutor(max_workers=config.PANEL_WORKERS, thread_name_prefix='panels')
+
+
+class PanelScheduler:
+    """Builds the independent panels of one rerun concurrently.
+
+    Each panel's query, aggregation and Plotly figure are submitted to a
+    thread pool as soon as its inputs are known; the script thread then
+    asks for the results in layout order, so a rerun waits roughly for the
+    slowest panel instead of the sum of them. Builders must not call
+    Streamlit. A builder may wait on a panel submitted before it (the pool
+    runs jobs in submission order, so that panel is already running).
+    """
+
+    def __init__(self, pool=None):
+        self._pool = pool or _panel_pool
+        self._started = time.perf_counter()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        # name -> (seconds from the scheduler's start to the build starting, seconds building)
+        self._timings = {}
+
+    def submit(self, name, build, *args, **kwargs):
+        """Start building one panel; build(*args, **kwargs) runs on the pool"""
+        def run():
+            started = time.perf_counter()
+            try:
+                return build(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._timings[name] = (started - self._started, time.perf_counter() - started)
+        self._jobs[name] = self._pool.submit(run)
+
+    def __contains__(self, name):
+        return name in self._jobs
+
+    def result(self, name, default=None):
+        """The built panel (waiting for it), or default when it was never submitted"""
+        job = self._jobs.get(name)
+        return default if job is None else job.result()
+
+    def timings(self):
+        """Per-panel start offset and build time in ms, with the elapsed wall time of all of them"""
+        with self._lock:
+            timings = dict(self._timings)
+        report = pd.DataFrame({
+            'panel': list(timings),
+            'start_ms': [start * 1000 for start, _ in timings.values()],
+            'build_ms': [seconds * 1000 for _, seconds in timings.values()]
+        }).sort_values('start_ms').reset_index(drop=True)
+        wall_ms = float((report['start_ms'] + report['build_ms']).max()) if len(report) else 0.0
+        return report, wall_ms
@@ -0,0 +1,194 @@
+import hashlib
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import config
+from data_store import TABLE_COLUMNS, SalesStore
+
+# year=YYYY/month=MM directories, one Parquet file per month partition
+_YEAR_RE = re.compile(r'^year=(\d{4})$')
+_MONTH_RE = re.compile(r'^month=(\d{1,2})$')
+
+# Rows per row group; rows are date-sorted so each group covers a few days
+# and its min/max date statistics let the reader skip it
+ROW_GROUP_SIZE = 50000
+
+
+def write_partitioned(frame, root, row_group_size=ROW_GROUP_SIZE):
+    """Write a sales frame as a year/month partitioned Parquet dataset under root"""
+    frame = frame[TABLE_COLUMNS].sort_values('date', kind='stable')
+    months = frame['date'].dt.to_period('M')
+    written = 0
+    for period, part in frame.groupby(months, sort=True):
+        directory = os.path.join(root, f'year={period.year}', f'month={period.month:02d}')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, 'part-0.parquet')
+        tmp_path = path + '.tmp'
+        table = pa.Table.from_pandas(part, preserve_index=False)
+        pq.write_table(table, tmp_path, row_group_size=row_group_size, write_statistics=True)
+        os.replace(tmp_path, path)
+        written += len(part)
+    return written
+
+
+def list_partitions(root):
+    """Return [(month_start, path)] for every month partition under root"""
+    partitions = []
+    if not os.path.isdir(root):
+        return partitions
+    for year_dir in sorted(os.listdir(root)):
+        year_match = _YEAR_RE.match(year_dir)
+        if not year_match:
+            continue
+        year_path = os.path.join(root, year_dir)
+        for month_dir in sorted(os.listdir(year_path)):
+            month_match = _MONTH_RE.match(month_dir)
+            if not month_match:
+                continue
+            month_path = os.path.join(year_path, month_dir)
+            for name in sorted(os.listdir(month_path)):
+                if name.endswith('.parquet'):
+                    month_start = datetime(int(year_match.group(1)), int(month_match.group(1)), 1)
+                    partitions.append((month_start, os.path.join(month_path, name)))
+    return partitions
+
+
+def partitions_fingerprint(root, partitions):
+    """Fingerprint of a partitioned dataset from each file's path, size and modification time"""
+    digest = hashlib.sha256()
+    for _, path in partitions:
+        info = os.stat(path)
+        digest.update(f'{os.path.relpath(path, root)}:{info.st_size}:{info.st_mtime_ns}\n'.encode())
+    return digest.hexdigest()[:32]
+
+
+def prune_partitions(partitions, start_date, end_date):
+    """Keep only the partitions whose month overlaps start_date..end_date"""
+    start_month = pd.Timestamp(start_date).to_period('M').to_timestamp()
+    end_month = pd.Timestamp(end_date).to_period('M').to_timestamp()
+    return [path for month_start, path in partitions if start_month <= month_start <= end_month]
+
+
+class ParquetSalesStore:
+    """Sales backend over a month-partitioned Parquet dataset.
+
+    A query first prunes whole partitions against the date window, then reads
+    only the table columns from the remaining files with a date filter that
+    pyarrow checks against row-group min/max statistics. The resulting
+    window is held as an in-memory SalesStore so the filter widgets and
+    panels of one view reuse a single read.
+    """
+
+    # Number of recently read date windows kept in memory
+    WINDOW_CACHE_SIZE = 4
+
+    def __init__(self, root, version=1, source=None):
+        self.root = root
+        self.version = version
+        self.source = source or root
+        self.built_at = datetime.now()
+        self.memory_report = None
+        self.sample = None
+        self.default_view = None
+        self.sketches = None
+        self.partitions = list_partitions(root)
+        # Row counts come from the Parquet footers, read once per version
+        self._rows = sum(pq.ParquetFile(path).metadata.num_rows for _, path in self.partitions)
+        self.fingerprint = partitions_fingerprint(root, self.partitions) if self.partitions else None
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+        self.last_read = {'partitions': 0, 'bytes': 0, 'rows': 0}
+
+    def __len__(self):
+        return self._rows
+
+    def read_window(self, start_date, end_date, columns=None):
+        """Read the rows in start_date..end_date, opening only overlapping partitions"""
+        columns = columns or TABLE_COLUMNS
+        paths = prune_partitions(self.partitions, start_date, end_date)
+        if not paths:
+            return pd.DataFrame({c: pd.Series(dtype='datetime64[us]' if c == 'date' else object) for c in columns})
+        dataset = ds.dataset(paths, format='parquet')
+        date_type = dataset.schema.field('date').type
+        predicate = (
+            (ds.field('date') >= pa.scalar(pd.Timestamp(start_date), type=date_type))
+            & (ds.field('date') <= pa.scalar(pd.Timestamp(end_date), type=date_type))
+        )
+        table = dataset.to_table(columns=columns, filter=predicate)
+        self.last_read = {
+            'partitions': len(paths),
+            'bytes': sum(os.path.getsize(p) for p in paths),
+            'rows': table.num_rows
+        }
+        return table.to_pandas()
+
+    def _window(self, start_date, end_date):
+        key = (pd.Timestamp(start_date), pd.Timestamp(end_date))
+        with self._lock:
+            if key in self._windows:
+                self._windows.move_to_end(key)
+                return self._windows[key]
+        window = SalesStore(self.read_window(start_date, end_date), version=self.version, source=self.source)
+        with self._lock:
+            self._windows[key] = window
+            while len(self._windows) > self.WINDOW_CACHE_SIZE:
+                self._windows.popitem(last=False)
+        return window
+
+    # Query interface shared with the other sales backends
+
+    def category_options(self, start_date, end_date):
+        return self._window(start_date, end_date).category_options(start_date, end_date)
+
+    def price_bounds(self, start_date, end_date, categories):
+        return self._window(start_date, end_date).price_bounds(start_date, end_date, categories)
+
+    def region_options(self, start_date, end_date, categories, price_range):
+        return self._window(start_date, end_date).region_options(start_date, end_date, categories, price_range)
+
+    def rows(self, spec, limit=None):
+        return self._window(spec.start_date, spec.end_date).rows(spec, limit=limit)
+
+    def iter_rows(self, spec, chunk_rows):
+        return self._window(spec.start_date, spec.end_date).iter_rows(spec, chunk_rows)
+
+    def kpis(self, spec):
+        return self._window(spec.start_date, spec.end_date).kpis(spec)
+
+    def group_totals(self, spec, dim):
+        return self._window(spec.start_date, spec.end_date).group_totals(spec, dim)
+
+    def aggregation_tree(self, spec):
+        return self._window(spec.start_date, spec.end_date).aggregation_tree(spec)
+
+    def daily_totals(self, spec):
+        return self._window(spec.start_date, spec.end_date).daily_totals(spec)
+
+
+def build_parquet_store(frame=None, version=1, source=None, root=None):
+    """Open the Parquet dataset for one store version (StoreRefresher builder).
+
+    The dataset is read lazily per date window, so the loaded frame is not
+    used; each refresh simply re-lists the partitions to pick up new months.
+    """
+    return ParquetSalesStore(root or config.PARQUET_DIR, version=version, source=source)
+
+
+if __name__ == '__main__':
+    # python parquet_store.py <root> [sales.csv] -- write the dataset partitioned by month
+    from data_store import load_sales_frame
+    if len(sys.argv) < 2:
+        print("usage: python parquet_store.py <root> [sales.csv]")
+        sys.exit(2)
+    sales = load_sales_frame(sys.argv[2] if len(sys.argv) > 2 else None)
+    rows = write_partitioned(sales, sys.argv[1])
+    print(f"Wrote {rows:,} rows into {len(list_partitions(sys.argv[1]))} month partitions under {sys.argv[1]}")
@@ -0,0 +1,155 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import config
+from data_store import SalesStore
+from disk_cache import cached
+from drilldown import spec_key
+
+# Price band grids kept for recently seen (store version, filter) pairs
+GRID_CACHE_SIZE = 32
+
+
+class PriceBandGrid:
+    """Units, sales and rows per category x price step of a selection.
+
+    Step 2 * d holds the rows priced exactly $d and step 2 * d + 1 those
+    priced strictly between $d and $d + 1, so for whole-dollar bounds (which
+    the price slider uses) low <= price <= high holds exactly for the steps
+    2 * low .. 2 * high. The grid is built once per filter without the price
+    predicate; moving the slider slices its steps instead of rescanning
+    rows, and bands() sums the slice into display bands.
+    """
+
+    def __init__(self, categories, first_dollar, units, sales, rows):
+        self.categories = categories  # row labels
+        self.first_dollar = first_dollar  # column 0 is step 2 * first_dollar
+        self.units = units  # arrays shaped (categories, steps)
+        self.sales = sales
+        self.rows = rows
+
+    @classmethod
+    def from_rows(cls, categories, codes, price, quantity, total_price, first_dollar, dollars):
+        """Build from row arrays with one vectorized 2-D bincount per measure.
+
+        codes index into categories; every price must lie in
+        [first_dollar, first_dollar + dollars).
+        """
+        whole = np.floor(price)
+        steps = 2 * (whole.astype(np.int64) - first_dollar) + (price > whole)
+        cells = codes.astype(np.int64) * (2 * dollars) + steps
+        shape = (len(categories), 2 * dollars)
+        size = shape[0] * shape[1]
+
+        def cell_totals(weights=None):
+            return np.bincount(cells, weights=weights, minlength=size).reshape(shape).astype(np.float64)
+
+        return cls(categories, first_dollar, cell_totals(quantity), cell_totals(total_price), cell_totals())
+
+    def bands(self, price_range=None, width=None):
+        """Per category x price band totals of the rows in price_range, as a long frame.
+
+        Band k holds prices in [k * width, (k + 1) * width). Every band between
+        the range ends is returned (empty ones with zeros) for categories with
+        rows in the range.
+        """
+        width = width or config.PRICE_BAND_WIDTH
+        columns = ['category', 'band_low', 'band_high', 'units', 'total_sales', 'rows']
+        first_step = 2 * self.first_dollar
+        low, high = first_step, first_step + self.rows.shape[1] - 1
+        if price_range is not None:
+            low = max(low, 2 * int(np.ceil(price_range[0])))
+            high = min(high, 2 * int(np.floor(price_range[1])))
+        if high < low:
+            return pd.DataFrame(columns=columns)
+
+        # Slice the steps of the range and sum each run of one band
+        steps = slice(low - first_step, high - first_step + 1)
+        band = (np.arange(low, high + 1) // 2) // width
+        starts = np.flatnonzero(np.r_[True, np.diff(band) != 0])
+        units, sales, rows = (np.add.reduceat(array[:, steps], starts, axis=1) for array in (self.units, self.sales, self.rows))
+        present = np.flatnonzero(rows.sum(axis=1))
+        if len(present) == 0:
+            return pd.DataFrame(columns=columns)
+
+        band_low = band[starts] * width
+        count = len(starts)
+        return pd.DataFrame({
+            'category': np.repeat(np.array(self.categories, dtype=object)[present], count),
+            'band_low': np.tile(band_low, len(present)),
+            'band_high': np.tile(band_low + width, len(present)),
+            'units': units[present].ravel().astype(np.int64),
+            'total_sales': sales[present].ravel(),
+            'rows': rows[present].ravel().astype(np.int64)
+        })
+
+
+def price_band_grid(sales_store, spec):
+    """The PriceBandGrid of a filter, ignoring its price range, or None when nothing is selected.
+
+    The in-memory store bins its selected positions directly; other backends
+    stream the selection's rows once and add up one grid per chunk.
+    """
+    spec = spec._replace(price_range=None)
+    bounds = sales_store.price_bounds(spec.start_date, spec.end_date, spec.categories)
+    if bounds is None:
+        return None
+    # price_bounds truncates to whole dollars, so every price is below one past the high bound
+    first_dollar, dollars = bounds[0], bounds[1] - bounds[0] + 1
+
+    if isinstance(sales_store, SalesStore):
+        positions = sales_store.select(spec)
+        frame = sales_store.frame
+        return PriceBandGrid.from_rows(
+            sales_store.labels['category'],
+            sales_store.codes['category'][positions],
+            frame['price'].to_numpy()[positions],
+            frame['quantity'].to_numpy()[positions],
+            frame['total_price'].to_numpy()[positions],
+            first_dollar,
+            dollars
+        )
+
+    categories = sales_store.category_options(spec.start_date, spec.end_date)
+    grid = None
+    for chunk in sales_store.iter_rows(spec, config.EXPORT_CHUNK_ROWS):
+        part = PriceBandGrid.from_rows(
+            categories,
+            pd.Categorical(chunk['category'], categories=categories).codes,
+            chunk['price'].to_numpy(),
+            chunk['quantity'].to_numpy(),
+            chunk['total_price'].to_numpy(),
+            first_dollar,
+            dollars
+        )
+        if grid is None:
+            grid = part
+        else:
+            grid.units += part.units
+            grid.sales += part.sales
+            grid.rows += part.rows
+    return grid
+
+
+_grid_cache = OrderedDict()
+_grid_lock = threading.Lock()
+
+
+def cached_price_band_grid(sales_store, spec):
+    """price_band_grid, cached per store version and filter (and on disk per data fingerprint)"""
+    # The grid covers every price, so slider moves share one entry
+    spec = spec._replace(price_range=None)
+    key = (id(sales_store), sales_store.version, spec_key(spec))
+    with _grid_lock:
+        if key in _grid_cache:
+            _grid_cache.move_to_end(key)
+            return _grid_cache[key]
+    grid = cached(sales_store, ('price_band_grid', spec_key(spec)), lambda: price_band_grid(sales_store, spec))
+    with _grid_lock:
+        _grid_cache[key] = grid
+        while len(_grid_cache) > GRID_CACHE_SIZE:
+            _grid_cache.popitem(last=False)
+    return grid
@@ -0,0 +1,282 @@
+import argparse
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+import plotly.offline
+
+from components import (
+    build_price_distribution_figure,
+    build_regional_sales_figure,
+    build_time_series_figure,
+    build_top_performers_figure,
+    prepare_model_cohorts
+)
+from data_store import TABLE_COLUMNS, FilterSpec, SalesStore, load_sales_frame
+from dimensions import COHORTS, load_model_dimension
+from drilldown import spec_key
+from utils import TIME_PERIODS, format_currency, format_number, get_date_range
+
+# Dashboard periods rendered into the pack: the selector's, except CUSTOM (no fixed range)
+REPORT_PERIODS = [period for period in TIME_PERIODS if period != 'CUSTOM']
+
+# Part of every report's input hash; bump it when the report layout changes
+REPORT_FORMAT_VERSION = 1
+
+# One report: a period and optionally a single region and category (None: all)
+ReportJob = namedtuple('ReportJob', ['period', 'region', 'category'])
+
+# The dataset of this process: set before the pool forks, or rebuilt once per
+# worker from the frame when processes are spawned
+_store = None
+_model_dimension = None
+
+
+def _slug(value, everything):
+    return re.sub(r'[^a-z0-9]+', '-', (value or everything).lower()).strip('-')
+
+
+def report_path(job):
+    """Directory of a report, relative to the pack root"""
+    return os.path.join(job.period, _slug(job.region, 'all-regions'), _slug(job.category, 'all-categories'))
+
+
+def report_spec(job):
+    start_date, end_date = get_date_range(job.period)
+    # Reports cover every price; the dashboard's slider is a per-session choice
+    return FilterSpec(start_date, end_date, [job.category] if job.category else [], None, [job.region] if job.region else [])
+
+
+def report_jobs(sales_store, by_category=False):
+    """Every period x (all + each region) x (all + each category, with by_category) combination"""
+    regions = [None] + list(sales_store.labels['region'])
+    categories = [None] + (list(sales_store.labels['category']) if by_category else [])
+    return [ReportJob(period, region, category) for period in REPORT_PERIODS for region in regions for category in categories]
+
+
+def dimension_digest(model_dimension):
+    """Hash of the model dimension table the cohort charts are built from"""
+    table = model_dimension.table
+    digest = hashlib.sha256(repr(list(table.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(table, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def input_hash(sales_store, job, model_digest=''):
+    """Hash of everything a report is rendered from: its filter, the selected rows and
+    the model dimension (model_digest, from dimension_digest)"""
+    spec = report_spec(job)
+    digest = hashlib.sha256(repr((REPORT_FORMAT_VERSION, spec_key(spec), model_digest)).encode())
+    rows = sales_store.frame[TABLE_COLUMNS].take(sales_store.select(spec))
+    digest.update(pd.util.hash_pandas_object(rows, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _init_worker(frame, model_dimension):
+    global _store, _model_dimension
+    if _store is None:
+        _store = SalesStore(frame)
+    # The table the input hashes were computed from, not a fresh load
+    _model_dimension = model_dimension
+
+
+def _figure_html(figure):
+    return figure.to_html(full_html=False, include_plotlyjs=False)
+
+
+def render_report(job, root, png=False):
+    """Render one report's figures, KPI table and page under root; return (job, seconds)"""
+    started = time.perf_counter()
+    spec = report_spec(job)
+    kpis = _store.kpis(spec)
+    daily = _store.daily_totals(spec)
+    tree = _store.aggregation_tree(spec)
+
+    figures = {
+        'sales_trend': build_time_series_figure(job.period, kpis['total_sales'], daily),
+        # These two show fixed reference values and read no rows
+        'regional_sales': build_regional_sales_figure(None),
+        'top_performers': build_top_performers_figure(None)
+    }
+    level = tree.level(())
+    if not level.empty:
+        figures['price_distribution'] = build_price_distribution_figure(level)
+    for cohort in COHORTS:
+        _, cohorts, figure = prepare_model_cohorts(tree, _model_dimension, cohort)
+        if figure is not None:
+            figures['cohort_' + _slug(cohort, '')] = figure
+
+    directory = os.path.join(root, report_path(job))
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'kpis.json'), 'w') as f:
+        json.dump({**kpis, 'period': job.period, 'region': job.region, 'category': job.category}, f, indent=2)
+    if png:
+        for name, figure in figures.items():
+            figure.write_image(os.path.join(directory, name + '.png'), width=1200, height=500)
+
+    title = f"{job.period} · {job.region or 'All regions'} · {job.category or 'All categories'}"
+    kpi_rows = [
+        ('Total Sales', format_currency(kpis['total_sales'])),
+        ('Average Price', format_currency(kpis['avg_price'])),
+        ('Units Sold', format_number(kpis['total_units'])),
+        ('Top Model', kpis['top_model']),
+        ('Transactions', format_number(kpis['rows']))
+    ]
+    depth = os.path.relpath(root, directory)
+    page = [
+        '<!DOCTYPE html><html><head><meta charset="utf-8">',
+        f'<title>{html.escape(title)}</title>',
+        f'<script src="{depth}/plotly.min.js"></script>',
+        '<style>body{font-family:Arial,sans-serif;margin:24px;color:#333}table{border-collapse:collapse}'
+        'td,th{border:1px solid #ddd;padding:6px 12px;text-align:left}h1{color:#2C82E5}</style></head><body>',
+        f'<h1>{html.escape(title)}</h1>',
+        f'<p>{spec.start_date:%b %d, %Y} – {spec.end_date:%b %d, %Y}</p>',
+        '<table>' + ''.join(f'<tr><th>{name}</th><td>{html.escape(str(value))}</td></tr>' for name, value in kpi_rows) + '</table>'
+    ]
+    page += [_figure_html(figure) for figure in figures.values()]
+    page.append('</body></html>')
+    with open(os.path.join(directory, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(page))
+    return job, time.perf_counter() - started
+
+
+def _write_index(root, manifest):
+    """Top-level page linking every report with its headline KPIs"""
+    lines = [
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Sales report pack</title>',
+        '<style>body{font-family:Arial,sans-serif;margin:24px}td,th{padding:4px 12px;text-align:left}</style></head><body>',
+        f'<h1>Sales report pack</h1><p>Generated {datetime.now():%Y-%m-%d %H:%M}</p>',
+        '<table><tr><th>Report</th><th>Total Sales</th><th>Units</th></tr>'
+    ]
+    for path in sorted(manifest):
+        with open(os.path.join(root, path, 'kpis.json')) as f:
+            kpis = json.load(f)
+        lines.append(
+            f'<tr><td><a href="{path}/index.html">{html.escape(path)}</a></td>'
+            f'<td>{format_currency(kpis["total_sales"])}</td><td>{format_number(kpis["total_units"])}</td></tr>'
+        )
+    lines.append('</table></body></html>')
+    with open(os.path.join(root, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+
+
+def build_pack(sales_store, root, workers=None, by_category=False, png=False, force=False):
+    """Render every report whose inputs changed since the last run; return a summary dict.
+
+    A report that fails to render is listed in the summary's 'failed'
+    ({path: error}) while every other one is still recorded in the manifest.
+    """
+    global _store
+    os.makedirs(root, exist_ok=True)
+    manifest_path = os.path.join(root, 'manifest.json')
+    manifest = {}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    started = time.perf_counter()
+    model_dimension = load_model_dimension()
+    model_digest = dimension_digest(model_dimension)
+    pending = []
+    hashes = {}
+    for job in report_jobs(sales_store, by_category):
+        path = report_path(job)
+        hashes[path] = input_hash(sales_store, job, model_digest)
+        if manifest.get(path) != hashes[path] or not os.path.exists(os.path.join(root, path, 'index.html')):
+            pending.append(job)
+    hash_seconds = time.perf_counter() - started
+
+    # One copy of plotly.js shared by every report page
+    plotly_js = os.path.join(root, 'plotly.min.js')
+    if not os.path.exists(plotly_js):
+        with open(plotly_js, 'w', encoding='utf-8') as f:
+            f.write(plotly.offline.get_plotlyjs())
+
+    render_started = time.perf_counter()
+    failed = {}
+    if pending:
+        # Forked workers inherit the loaded store; spawned ones rebuild it once from the frame
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+        _store = sales_store
+        frame = None if context.get_start_method() == 'fork' else sales_store.frame
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(frame, model_dimension)
+        ) as pool:
+            jobs = {pool.submit(render_report, job, root, png): job for job in pending}
+            for done in as_completed(jobs):
+                path = report_path(jobs[done])
+                try:
+                    done.result()
+                except Exception as error:
+                    # Keep going so the reports that did render are still recorded
+                    failed[path] = error
+                    manifest.pop(path, None)
+                else:
+                    manifest[path] = hashes[path]
+    render_seconds = time.perf_counter() - render_started
+
+    # Forget reports of combinations that no longer exist (e.g. a dropped region)
+    manifest = {path: value for path, value in manifest.items() if path in hashes}
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    _write_index(root, manifest)
+    total_seconds = time.perf_counter() - started
+    return {
+        'reports': len(hashes),
+        'rendered': len(pending) - len(failed),
+        'skipped': len(hashes) - len(pending),
+        'failed': failed,
+        'hash_seconds': hash_seconds,
+        'render_seconds': render_seconds,
+        'total_seconds': total_seconds,
+        'rendered_per_second': (len(pending) - len(failed)) / render_seconds if pending and render_seconds else 0.0,
+        'reports_per_second': len(hashes) / total_seconds if total_seconds else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render the dashboard for every period x region (x category) as a static HTML report pack"
+    )
+    parser.add_argument('--out', default='reports', help="directory of the pack (default: reports)")
+    parser.add_argument('--source', help="sales source to load (default: SALES_DATA_SOURCE)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="render processes (default: one per CPU)")
+    parser.add_argument('--by-category', action='store_true', help="also split every report by product category")
+    parser.add_argument('--png', action='store_true', help="also write each figure as PNG (needs the kaleido package)")
+    parser.add_argument('--force', action='store_true', help="re-render every report even when its inputs are unchanged")
+    args = parser.parse_args()
+
+    if args.png:
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            print("--png needs the kaleido package (pip install kaleido)")
+            sys.exit(2)
+
+    # Load the dataset once; every worker shares this store
+    sales_store = SalesStore(load_sales_frame(args.source))
+    summary = build_pack(sales_store, args.out, args.workers, args.by_category, args.png, args.force)
+    print(
+        f"{summary['reports']} reports: {summary['rendered']} rendered, {summary['skipped']} unchanged, "
+        f"{len(summary['failed'])} failed "
+        f"in {summary['total_seconds']:.1f}s ({summary['reports_per_second']:.1f} reports/s overall, "
+        f"{summary['rendered_per_second']:.1f} rendered/s)"
+    )
+    for path, error in sorted(summary['failed'].items()):
+        print(f"failed: {path}: {error!r}")
+    if summary['failed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
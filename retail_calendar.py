@@ -0,0 +1,222 @@
+import calendar
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+import config
+
+# Weeks in each of the twelve fiscal periods; a 53rd week joins period 12
+WEEKS_PER_PERIOD = (4, 5, 4) * 4
+
+# Fiscal years covered by the shared calendar table
+CALENDAR_FIRST_YEAR = 2000
+CALENDAR_LAST_YEAR = 2050
+
+# Bucket grains of the calendar table, finest first
+GRAINS = ('week', 'period', 'quarter', 'year')
+
+# Fiscal to-date presets: period code -> (grain it starts at, label, grain the trend chart buckets by)
+FISCAL_PRESETS = {
+    'FWTD': ('week', 'Fiscal Week to Date', 'day'),
+    'FPTD': ('period', 'Fiscal Period to Date', 'week'),
+    'FQTD': ('quarter', 'Fiscal Quarter to Date', 'week'),
+    'FYTD': ('year', 'Fiscal Year to Date', 'period')
+}
+
+_EPOCH = date(1970, 1, 1)
+
+
+def fiscal_year_end(year, end_month=None):
+    """Last day of fiscal year `year` (named for the calendar year it starts in):
+    the Saturday nearest the end of end_month"""
+    end_month = end_month or config.FISCAL_YEAR_END_MONTH
+    end_year = year if end_month == 12 else year + 1
+    last = date(end_year, end_month, calendar.monthrange(end_year, end_month)[1])
+    shift = (calendar.SATURDAY - last.weekday()) % 7
+    return last + timedelta(days=shift if shift <= 3 else shift - 7)
+
+
+class RetailCalendar:
+    """Day ordinal -> 4-5-4 fiscal week, period, quarter and year, built once.
+
+    Every day from the first covered fiscal year to the last has a row; the
+    columns are plain arrays indexed by the day's offset from the first
+    day, so bucketing any window is an integer gather followed by a
+    bincount. Each grain also numbers its buckets consecutively and keeps
+    their first days, and comparable holds the same fiscal week and
+    weekday one year earlier (-1 when that year has no such week or is not
+    covered) for like-for-like comparisons.
+    """
+
+    def __init__(self, first_year=CALENDAR_FIRST_YEAR, last_year=CALENDAR_LAST_YEAR, end_month=None):
+        years = np.arange(first_year, last_year + 1)
+        # Day numbers (days since 1970-01-01) of every year's first and last day
+        ends = np.array([(fiscal_year_end(year, end_month) - _EPOCH).days for year in range(first_year - 1, last_year + 1)])
+        starts, ends = ends[:-1] + 1, ends[1:]
+        lengths = ends - starts + 1
+        self.end_month = end_month
+        self.first_day = int(starts[0])
+        self.last_day = int(ends[-1])
+
+        # One row per day: its fiscal year and its offset within that year
+        index = np.repeat(np.arange(len(years)), lengths)
+        day_of_year = np.arange(len(index)) - np.repeat(np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        week = day_of_year // 7
+        week_period = np.append(np.repeat(np.arange(12), WEEKS_PER_PERIOD), 11)
+        period = week_period[week]
+
+        self.year = years[index]
+        self.week = week + 1
+        self.period = period + 1
+        self.quarter = period // 3 + 1
+        self.day_of_year = day_of_year
+
+        # Same week number and weekday in the previous fiscal year
+        previous = index - 1
+        has_prior = (previous >= 0) & (day_of_year < lengths[np.maximum(previous, 0)])
+        self.comparable = np.where(has_prior, starts[np.maximum(previous, 0)] + day_of_year - self.first_day, -1)
+
+        # Consecutive bucket numbers per grain and the first day of each bucket
+        keys = {
+            'week': self.year * 100 + self.week,
+            'period': self.year * 100 + self.period,
+            'quarter': self.year * 100 + self.quarter,
+            'year': self.year
+        }
+        self.buckets = {}
+        self.bucket_first = {}
+        for grain in GRAINS:
+            change = np.r_[True, keys[grain][1:] != keys[grain][:-1]]
+            self.buckets[grain] = np.cumsum(change) - 1
+            self.bucket_first[grain] = np.flatnonzero(change)
+
+    def __len__(self):
+        return len(self.year)
+
+    def ordinals(self, dates):
+        """Row offsets of the given dates (anything np.asarray turns into datetime64);
+        raises ValueError for dates the table does not cover, see covered()"""
+        days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+        outside = (days < self.first_day) | (days > self.last_day)
+        if outside.any():
+            raise ValueError(
+                f"{np.datetime64(int(days[outside][0]), 'D')} is outside the retail calendar "
+                f"({self.span()})"
+            )
+        return days - self.first_day
+
+    def covered(self, dates):
+        """Mask of the dates the table has rows for"""
+        days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+        return (days >= self.first_day) & (days <= self.last_day)
+
+    def span(self):
+        """First and last covered day, for messages"""
+        return f"{self.date(0):%Y-%m-%d} to {self.date(len(self) - 1):%Y-%m-%d}"
+
+    def date(self, ordinal):
+        return pd.Timestamp(np.datetime64(int(self.first_day + ordinal), 'D'))
+
+    def label(self, grain, ordinal):
+        """Fiscal label of the bucket a row belongs to, e.g. 'FY2024 P03'"""
+        year = self.year[ordinal]
+        if grain == 'week':
+            return f"FY{year} W{self.week[ordinal]:02d}"
+        if grain == 'period':
+            return f"FY{year} P{self.period[ordinal]:02d}"
+        if grain == 'quarter':
+            return f"FY{year} Q{self.quarter[ordinal]}"
+        return f"FY{year}"
+
+    def preset_range(self, preset, as_of):
+        """(start, end) of a FISCAL_PRESETS window ending at as_of, read from the table"""
+        grain = FISCAL_PRESETS[preset][0]
+        if not self.covered([as_of])[0]:
+            # Past either end of the shared table: a small table around as_of's fiscal year
+            # gives the same boundaries, since year ends follow from the rule alone
+            year = pd.Timestamp(as_of).year
+            return RetailCalendar(year - 1, year + 1, self.end_month).preset_range(preset, as_of)
+        ordinal = self.ordinals([as_of])[0]
+        first = self.bucket_first[grain][self.buckets[grain][ordinal]]
+        return self.date(first).to_pydatetime(), as_of
+
+    def bucket_totals(self, daily_sales, grain):
+        """Sum daily totals (date, total_price) into fiscal buckets of one grain.
+
+        Returns a frame of each touched bucket's first day, fiscal label,
+        sales and the number of its days present in the input. Days the
+        table does not cover are left out; attrs['uncovered_days'] counts them.
+        """
+        dates = daily_sales['date'].to_numpy() if daily_sales is not None else np.array([], dtype='datetime64[ns]')
+        inside = self.covered(dates)
+        if not inside.any():
+            totals = pd.DataFrame({
+                'date': pd.Series(dtype='datetime64[ns]'), 'label': pd.Series(dtype=object),
+                'total_price': pd.Series(dtype=float), 'days': pd.Series(dtype=np.int64)
+            })
+            totals.attrs['uncovered_days'] = len(dates)
+            return totals
+        ordinals = self.ordinals(dates[inside])
+        buckets = self.buckets[grain][ordinals]
+        first = buckets.min()
+        sales = np.bincount(buckets - first, weights=daily_sales['total_price'].to_numpy(dtype=np.float64)[inside])
+        days = np.bincount(buckets - first)
+        present = np.flatnonzero(days)
+        starts = self.bucket_first[grain][first + present]
+        totals = pd.DataFrame({
+            'date': (self.first_day + starts).astype('datetime64[D]').astype('datetime64[ns]'),
+            'label': [self.label(grain, start) for start in starts],
+            'total_price': sales[present],
+            'days': days[present]
+        })
+        totals.attrs['uncovered_days'] = int((~inside).sum())
+        return totals
+
+    def like_for_like(self, daily_sales, start_date, end_date):
+        """Sales of a window against the comparable fiscal days one year earlier.
+
+        daily_sales must reach back to the comparable days. Days of the
+        window without a comparable day (a 53rd week) are left out of both
+        totals, and so are days the table does not cover, which
+        'uncovered_days' counts. Returns current, prior, their ratio and the
+        days compared.
+        """
+        start, end = pd.Timestamp(start_date).floor('D'), pd.Timestamp(end_date).floor('D')
+        # Clip the window to the table
+        first = max((start - self.date(0)).days, 0)
+        last = min((end - self.date(0)).days, len(self) - 1)
+        uncovered = max((end - start).days + 1, 0) - max(last - first + 1, 0)
+        window = np.arange(first, last + 1)
+        window = window[self.comparable[window] >= 0]
+        if len(window) == 0 or daily_sales is None or daily_sales.empty:
+            return {'current': 0.0, 'prior': 0.0, 'ratio': float('nan'), 'days': 0, 'uncovered_days': uncovered}
+        # Dense daily values over the calendar rows the comparison reads
+        base = int(self.comparable[window].min())
+        dates = daily_sales['date'].to_numpy()
+        # Uncovered sales days become -1, which the range check below drops
+        ordinals = np.where(self.covered(dates), dates.astype('datetime64[D]').astype(np.int64) - self.first_day - base, -1)
+        inside = (ordinals >= 0) & (ordinals <= window[-1] - base)
+        values = np.bincount(
+            ordinals[inside], weights=daily_sales['total_price'].to_numpy(dtype=np.float64)[inside], minlength=window[-1] - base + 1
+        )
+        current = float(values[window - base].sum())
+        prior = float(values[self.comparable[window] - base].sum())
+        return {
+            'current': current, 'prior': prior, 'ratio': current / prior if prior else float('nan'),
+            'days': len(window), 'uncovered_days': uncovered
+        }
+
+
+_calendar = None
+_calendar_lock = threading.Lock()
+
+
+def retail_calendar():
+    """The shared RetailCalendar, built on first use"""
+    global _calendar
+    with _calendar_lock:
+        if _calendar is None:
+            _calendar = RetailCalendar()
+        return _calendar
@@ -0,0 +1,225 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import config
+from disk_cache import cached
+from drilldown import HIERARCHY, AggregationTree, cached_aggregation_tree, spec_key
+
+# Two-sided 95% normal quantile for the confidence intervals
+Z_95 = 1.959964
+
+# Days per date stratum; every category x region pair is split into these
+STRATUM_DAYS = 7
+
+# Background exact computations kept for recently seen (store version, filter) pairs
+EXACT_JOB_CACHE_SIZE = 32
+
+
+class StratifiedSample:
+    """Stratified random sample of a SalesStore with per-stratum expansion weights.
+
+    Strata are week x category x region cells. Each stratum keeps
+    ceil(fraction * rows) of its rows, and at least two where it has them
+    so its variance can be estimated. A filter is applied to the sampled
+    rows, and totals are estimated stratum by stratum as rows in stratum
+    times the mean of the filtered value over its sampled rows.
+    """
+
+    def __init__(self, sales_store, fraction=None, seed=0):
+        fraction = config.SAMPLE_FRACTION if fraction is None else fraction
+        rng = np.random.default_rng(seed)
+
+        # Stratum id of every row of the store
+        weeks = sales_store.days // STRATUM_DAYS
+        regions = len(sales_store.labels['region'])
+        keys = (weeks - weeks.min()) * (len(sales_store.labels['category']) * regions)
+        keys += sales_store.codes['category'].astype(np.int64) * regions + sales_store.codes['region']
+        _, row_strata = np.unique(keys, return_inverse=True)
+        stratum_rows = np.bincount(row_strata)
+        stratum_sampled = np.minimum(stratum_rows, np.maximum(2, np.ceil(fraction * stratum_rows))).astype(np.int64)
+
+        # Shuffle within each stratum and keep its first stratum_sampled rows
+        order = np.lexsort((rng.random(len(row_strata)), row_strata))
+        starts = np.concatenate([[0], np.cumsum(stratum_rows)[:-1]])
+        rank = np.arange(len(order)) - starts[row_strata[order]]
+        positions = np.sort(order[rank < stratum_sampled[row_strata[order]]])
+
+        self.rows = len(row_strata)
+        self.stratum_rows = stratum_rows.astype(np.float64)
+        self.stratum_sampled = stratum_sampled.astype(np.float64)
+        self.strata = row_strata[positions]
+        self.weights = (self.stratum_rows / self.stratum_sampled)[self.strata]
+
+        # Columns of the sampled rows, widened to float64 for the estimators
+        frame = sales_store.frame
+        self.dates = sales_store.dates[positions]
+        self.days = sales_store.days[positions]
+        self.codes = {dim: sales_store.codes[dim][positions] for dim in sales_store.codes}
+        self.labels = sales_store.labels
+        self.code_of = sales_store.code_of
+        self.price = frame['price'].to_numpy(dtype=np.float64)[positions]
+        self.total_price = frame['total_price'].to_numpy(dtype=np.float64)[positions]
+        self.quantity = frame['quantity'].to_numpy(dtype=np.float64)[positions]
+
+    def __len__(self):
+        return len(self.strata)
+
+    def _selected(self, spec):
+        """0/1 indicator of the sampled rows matching the filter"""
+        mask = (self.dates >= np.datetime64(spec.start_date)) & (self.dates <= np.datetime64(spec.end_date))
+        mask &= (self.price >= spec.price_range[0]) & (self.price <= spec.price_range[1])
+        for dim, values in (('category', spec.categories), ('region', spec.regions)):
+            if values:
+                lookup = np.zeros(len(self.labels[dim]), dtype=bool)
+                lookup[[self.code_of[dim][v] for v in values if v in self.code_of[dim]]] = True
+                mask &= lookup[self.codes[dim]]
+        return mask.astype(np.float64)
+
+    def _total(self, values):
+        """Estimated population total of a per-row value, and the variance of the estimate"""
+        sampled, rows = self.stratum_sampled, self.stratum_rows
+        sums = np.bincount(self.strata, weights=values, minlength=len(rows))
+        squares = np.bincount(self.strata, weights=values * values, minlength=len(rows))
+        means = sums / sampled
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variances = np.where(sampled > 1, (squares - sampled * means * means) / (sampled - 1), 0.0)
+        # Finite population correction: fully sampled strata contribute no variance
+        variance = rows * rows * (1 - sampled / rows) * np.maximum(variances, 0) / sampled
+        return float(rows @ means), float(variance.sum())
+
+    def estimate_kpis(self, spec):
+        """KPI row estimates for the selection, with 95% confidence half-widths in 'margins'"""
+        selected = self._selected(spec)
+        rows, rows_var = self._total(selected)
+        sales, sales_var = self._total(self.total_price * selected)
+        units, units_var = self._total(self.quantity * selected)
+        if rows <= 0:
+            return {'total_sales': 0.0, 'avg_price': 0.0, 'total_units': 0, 'top_model': 'N/A', 'rows': 0,
+                    'margins': None, 'relative_error': float('inf'), 'sample_rows': 0}
+
+        # Average price is a ratio of two totals; linearize it for the variance
+        price_total, _ = self._total(self.price * selected)
+        avg_price = price_total / rows
+        _, residual_var = self._total((self.price - avg_price) * selected)
+        avg_price_var = residual_var / (rows * rows)
+
+        model_sales = np.bincount(
+            self.codes['model'], weights=self.weights * self.total_price * selected, minlength=len(self.labels['model'])
+        )
+        margins = {
+            'total_sales': Z_95 * np.sqrt(sales_var),
+            'avg_price': Z_95 * np.sqrt(avg_price_var),
+            'total_units': Z_95 * np.sqrt(units_var),
+            'rows': Z_95 * np.sqrt(rows_var)
+        }
+        relative = [
+            margins[name] / abs(value) if value else float('inf')
+            for name, value in (('total_sales', sales), ('avg_price', avg_price), ('total_units', units))
+        ]
+        return {
+            'total_sales': sales,
+            'avg_price': avg_price,
+            'total_units': int(round(units)),
+            'top_model': str(self.labels['model'][int(np.argmax(model_sales))]),
+            'rows': int(round(rows)),
+            'margins': margins,
+            'relative_error': max(relative),
+            'sample_rows': int(selected.sum())
+        }
+
+    def daily_totals(self, spec):
+        """Estimated sales per calendar day of the selection"""
+        selected = self._selected(spec) > 0
+        if not selected.any():
+            return pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'), 'total_price': pd.Series(dtype=float)})
+        days = self.days[selected]
+        first = days.min()
+        sales = np.bincount(days - first, weights=(self.weights * self.total_price)[selected])
+        present = np.flatnonzero(np.bincount(days - first))
+        dates = (first + present).astype('datetime64[D]').astype('datetime64[ns]')
+        return pd.DataFrame({'date': dates, 'total_price': sales[present]})
+
+    def aggregation_tree(self, spec):
+        """Estimated category x model x region aggregates of the selection"""
+        selected = self._selected(spec) > 0
+        shape = tuple(len(self.labels[dim]) for dim in HIERARCHY)
+        cells = np.ravel_multi_index(tuple(self.codes[dim][selected] for dim in HIERARCHY), shape)
+        weights = self.weights[selected]
+        size = int(np.prod(shape))
+
+        def cell_totals(values=None):
+            cell_weights = weights if values is None else weights * values[selected]
+            return np.bincount(cells, weights=cell_weights, minlength=size).reshape(shape)
+
+        return AggregationTree(
+            {dim: self.labels[dim] for dim in HIERARCHY},
+            cell_totals(self.total_price),
+            np.round(cell_totals(self.quantity)),
+            cell_totals(self.price),
+            cell_totals()
+        )
+
+
+def build_sample(sales_store):
+    """Stratified sample of the store, or None when sampling is disabled"""
+    if config.SAMPLE_FRACTION <= 0 or len(sales_store) == 0:
+        return None
+    return StratifiedSample(sales_store)
+
+
+_exact_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='exact-views')
+_exact_jobs = OrderedDict()
+_exact_lock = threading.Lock()
+
+
+def exact_views(sales_store, spec, history_spec):
+    """Exact KPIs, daily history and aggregation tree of the selection (through the disk cache)"""
+    return {
+        'kpis': cached(sales_store, ('kpis', spec_key(spec)), lambda: sales_store.kpis(spec)),
+        'daily_history': cached(
+            sales_store, ('daily_totals', spec_key(history_spec)), lambda: sales_store.daily_totals(history_spec)
+        ),
+        'tree': cached_aggregation_tree(sales_store, spec)
+    }
+
+
+def exact_in_background(sales_store, spec, history_spec):
+    """Future for exact_views, submitted at most once per store version and filter"""
+    key = (id(sales_store), sales_store.version, spec_key(spec), spec_key(history_spec))
+    with _exact_lock:
+        if key in _exact_jobs:
+            _exact_jobs.move_to_end(key)
+            return _exact_jobs[key]
+        job = _exact_pool.submit(exact_views, sales_store, spec, history_spec)
+        _exact_jobs[key] = job
+        while len(_exact_jobs) > EXACT_JOB_CACHE_SIZE:
+            _exact_jobs.popitem(last=False)
+    return job
+
+
+def progressive_views(sales_store, spec, history_spec):
+    """Views for this rerun, and the pending exact computation if they are estimates.
+
+    Selections of at least SAMPLE_MIN_ROWS whose sample estimates reach
+    SAMPLE_ERROR_TARGET are answered from the sample while the exact views
+    are computed in the background; once that has finished (or when the
+    sample cannot answer) the exact views are returned and nothing is pending.
+    """
+    sample = sales_store.sample
+    if sample is not None:
+        estimate = sample.estimate_kpis(spec)
+        if estimate['rows'] >= config.SAMPLE_MIN_ROWS and estimate['relative_error'] <= config.SAMPLE_ERROR_TARGET:
+            job = exact_in_background(sales_store, spec, history_spec)
+            if job.done():
+                return job.result(), None
+            views = {
+                'kpis': estimate,
+                'daily_history': sample.daily_totals(history_spec),
+                'tree': sample.aggregation_tree(spec)
+            }
+            return views, job
+    return exact_views(sales_store, spec, history_spec), None
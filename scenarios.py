@@ -0,0 +1,157 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from data_store import SalesStore
+from drilldown import HIERARCHY, AggregationTree
+
+# One what-if price change: cells whose model, category and region are in the
+# given lists (an empty list matches every value) get their prices scaled by
+# 1 + price_change, and their units by (1 + price_change) ** elasticity
+Adjustment = namedtuple('Adjustment', ['models', 'categories', 'regions', 'price_change', 'elasticity'])
+
+# Constant price elasticity of demand assumed when none is given
+DEFAULT_ELASTICITY = -1.5
+
+# Adjustment fields holding the label lists of each cube dimension
+_ADJUSTMENT_FIELDS = {'category': 'categories', 'model': 'models', 'region': 'regions'}
+
+
+def _cell_masks(tree, adjustments):
+    """Boolean (adjustments, categories, models, regions) masks of the cells each adjustment applies to.
+
+    Each mask is the outer product of one keep vector per dimension, so the
+    masks of all adjustments are built with one broadcast AND per dimension.
+    """
+    shape = tuple(len(tree.labels[dim]) for dim in HIERARCHY)
+    masks = np.ones((len(adjustments),) + shape, dtype=bool)
+    for axis, dim in enumerate(HIERARCHY):
+        labels = np.array(tree.labels[dim], dtype=object)
+        keep = np.ones((len(adjustments), len(labels)), dtype=bool)
+        for index, adjustment in enumerate(adjustments):
+            values = getattr(adjustment, _ADJUSTMENT_FIELDS[dim])
+            if values:
+                keep[index] = np.isin(labels, list(values))
+        expand = [len(adjustments)] + [1] * len(HIERARCHY)
+        expand[axis + 1] = len(labels)
+        masks &= keep.reshape(expand)
+    return masks
+
+
+def _changes(adjustments):
+    """Price multipliers and elasticities of adjustments as arrays"""
+    changes = 1.0 + np.array([adjustment.price_change for adjustment in adjustments], dtype=np.float64)
+    elasticities = np.array([
+        DEFAULT_ELASTICITY if adjustment.elasticity is None else adjustment.elasticity for adjustment in adjustments
+    ], dtype=np.float64)
+    return changes, elasticities
+
+
+# Index that turns a per-adjustment vector into (adjustments, 1, 1, 1) for broadcasting over cells
+_PER_CELL = (slice(None),) + (np.newaxis,) * len(HIERARCHY)
+
+
+def scenario_factors(tree, scenarios):
+    """Price and unit multipliers per scenario and cell, each shaped (scenarios, categories, models, regions).
+
+    A scenario is a list of Adjustments; overlapping adjustments compound.
+    The adjustments of every scenario are masked and scaled in one batch,
+    then multiplied into their scenario's slice with np.multiply.at.
+    """
+    shape = (len(scenarios),) + tuple(len(tree.labels[dim]) for dim in HIERARCHY)
+    price_factor = np.ones(shape)
+    unit_factor = np.ones(shape)
+    adjustments = [adjustment for scenario in scenarios for adjustment in scenario]
+    if not adjustments:
+        return price_factor, unit_factor
+    owner = np.repeat(np.arange(len(scenarios)), [len(scenario) for scenario in scenarios])
+    masks = _cell_masks(tree, adjustments)
+    changes, elasticities = _changes(adjustments)
+    np.multiply.at(price_factor, owner, np.where(masks, changes[_PER_CELL], 1.0))
+    np.multiply.at(unit_factor, owner, np.where(masks, (changes ** elasticities)[_PER_CELL], 1.0))
+    return price_factor, unit_factor
+
+
+def _factor_kpis(tree, price_factor, unit_factor):
+    """KPI rows of the cube under each (scenario) slice of the factors; slice 0 must be the baseline"""
+    sales = tree.sales[np.newaxis] * price_factor * unit_factor
+    units = tree.units[np.newaxis] * unit_factor
+    price_sum = tree.price_sum[np.newaxis] * price_factor
+    rows = tree.rows.sum()
+
+    total_sales = sales.sum(axis=(1, 2, 3))
+    model_sales = sales.sum(axis=(1, 3))
+    models = np.array(tree.labels['model'], dtype=object)
+    results = pd.DataFrame({
+        'total_sales': total_sales,
+        'total_units': units.sum(axis=(1, 2, 3)),
+        'avg_price': price_sum.sum(axis=(1, 2, 3)) / rows if rows else 0.0,
+        'top_model': models[model_sales.argmax(axis=1)] if len(models) else 'N/A'
+    })
+    results['sales_change'] = results['total_sales'] / results['total_sales'].iloc[0] - 1 if total_sales[0] else 0.0
+    results['units_change'] = results['total_units'] / results['total_units'].iloc[0] - 1 if units.sum() else 0.0
+    return results
+
+
+def evaluate_scenarios(tree, scenarios):
+    """KPI row values of every scenario, from one batched pass over the rollup cube.
+
+    Within a cell a uniform price and unit change scales sales by the product
+    of the two factors, so the category x model x region cube of the
+    selection is enough for exact scenario totals. Row 0 of the result is
+    the baseline (no adjustments), followed by the scenarios in order.
+    """
+    price_factor, unit_factor = scenario_factors(tree, [[]] + list(scenarios))
+    return _factor_kpis(tree, price_factor, unit_factor)
+
+
+def price_sweep(tree, adjustment, price_changes):
+    """evaluate_scenarios over one adjustment at each price change, indexed by the change.
+
+    The adjustment's cells are masked once and every change is broadcast
+    over them, with a zero change first as the baseline.
+    """
+    mask = _cell_masks(tree, [adjustment])
+    changes = 1.0 + np.r_[0.0, np.asarray(price_changes, dtype=np.float64)]
+    elasticity = DEFAULT_ELASTICITY if adjustment.elasticity is None else adjustment.elasticity
+    price_factor = np.where(mask, changes[_PER_CELL], 1.0)
+    unit_factor = np.where(mask, (changes ** elasticity)[_PER_CELL], 1.0)
+    results = _factor_kpis(tree, price_factor, unit_factor).iloc[1:]
+    results.index = pd.Index(list(price_changes), name='price_change')
+    return results
+
+
+def scenario_tree(tree, scenario):
+    """The aggregation tree of the selection under one scenario (the simulator's category breakdown)"""
+    price_factor, unit_factor = scenario_factors(tree, [scenario])
+    return AggregationTree(
+        tree.labels,
+        tree.sales * price_factor[0] * unit_factor[0],
+        tree.units * unit_factor[0],
+        tree.price_sum * price_factor[0],
+        tree.rows
+    )
+
+
+def scenario_daily_totals(sales_store, spec, scenario):
+    """Sales per calendar day of the selection under one scenario, or None for backends without rows in memory.
+
+    Each selected row's sales are scaled by its cell's combined factor,
+    gathered by cell code, and summed per day.
+    """
+    if not isinstance(sales_store, SalesStore):
+        return None
+    positions = sales_store.select(spec)
+    if len(positions) == 0:
+        return pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'), 'total_price': pd.Series(dtype=float)})
+    cube = AggregationTree({dim: sales_store.labels[dim] for dim in HIERARCHY}, None, None, None, None)
+    price_factor, unit_factor = scenario_factors(cube, [scenario])
+    shape = price_factor.shape[1:]
+    cells = np.ravel_multi_index(tuple(sales_store.codes[dim][positions] for dim in HIERARCHY), shape)
+    sales = sales_store.frame['total_price'].to_numpy()[positions] * (price_factor[0] * unit_factor[0]).ravel()[cells]
+    offsets = sales_store.days[positions] - sales_store.days[positions[0]]
+    totals = np.bincount(offsets, weights=sales)
+    present = np.flatnonzero(np.bincount(offsets))
+    dates = (sales_store.days[positions[0]] + present).astype('datetime64[D]').astype('datetime64[ns]')
+    return pd.DataFrame({'date': dates, 'total_price': totals[present]})
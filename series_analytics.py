@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+# Overlays offered on the trend charts: name -> (kind, parameter). Rolling and
+# EWMA overlays are daily sales, the cumulative overlay is the running total
+# from the window's first day, and the YoY overlay is the change of the
+# trailing mean over parameter days against 52 weeks earlier (a fraction)
+OVERLAYS = {
+    '7-day average': ('rolling', 7),
+    '28-day average': ('rolling', 28),
+    '90-day average': ('rolling', 90),
+    'EWMA (14-day span)': ('ewma', 14),
+    'Cumulative total': ('cumulative', None),
+    'YoY change (28-day)': ('yoy', 28)
+}
+
+# Days of history needed before a window so every overlay and the
+# year-over-year comparison are complete on the window's first day
+LOOKBACK_DAYS = 90 + 364
+
+# Year-over-year compares against the same weekday 52 weeks earlier
+YOY_LAG_DAYS = 364
+
+
+def dense_daily(daily_sales, start_date, end_date):
+    """Spread sparse daily totals over every day from start_date to end_date.
+
+    Returns (days, values): a datetime64[D] array and a float64 array with zero
+    for days without sales.
+    """
+    first = np.datetime64(pd.Timestamp(start_date).floor('D'), 'D')
+    last = np.datetime64(pd.Timestamp(end_date).floor('D'), 'D')
+    days = np.arange(first, last + 1)
+    values = np.zeros(len(days))
+    if len(daily_sales):
+        offsets = (daily_sales['date'].to_numpy().astype('datetime64[D]') - first).astype(np.int64)
+        inside = (offsets >= 0) & (offsets < len(days))
+        np.add.at(values, offsets[inside], daily_sales['total_price'].to_numpy(dtype=np.float64)[inside])
+    return days, values
+
+
+def rolling_mean(values, window):
+    """Trailing mean over window days; the first days average what is available"""
+    sums = np.cumsum(values)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return sums / counts
+
+
+def ewma(values, span):
+    """Exponentially weighted moving average, y[t] = a * x[t] + (1 - a) * y[t - 1].
+
+    Within a block the recursion is unrolled into a cumulative sum of
+    rescaled values; blocks are short enough that the rescaling cannot
+    overflow and each block starts from the previous block's last value.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return values.copy()
+    alpha = 2.0 / (span + 1.0)
+    decay = 1.0 - alpha
+    block = max(1, int(600 / -np.log(decay)))
+    result = np.empty_like(values)
+    previous = values[0]
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        steps = np.arange(1, len(chunk) + 1)
+        powers = decay ** steps
+        # y[k] = decay^k * (y[-1] + sum_{j<=k} alpha * x[j] / decay^j)
+        result[start:start + len(chunk)] = powers * (previous + np.cumsum(alpha * chunk / powers))
+        previous = result[start + len(chunk) - 1]
+    return result
+
+
+def cumulative(values):
+    """Running total"""
+    return np.cumsum(values)
+
+
+def year_over_year(values, lag=YOY_LAG_DAYS):
+    """Ratio of each day to the day lag days earlier (NaN where there is no prior value)"""
+    ratio = np.full(len(values), np.nan)
+    if len(values) > lag:
+        prior = values[:-lag]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio[lag:] = np.where(prior > 0, values[lag:] / prior, np.nan)
+    return ratio
+
+
+def compute_overlays(daily_history, start_date, end_date, names):
+    """Compute the named overlays from one daily series and clip them to the window.
+
+    daily_history must reach LOOKBACK_DAYS before start_date so windows are
+    complete from the first day; nothing beyond that series is read.
+    """
+    history_start = pd.Timestamp(start_date) - pd.Timedelta(days=LOOKBACK_DAYS)
+    days, values = dense_daily(daily_history, history_start, end_date)
+    visible = days >= np.datetime64(pd.Timestamp(start_date).floor('D'), 'D')
+    overlays = {}
+    for name in names:
+        kind, parameter = OVERLAYS[name]
+        if kind == 'cumulative':
+            overlays[name] = pd.DataFrame({'date': days[visible], 'value': cumulative(values[visible])})
+            continue
+        if kind == 'rolling':
+            series = rolling_mean(values, parameter)
+        elif kind == 'ewma':
+            series = ewma(values, parameter)
+        else:
+            series = year_over_year(rolling_mean(values, parameter)) - 1
+        overlays[name] = pd.DataFrame({'date': days[visible], 'value': series[visible]})
+    return overlays
+
+
+def summarize_window(daily_history, start_date, end_date):
+    """Cumulative total of the window and its year-over-year change on a 28-day basis"""
+    history_start = pd.Timestamp(start_date) - pd.Timedelta(days=LOOKBACK_DAYS)
+    days, values = dense_daily(daily_history, history_start, end_date)
+    visible = days >= np.datetime64(pd.Timestamp(start_date).floor('D'), 'D')
+    yoy = year_over_year(rolling_mean(values, 28))
+    return {
+        'cumulative': float(cumulative(values[visible])[-1]) if visible.any() else 0.0,
+        'yoy_ratio': float(yoy[-1]) if len(yoy) else float('nan')
+    }
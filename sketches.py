@@ -0,0 +1,280 @@
+import hashlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import config
+
+# Two-sided 95% normal quantile for the error bounds
+Z_95 = 1.959964
+
+# Bits of a sketch key given to the category and region codes (at most 4096 labels each)
+CODE_BITS = 12
+
+# Display names of the distinct-count KPIs
+DISTINCT_COUNT_LABELS = {
+    'model': 'Active Models Sold',
+    'store': 'Distinct Stores',
+    'customer': 'Distinct Customers'
+}
+
+
+def _bit_length(values):
+    """Number of significant bits of every uint64, computed exactly in two 32-bit halves"""
+    high, low = values >> np.uint64(32), values & np.uint64(0xFFFFFFFF)
+    high_bits = np.frexp(high.astype(np.float64))[1]
+    low_bits = np.frexp(low.astype(np.float64))[1]
+    return np.where(high > 0, 32 + high_bits, low_bits)
+
+
+def _hash_values(values):
+    """64-bit hashes of a column's values (equal values hash equally across frames and dtypes)"""
+    codes, uniques = pd.factorize(values)
+    hashes = pd.util.hash_array(np.asarray(uniques.astype(str), dtype=object))
+    return hashes[codes]
+
+
+def hll_estimate(registers):
+    """HyperLogLog cardinality estimate of one register array, with linear counting for small sets"""
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if raw <= 2.5 * m and zeros:
+        return m * np.log(m / zeros)
+    return raw
+
+
+class DistinctSketches:
+    """Mergeable HyperLogLog sketches of distinct values per day x category x region cell.
+
+    Each counted column keeps, sparsely, the non-zero registers of every
+    cell's sketch: one sorted int64 key per (day, category, region,
+    register) with the register's rank. A distinct count for a window and
+    filter merges (register-wise max) only the cells it selects, so no rows
+    are hashed at query time. Sketches are immutable; extended() returns new
+    ones with more rows added, so a store version can keep serving its own.
+
+    The estimate's relative standard error is about 1.04 / sqrt(2 ** precision)
+    (1.6% at the default precision of 12); small sets are counted by linear
+    counting and are far more accurate. The price filter does not apply:
+    cells have no price dimension.
+    """
+
+    def __init__(self, columns, precision=None):
+        self.columns = list(columns)
+        self.precision = precision or config.HLL_PRECISION
+        # The sketches' own label codes; they only grow, so keys stay valid across versions
+        self.code_of = {'category': {}, 'region': {}}
+        self.keys = {column: np.empty(0, dtype=np.int64) for column in self.columns}
+        self.ranks = {column: np.empty(0, dtype=np.uint8) for column in self.columns}
+        # Rows summarized so far and a running digest of their contents
+        # (used to recognize an append-only new version)
+        self.rows = 0
+        self.digest = hashlib.sha256()
+        # Sketches of the partitions these were merged from, by partition fingerprint
+        # (Parquet backends reuse the ones of unchanged partitions on refresh)
+        self.parts = {}
+
+    @property
+    def relative_error(self):
+        """Relative standard error of the estimates"""
+        return 1.04 / np.sqrt(1 << self.precision)
+
+    def _codes(self, dim, values):
+        codes, uniques = pd.factorize(values)
+        lookup = self.code_of[dim]
+        for label in uniques:
+            lookup.setdefault(str(label), len(lookup))
+        if len(lookup) > 1 << CODE_BITS:
+            raise ValueError(f"too many {dim} labels for the distinct-count sketches")
+        return np.array([lookup[str(label)] for label in uniques], dtype=np.int64)[codes]
+
+    def _cell_entries(self, frame, column):
+        """Sorted keys and ranks of one frame's rows for one column, one entry per cell register"""
+        p = self.precision
+        hashes = _hash_values(frame[column])
+        # The top p bits pick the register; the rank is the position of the first 1 bit after them
+        registers = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        ranks = (64 - p - _bit_length(rest) + 1).astype(np.uint8)
+        days = frame['date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+        cells = (days << CODE_BITS | self._codes('category', frame['category'])) << CODE_BITS | self._codes('region', frame['region'])
+        return cells << p | registers, ranks
+
+    def _row_hashes(self, frame):
+        """Bytes of per-row hashes of the columns the sketches read, for the running digest"""
+        columns = ['date', 'category', 'region'] + self.columns
+        return pd.util.hash_pandas_object(frame[columns], index=False).to_numpy().tobytes()
+
+    @staticmethod
+    def _reduce(keys, ranks):
+        """Keep the highest rank of every key, sorted by key"""
+        order = np.lexsort((ranks, keys))
+        keys, ranks = keys[order], ranks[order]
+        last = np.r_[keys[1:] != keys[:-1], True] if len(keys) else np.zeros(0, dtype=bool)
+        return keys[last], ranks[last]
+
+    def extended(self, frames):
+        """New sketches with the rows of the given frames (any iterable, e.g. streamed chunks) added to these"""
+        sketches = DistinctSketches(self.columns, self.precision)
+        sketches.code_of = {dim: dict(lookup) for dim, lookup in self.code_of.items()}
+        sketches.rows, sketches.digest = self.rows, self.digest.copy()
+        sketches.keys, sketches.ranks = dict(self.keys), dict(self.ranks)
+        for frame in frames:
+            if not len(frame):
+                continue
+            sketches.rows += len(frame)
+            sketches.digest.update(sketches._row_hashes(frame))
+            # Merge every chunk into the running registers at once, so memory stays
+            # bounded by the non-zero cell registers rather than the rows streamed
+            for column in self.columns:
+                frame_keys, frame_ranks = sketches._cell_entries(frame, column)
+                sketches.keys[column], sketches.ranks[column] = self._reduce(
+                    np.concatenate([sketches.keys[column], frame_keys]),
+                    np.concatenate([sketches.ranks[column], frame_ranks])
+                )
+        return sketches
+
+    @classmethod
+    def merged(cls, parts, columns, precision=None):
+        """Union of sketches built separately, with their label codes remapped to shared ones"""
+        sketches = cls(columns, precision)
+        p = sketches.precision
+        low = (1 << CODE_BITS) - 1
+        keys = {column: [] for column in sketches.columns}
+        ranks = {column: [] for column in sketches.columns}
+        for part in parts:
+            sketches.rows += part.rows
+            sketches.digest.update(part.digest.digest())
+            # part.code_of lists labels in code order, so position i maps part code i
+            remap = {
+                dim: sketches._codes(dim, pd.Series(list(lookup), dtype=object)) if lookup else np.zeros(0, dtype=np.int64)
+                for dim, lookup in part.code_of.items()
+            }
+            for column in sketches.columns:
+                part_keys = part.keys[column]
+                region = remap['region'][(part_keys >> p) & low]
+                category = remap['category'][(part_keys >> (CODE_BITS + p)) & low]
+                days = part_keys >> (2 * CODE_BITS + p)
+                keys[column].append((((days << CODE_BITS | category) << CODE_BITS | region) << p) | (part_keys & ((1 << p) - 1)))
+                ranks[column].append(part.ranks[column])
+        for column in sketches.columns:
+            if keys[column]:
+                sketches.keys[column], sketches.ranks[column] = cls._reduce(
+                    np.concatenate(keys[column]), np.concatenate(ranks[column])
+                )
+        return sketches
+
+    def appended_rows(self, frame):
+        """Rows of a frame after the summarized ones, or None when the frame does not start
+        with exactly the summarized rows (then the sketches must be rebuilt)"""
+        if self.rows == 0:
+            return frame
+        if len(frame) < self.rows:
+            return None
+        if hashlib.sha256(self._row_hashes(frame.iloc[:self.rows])).digest() != self.digest.digest():
+            return None
+        return frame.iloc[self.rows:]
+
+    def registers(self, column, start_date, end_date, categories=None, regions=None):
+        """Dense registers of the union of the cells in the date window and label filters"""
+        p = self.precision
+        shift = 2 * CODE_BITS + p
+        first = np.datetime64(pd.Timestamp(start_date).floor('D'), 'D').astype(np.int64)
+        last = np.datetime64(pd.Timestamp(end_date).floor('D'), 'D').astype(np.int64)
+        keys, ranks = self.keys[column], self.ranks[column]
+        # Keys are sorted and start with the day, so the window is one slice
+        window = slice(*np.searchsorted(keys, [first << shift, (last + 1) << shift]))
+        keys, ranks = keys[window], ranks[window]
+        mask = np.ones(len(keys), dtype=bool)
+        for dim, values, offset in (('category', categories, CODE_BITS + p), ('region', regions, p)):
+            if values:
+                lookup = np.zeros(1 << CODE_BITS, dtype=bool)
+                lookup[[self.code_of[dim][v] for v in values if v in self.code_of[dim]]] = True
+                mask &= lookup[(keys >> offset) & ((1 << CODE_BITS) - 1)]
+        registers = np.zeros(1 << p, dtype=np.uint8)
+        np.maximum.at(registers, keys[mask] & ((1 << p) - 1), ranks[mask])
+        return registers
+
+    def count(self, column, spec):
+        """Estimated distinct values of column in the selection (date, category and region filters)"""
+        return hll_estimate(self.registers(column, spec.start_date, spec.end_date, spec.categories, spec.regions))
+
+
+def _partition_sketches(sales_store, previous):
+    """Sketches of a Parquet-backed store merged from one sketch per partition file.
+
+    Each partition streams only the sketched columns in batches (at most one
+    batch in memory), and the sketch of a partition whose fingerprint (path,
+    size and modification time) is unchanged is taken from the previous version.
+    """
+    import pyarrow.parquet as pq
+    from parquet_store import partitions_fingerprint
+
+    reusable = {}
+    if previous is not None and previous.precision == config.HLL_PRECISION:
+        reusable = previous.parts
+    batch_rows = getattr(sales_store, 'chunk_rows', config.EXPORT_CHUNK_ROWS)
+    parts = {}
+    columns = None
+    for partition in sales_store.partitions:
+        path = partition[1]
+        key = partitions_fingerprint(sales_store.root, [partition])
+        parquet_file = pq.ParquetFile(path)
+        present = [column for column in config.DISTINCT_COUNT_COLUMNS if column in parquet_file.schema_arrow.names]
+        if columns is None:
+            columns = present
+        if not columns or present != columns:
+            # Partitions written with different columns cannot share one sketch set
+            return None
+        if key in reusable and reusable[key].columns == columns:
+            parts[key] = reusable[key]
+            continue
+        batches = parquet_file.iter_batches(batch_size=batch_rows, columns=['date', 'category', 'region'] + columns)
+        parts[key] = DistinctSketches(columns).extended(batch.to_pandas() for batch in batches)
+    if not columns:
+        return None
+    sketches = DistinctSketches.merged(parts.values(), columns)
+    sketches.parts = parts
+    return sketches
+
+
+def store_sketches(sales_store, previous=None):
+    """Distinct-count sketches of a store version, or None when no counted column is present.
+
+    An in-memory store whose rows are the previous version's plus appended
+    ones only sketches the appended rows. Parquet-backed stores sketch each
+    partition file once and reuse the sketches of unchanged partitions.
+    Other backends (SQLite) stream every row, which carry only the table columns.
+    """
+    frame = getattr(sales_store, 'frame', None)
+    if frame is not None:
+        columns = [column for column in config.DISTINCT_COUNT_COLUMNS if column in frame.columns]
+        if not columns:
+            return None
+        if previous is not None and previous.columns == columns and previous.precision == config.HLL_PRECISION:
+            appended = previous.appended_rows(frame)
+            if appended is not None:
+                return previous.extended([appended])
+        return DistinctSketches(columns).extended([frame])
+
+    if getattr(sales_store, 'partitions', None) is not None:
+        return _partition_sketches(sales_store, previous)
+
+    from data_store import TABLE_COLUMNS, FilterSpec
+    columns = [column for column in config.DISTINCT_COUNT_COLUMNS if column in TABLE_COLUMNS]
+    if not columns:
+        return None
+    everything = FilterSpec(datetime(1970, 1, 1), datetime(2200, 1, 1), [], None, [])
+    return DistinctSketches(columns).extended(sales_store.iter_rows(everything, config.EXPORT_CHUNK_ROWS))
+
+
+def distinct_counts(sales_store, spec):
+    """{column: (estimate, 95% relative error bound)} for the selection, or {} without sketches"""
+    sketches = getattr(sales_store, 'sketches', None)
+    if sketches is None:
+        return {}
+    bound = Z_95 * sketches.relative_error
+    return {column: (sketches.count(column, spec), bound) for column in sketches.columns}
@@ -0,0 +1,393 @@
+import math
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import config
+from data_store import TABLE_COLUMNS, FilterSpec, SalesStore
+from disk_cache import frame_fingerprint
+from drilldown import HIERARCHY, AggregationTree
+
+# Timestamps are stored as integer microseconds since the epoch so date
+# predicates compare integers and keep the sub-second precision of the source
+_EPOCH = np.datetime64(0, 'us')
+_MICROS_PER_DAY = 86400 * 1000000
+
+
+def _to_micros(value):
+    return int((np.datetime64(value, 'us') - _EPOCH).astype(np.int64))
+
+
+def _where(spec):
+    """Translate a filter spec into a parameterized WHERE clause"""
+    clauses = ['ts >= ?', 'ts <= ?']
+    params = [_to_micros(spec.start_date), _to_micros(spec.end_date)]
+    if spec.categories:
+        clauses.append(f"category IN ({','.join('?' * len(spec.categories))})")
+        params.extend(spec.categories)
+    if spec.price_range is not None:
+        clauses.append('price >= ? AND price <= ?')
+        params.extend(spec.price_range)
+    if spec.regions:
+        clauses.append(f"region IN ({','.join('?' * len(spec.regions))})")
+        params.extend(spec.regions)
+    return ' AND '.join(clauses), params
+
+
+class StoreClosedError(RuntimeError):
+    """A query reached a SQLite store version that has been closed"""
+
+
+class SQLiteSalesStore:
+    """Sales backend that keeps rows in an indexed SQLite file.
+
+    Exposes the same query interface as SalesStore, but every filter and
+    aggregation runs as SQL so only aggregated results (or a bounded page of
+    rows) are brought into Python.
+    """
+
+    def __init__(self, path, version=1, source='generated', pool_size=None):
+        self.path = path
+        self.version = version
+        self.source = source
+        self.built_at = datetime.now()
+        self.memory_report = None
+        self.sample = None
+        self.default_view = None
+        self.fingerprint = None
+        self.sketches = None
+        self._pool_size = pool_size or config.SQLITE_POOL_SIZE
+        self._close_lock = threading.Lock()
+        self._pool = queue.Queue()
+        for _ in range(self._pool_size):
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute('PRAGMA query_only = ON')
+            self._pool.put(conn)
+        with self._connection() as conn:
+            self._rows = conn.execute('SELECT COUNT(*) FROM sales').fetchone()[0]
+
+    def __len__(self):
+        return self._rows
+
+    @contextmanager
+    def _connection(self):
+        # Block until a pooled connection is free so concurrent reruns share a bounded set
+        conn = self._pool.get()
+        if conn is None:
+            # Closed: hand the marker on to the next waiting borrower, and fail instead of waiting
+            self._pool.put(None)
+            raise StoreClosedError(f"SQLite store version {self.version} is closed; rerun against the current version")
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def _query(self, sql, params=()):
+        with self._connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def close(self):
+        """Close every pooled connection, waiting for any still lent to a running query.
+
+        Later queries (and any waiting for a connection) raise StoreClosedError.
+        """
+        with self._close_lock:
+            for _ in range(self._pool_size):
+                self._pool.get().close()
+            if self._pool_size:
+                self._pool.put(None)
+            self._pool_size = 0
+
+    def category_options(self, start_date, end_date):
+        """Categories present in the date window"""
+        rows = self._query(
+            'SELECT DISTINCT category FROM sales WHERE ts >= ? AND ts <= ? ORDER BY category',
+            (_to_micros(start_date), _to_micros(end_date))
+        )
+        return [r[0] for r in rows]
+
+    def price_bounds(self, start_date, end_date, categories):
+        """Integer price bounds of the rows in the date window and categories"""
+        where, params = _where(FilterSpec(start_date, end_date, categories, None, []))
+        low, high = self._query(f'SELECT MIN(price), MAX(price) FROM sales WHERE {where}', params)[0]
+        if low is None:
+            return None
+        return int(low), int(high)
+
+    def region_options(self, start_date, end_date, categories, price_range):
+        """Regions present once date, category and price filters are applied"""
+        where, params = _where(FilterSpec(start_date, end_date, categories, price_range, []))
+        rows = self._query(f'SELECT DISTINCT region FROM sales WHERE {where} ORDER BY region', params)
+        return [r[0] for r in rows]
+
+    def rows(self, spec, limit=None):
+        """Return the selected rows, in date order"""
+        where, params = _where(spec)
+        sql = f'SELECT ts, model, category, region, quantity, price, total_price FROM sales WHERE {where} ORDER BY ts, rowid'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        frame = pd.DataFrame(self._query(sql, params), columns=TABLE_COLUMNS)
+        frame['date'] = pd.to_datetime(frame['date'], unit='us')
+        return frame
+
+    def iter_rows(self, spec, chunk_rows):
+        """Yield the selected table rows in date order, chunk_rows at a time"""
+        where, params = _where(spec)
+        sql = f'SELECT ts, model, category, region, quantity, price, total_price FROM sales WHERE {where} ORDER BY ts, rowid'
+        with self._connection() as conn:
+            cursor = conn.execute(sql, params)
+            while True:
+                batch = cursor.fetchmany(chunk_rows)
+                if not batch:
+                    break
+                frame = pd.DataFrame(batch, columns=TABLE_COLUMNS)
+                frame['date'] = pd.to_datetime(frame['date'], unit='us')
+                yield frame
+
+    def kpis(self, spec):
+        """KPI row values for the selection"""
+        where, params = _where(spec)
+        count, total_sales, avg_price, total_units = self._query(
+            f'SELECT COUNT(*), SUM(total_price), AVG(price), SUM(quantity) FROM sales WHERE {where}', params
+        )[0]
+        if count == 0:
+            return {'total_sales': 0.0, 'avg_price': 0.0, 'total_units': 0, 'top_model': 'N/A', 'rows': 0}
+        top_model = self._query(
+            f'SELECT model, SUM(total_price) AS sales FROM sales WHERE {where} '
+            'GROUP BY model ORDER BY sales DESC LIMIT 1', params
+        )[0][0]
+        return {
+            'total_sales': float(total_sales),
+            'avg_price': float(avg_price),
+            'total_units': int(total_units),
+            'top_model': top_model,
+            'rows': count
+        }
+
+    def group_totals(self, spec, dim):
+        """Sales, average price and units per value of dim for the selection"""
+        if dim not in ('category', 'region', 'model'):
+            raise ValueError(f"Unknown dimension: {dim}")
+        where, params = _where(spec)
+        rows = self._query(
+            f'SELECT {dim}, SUM(total_price) AS total_sales, AVG(price), SUM(quantity) '
+            f'FROM sales WHERE {where} GROUP BY {dim} ORDER BY total_sales DESC', params
+        )
+        return pd.DataFrame(rows, columns=[dim, 'total_sales', 'avg_price', 'units'])
+
+    def aggregation_tree(self, spec):
+        """Category x model x region aggregates of the selection from a single GROUP BY"""
+        where, params = _where(spec)
+        rows = self._query(
+            f'SELECT category, model, region, SUM(total_price), SUM(quantity), SUM(price), COUNT(*) '
+            f'FROM sales WHERE {where} GROUP BY category, model, region', params
+        )
+        return AggregationTree.from_groups(pd.DataFrame(
+            rows, columns=HIERARCHY + ['total_sales', 'units', 'price_sum', 'rows']
+        ))
+
+    def daily_totals(self, spec):
+        """Sales per calendar day of the selection (days without sales are omitted)"""
+        where, params = _where(spec)
+        rows = self._query(
+            f'SELECT ts / {_MICROS_PER_DAY} AS day, SUM(total_price) FROM sales WHERE {where} '
+            'GROUP BY day ORDER BY day', params
+        )
+        frame = pd.DataFrame(rows, columns=['date', 'total_price'])
+        frame['date'] = pd.to_datetime(frame['date'].astype('int64') * _MICROS_PER_DAY, unit='us')
+        return frame
+
+
+def write_sales_db(frame, path):
+    """Write a sales frame into a new indexed SQLite database at path"""
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute(
+            'CREATE TABLE sales (ts INTEGER NOT NULL, model TEXT NOT NULL, category TEXT NOT NULL, '
+            'region TEXT NOT NULL, quantity INTEGER NOT NULL, price REAL NOT NULL, total_price REAL NOT NULL)'
+        )
+        ts = (frame['date'].to_numpy().astype('datetime64[us]') - _EPOCH).astype(np.int64)
+        records = zip(
+            ts.tolist(),
+            frame['model'].tolist(),
+            frame['category'].tolist(),
+            frame['region'].tolist(),
+            frame['quantity'].astype(int).tolist(),
+            frame['price'].astype(float).tolist(),
+            frame['total_price'].astype(float).tolist()
+        )
+        conn.executemany('INSERT INTO sales VALUES (?, ?, ?, ?, ?, ?, ?)', records)
+        # Indexes for the filter predicates; the dimension indexes carry ts so a
+        # dimension plus date window is a single index range scan
+        conn.execute('CREATE INDEX idx_sales_ts ON sales (ts)')
+        conn.execute('CREATE INDEX idx_sales_category ON sales (category, ts)')
+        conn.execute('CREATE INDEX idx_sales_region ON sales (region, ts)')
+        conn.execute('CREATE INDEX idx_sales_model ON sales (model, ts)')
+        conn.execute('ANALYZE')
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+
+
+# Stores this process has built, by database path, so superseded ones can be closed
+_built_stores = {}
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove_orphans(directory):
+    """Delete the database files of processes that are no longer running"""
+    for name in os.listdir(directory):
+        match = re.fullmatch(r'sales_(\d+)_v\d+\.db(\.tmp)?', name)
+        if match and int(match.group(1)) != os.getpid() and not _pid_alive(int(match.group(1))):
+            os.remove(os.path.join(directory, name))
+
+
+def build_sqlite_store(frame, version=1, source='generated', directory=None):
+    """Build the SQLite backend for one store version (StoreRefresher builder).
+
+    Files are named per process as well as per version, since versions
+    restart at 1 with every process and another one may still have its own
+    files open.
+    """
+    directory = directory or config.SQLITE_DIR
+    os.makedirs(directory, exist_ok=True)
+    _remove_orphans(directory)
+    path = os.path.join(directory, f'sales_{os.getpid()}_v{version}.db')
+    write_sales_db(frame, path)
+
+    # Keep the previous version for reruns still reading it; close and drop anything older
+    stale = os.path.join(directory, f'sales_{os.getpid()}_v{version - 2}.db')
+    superseded = _built_stores.pop(stale, None)
+    if superseded is not None:
+        superseded.close()
+    if os.path.exists(stale):
+        os.remove(stale)
+    store = SQLiteSalesStore(path, version=version, source=source)
+    store.fingerprint = frame_fingerprint(frame)
+    _built_stores[path] = store
+    return store
+
+
+def _close(a, b, rel_tol):
+    if isinstance(a, str) or isinstance(b, str):
+        return a == b
+    return math.isclose(a, b, rel_tol=rel_tol, abs_tol=1e-6)
+
+
+def check_parity(frame, specs, rel_tol=1e-9, directory=None):
+    """Run every spec through the in-memory and SQLite backends and list any differences"""
+    sqlite_store = build_sqlite_store(frame, directory=directory)
+    try:
+        return compare_backends(SalesStore(frame), sqlite_store, specs, rel_tol)
+    finally:
+        sqlite_store.close()
+        _built_stores.pop(sqlite_store.path, None)
+
+
+def compare_backends(memory, other, specs, rel_tol=1e-9):
+    """List every difference between the in-memory store and another backend over specs"""
+    mismatches = []
+    for spec in specs:
+        expected, actual = memory.kpis(spec), other.kpis(spec)
+        for key in expected:
+            if not _close(expected[key], actual[key], rel_tol):
+                mismatches.append((spec, 'kpis', key, expected[key], actual[key]))
+
+        for dim in ('category', 'region', 'model'):
+            expected = memory.group_totals(spec, dim).set_index(dim).sort_index()
+            actual = other.group_totals(spec, dim).set_index(dim).sort_index()
+            if list(expected.index) != list(actual.index):
+                mismatches.append((spec, dim, 'groups', list(expected.index), list(actual.index)))
+                continue
+            for column in expected.columns:
+                for label, a, b in zip(expected.index, expected[column], actual[column]):
+                    if not _close(float(a), float(b), rel_tol):
+                        mismatches.append((spec, dim, f'{label}.{column}', a, b))
+
+        expected_tree, actual_tree = memory.aggregation_tree(spec), other.aggregation_tree(spec)
+        for path in [(), *[(c,) for c in expected_tree.level()['category']]]:
+            expected, actual = expected_tree.level(path), actual_tree.level(path)
+            if list(expected.iloc[:, 0]) != list(actual.iloc[:, 0]) or not np.allclose(
+                expected[['total_sales', 'avg_price', 'units']].to_numpy(dtype=float),
+                actual[['total_sales', 'avg_price', 'units']].to_numpy(dtype=float), rtol=rel_tol
+            ):
+                mismatches.append((spec, 'tree', path, len(expected), len(actual)))
+
+        expected, actual = memory.daily_totals(spec), other.daily_totals(spec)
+        if len(expected) != len(actual) or not (
+            (expected['date'].to_numpy().astype('datetime64[us]') == actual['date'].to_numpy()).all()
+            and np.allclose(expected['total_price'].to_numpy(dtype=float), actual['total_price'].to_numpy(dtype=float), rtol=rel_tol)
+        ):
+            mismatches.append((spec, 'daily', 'totals', len(expected), len(actual)))
+
+        expected_rows = memory.rows(spec)[TABLE_COLUMNS].reset_index(drop=True)
+        actual_rows = other.rows(spec)
+        if len(expected_rows) != len(actual_rows) or not (
+            (expected_rows['date'].to_numpy().astype('datetime64[us]') == actual_rows['date'].to_numpy()).all()
+            and (expected_rows['model'].to_numpy() == actual_rows['model'].to_numpy()).all()
+        ):
+            mismatches.append((spec, 'rows', 'selection', len(expected_rows), len(actual_rows)))
+
+        if spec.price_range is not None:
+            options = (
+                memory.category_options(spec.start_date, spec.end_date),
+                memory.price_bounds(spec.start_date, spec.end_date, spec.categories),
+                memory.region_options(spec.start_date, spec.end_date, spec.categories, spec.price_range)
+            )
+            other_options = (
+                other.category_options(spec.start_date, spec.end_date),
+                other.price_bounds(spec.start_date, spec.end_date, spec.categories),
+                other.region_options(spec.start_date, spec.end_date, spec.categories, spec.price_range)
+            )
+            if options != other_options:
+                mismatches.append((spec, 'options', 'filter widgets', options, other_options))
+    return mismatches
+
+
+def parity_specs(frame):
+    """A spread of filter specs covering every predicate and the empty selection"""
+    start, end = frame['date'].min(), frame['date'].max()
+    middle = start + (end - start) / 2
+    categories = sorted(frame['category'].unique())
+    regions = sorted(frame['region'].unique())
+    return [
+        FilterSpec(start, end, [], [0, 300], []),
+        FilterSpec(middle, end, [], [0, 300], []),
+        FilterSpec(start, middle, categories[:2], [0, 300], []),
+        FilterSpec(start, end, [], [100, 180], regions[:3]),
+        FilterSpec(middle, end, categories[2:5], [80, 200], regions[1:2]),
+        FilterSpec(end + pd.Timedelta(days=1), end + pd.Timedelta(days=30), [], [0, 300], [])
+    ]
+
+
+if __name__ == '__main__':
+    # python sqlite_store.py [sales.csv] -- verify SQLite results match the in-memory path
+    from data_store import load_sales_frame
+    sales = load_sales_frame(sys.argv[1] if len(sys.argv) > 1 else None)
+    problems = check_parity(sales, parity_specs(sales), directory=os.path.join(config.SQLITE_DIR, 'parity'))
+    for problem in problems:
+        print(problem)
+    print(f"{len(problems)} mismatches across {len(parity_specs(sales))} filter specs")
+    sys.exit(1 if problems else 0)
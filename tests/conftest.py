@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data_store import load_sales_frame  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def sales_frame():
+    """The bundled sample sales data, loaded the way the app loads it"""
+    return load_sales_frame(os.path.join(ROOT, 'sales_data.csv'))
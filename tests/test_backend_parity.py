@@ -0,0 +1,67 @@
+import os
+import threading
+
+import pytest
+
+from chunked_store import ChunkedSalesStore
+from data_store import SalesStore
+from parquet_store import ParquetSalesStore, write_partitioned
+from sqlite_store import StoreClosedError, build_sqlite_store, compare_backends, parity_specs
+
+
+@pytest.fixture(scope='module')
+def dataset(sales_frame, tmp_path_factory):
+    """The sample data as a month-partitioned Parquet dataset with small row groups"""
+    root = tmp_path_factory.mktemp('parquet')
+    write_partitioned(sales_frame, str(root), row_group_size=64)
+    return str(root)
+
+
+def test_sqlite_matches_memory(sales_frame, tmp_path):
+    store = build_sqlite_store(sales_frame, directory=str(tmp_path))
+    try:
+        assert compare_backends(SalesStore(sales_frame), store, parity_specs(sales_frame)) == []
+    finally:
+        store.close()
+
+
+def test_parquet_matches_memory(sales_frame, dataset):
+    store = ParquetSalesStore(dataset)
+    assert compare_backends(SalesStore(sales_frame), store, parity_specs(sales_frame)) == []
+
+
+def test_chunked_matches_memory(sales_frame, dataset):
+    # A zero memory ceiling forces many chunks, so the merge path is what gets checked
+    store = ChunkedSalesStore(dataset, memory_mb=0)
+    assert compare_backends(SalesStore(sales_frame), store, parity_specs(sales_frame)) == []
+
+
+def test_superseded_sqlite_store_is_closed(sales_frame, tmp_path):
+    first = build_sqlite_store(sales_frame, version=1, directory=str(tmp_path))
+    build_sqlite_store(sales_frame, version=2, directory=str(tmp_path))
+    third = build_sqlite_store(sales_frame, version=3, directory=str(tmp_path))
+    assert first._pool_size == 0
+    assert not os.path.exists(first.path)
+    assert third.kpis(parity_specs(sales_frame)[0])['total_sales'] > 0
+
+
+def test_closed_sqlite_store_raises_instead_of_blocking(sales_frame, tmp_path):
+    store = build_sqlite_store(sales_frame, directory=str(tmp_path))
+    spec = parity_specs(sales_frame)[0]
+    store.close()
+    errors = []
+
+    def read():
+        try:
+            store.kpis(spec)
+        except StoreClosedError as error:
+            errors.append(error)
+
+    # Several stale readers in a row each get the error rather than waiting on the pool
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join(timeout=10)
+    assert not any(reader.is_alive() for reader in readers)
+    assert len(errors) == 3
@@ -0,0 +1,52 @@
+import numpy as np
+
+from crossfilter import LINKED_DIMENSIONS, MEASURES, Crossfilter
+from data_store import SalesStore
+from sqlite_store import parity_specs
+
+
+def _recompute(cross):
+    """Fail counts, groups and totals of the current selection, from scratch"""
+    fails = {dim: ~cross.filters[dim][cross._codes(dim)] for dim in LINKED_DIMENSIONS}
+    fail = sum(f.astype(np.uint8) for f in fails.values())
+    values = cross._values(cross.positions)
+    groups = {}
+    for dim in LINKED_DIMENSIONS:
+        # A dimension's groups count rows failing no filter but (maybe) its own
+        weights = (fail - fails[dim] == 0).astype(np.float64)
+        groups[dim] = cross._reduce(cross._codes(dim), values, weights, len(cross.labels[dim]))
+    passing = fail == 0
+    totals = {
+        'total_sales': values['total_sales'][passing].sum(),
+        'units': values['units'][passing].sum(),
+        'price_sum': values['price_sum'][passing].sum(),
+        'rows': float(passing.sum())
+    }
+    return fail, groups, totals
+
+
+def test_incremental_updates_match_full_recompute(sales_frame):
+    cross = Crossfilter(SalesStore(sales_frame), parity_specs(sales_frame)[0])
+    days = cross.labels['day']
+    rng = np.random.default_rng(7)
+    for _ in range(60):
+        dim = LINKED_DIMENSIONS[rng.integers(len(LINKED_DIMENSIONS))]
+        if dim == 'day':
+            if rng.random() < 0.2:
+                cross.select_days()
+            else:
+                start, end = sorted(rng.integers(len(days), size=2))
+                cross.select_days(days[start], days[end])
+        else:
+            labels = cross.labels[dim]
+            # Sometimes clear the dimension, otherwise pick a random subset of its labels
+            count = 0 if rng.random() < 0.2 else rng.integers(1, len(labels) + 1)
+            cross.select_labels(dim, [labels[i] for i in rng.choice(len(labels), size=count, replace=False)])
+
+        fail, groups, totals = _recompute(cross)
+        np.testing.assert_array_equal(cross.fail, fail)
+        for dim in LINKED_DIMENSIONS:
+            for name in MEASURES:
+                np.testing.assert_allclose(cross.groups[dim][name], groups[dim][name], rtol=1e-9, atol=1e-6)
+        for name, expected in totals.items():
+            np.testing.assert_allclose(cross.totals[name], expected, rtol=1e-9, atol=1e-6)
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_store import SalesStore
+from dimensions import COHORTS, UNKNOWN_COHORT, ModelDimension, cohort_totals, load_model_dimension
+from sqlite_store import parity_specs
+
+
+@pytest.mark.parametrize('cohort', list(COHORTS))
+def test_cohort_totals_match_a_join(sales_frame, cohort):
+    dimension = load_model_dimension('')
+    # Drop one model from the table so the unknown band is exercised too
+    missing = sorted(sales_frame['model'].unique())[0]
+    dimension = ModelDimension(dimension.table.drop(index=missing, errors='ignore'))
+    tree = SalesStore(sales_frame).aggregation_tree(parity_specs(sales_frame)[0])
+
+    attribute, edges, labels = COHORTS[cohort]
+    values = sales_frame['model'].map(dimension.table[attribute]).astype(float)
+    bands = pd.cut(values, edges, right=False, labels=labels).astype(object).fillna(UNKNOWN_COHORT)
+    expected = sales_frame.groupby(bands)['total_price'].sum()
+
+    totals = cohort_totals(tree, dimension, cohort).set_index('cohort')
+    assert UNKNOWN_COHORT in totals.index
+    np.testing.assert_allclose(totals['total_sales'], expected.reindex(totals.index).to_numpy())
+    assert set(totals.index) == set(expected.index)
+
+
+def test_update_refreshes_the_lookups():
+    dimension = load_model_dimension('')
+    models = list(dimension.table.index[:3]) + ['NEW 1']
+    before = dimension.cohort_codes(models, 'Release Year')
+    assert before[-1] == len(COHORTS['Release Year'][2])
+    dimension.update('NEW 1', release_year=2022)
+    after = dimension.cohort_codes(models, 'Release Year')
+    assert after[-1] == COHORTS['Release Year'][2].index('2020s')
+    np.testing.assert_array_equal(after[:3], before[:3])
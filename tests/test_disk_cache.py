@@ -0,0 +1,28 @@
+import os
+import pickle
+import zlib
+
+from disk_cache import DiskCache
+
+
+def test_stale_pickle_is_a_miss(tmp_path):
+    cache = DiskCache(str(tmp_path), 1 << 20)
+    cache.put('data', 'key', 1)
+    # A pickle of a class that no longer exists raises AttributeError on load
+    stale = pickle.dumps(1).replace(b'K\x01', b'cbuiltins\nno_such_class\n)R')
+    with open(cache._path('data', 'key'), 'wb') as f:
+        f.write(zlib.compress(stale))
+    assert cache.get('data', 'key', 'missing') == 'missing'
+    assert cache.get_or_compute('data', 'key', lambda: 2) == 2
+
+
+def test_other_datasets_age_out_by_lru_only(tmp_path):
+    cache = DiskCache(str(tmp_path), 4096)
+    cache.put('old', 'a', os.urandom(1000))
+    cache.put('new', 'a', os.urandom(1000))
+    # Another dataset's entries survive while the cache has room
+    assert cache.get('old', 'a') is not None
+    for i in range(6):
+        cache.put('new', i, os.urandom(1000))
+    assert cache.get('old', 'a') is None
+    assert cache.stats()['bytes'] <= 4096
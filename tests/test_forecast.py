@@ -0,0 +1,61 @@
+import numpy as np
+
+from data_store import SalesStore
+from forecast import DAMPING, SEASON_DAYS, Z_95, daily_series, fit_holt_winters
+from sqlite_store import parity_specs
+
+
+def _holt_winters(series, horizon, alpha, beta, gamma):
+    """One series and one parameter combination, updated one day at a time"""
+    first, second = np.mean(series[:SEASON_DAYS]), np.mean(series[SEASON_DAYS:2 * SEASON_DAYS])
+    level, trend = first, (second - first) / SEASON_DAYS
+    seasonal = [value - first for value in series[:SEASON_DAYS]]
+    sse = 0.0
+    for t, observed in enumerate(series):
+        slot = t % SEASON_DAYS
+        if t >= SEASON_DAYS:
+            sse += (observed - (level + DAMPING * trend + seasonal[slot])) ** 2
+        previous_level = level
+        level = alpha * (observed - seasonal[slot]) + (1 - alpha) * (level + DAMPING * trend)
+        trend = beta * (level - previous_level) + (1 - beta) * DAMPING * trend
+        seasonal[slot] = gamma * (observed - level) + (1 - gamma) * seasonal[slot]
+    forecasts, damped = [], 0.0
+    for step in range(1, horizon + 1):
+        damped += DAMPING ** step
+        forecasts.append(level + damped * trend + seasonal[(len(series) + step - 1) % SEASON_DAYS])
+    sigma = np.sqrt(sse / (len(series) - SEASON_DAYS))
+    margins = [Z_95 * sigma * np.sqrt(1 + (step - 1) * alpha ** 2) for step in range(1, horizon + 1)]
+    return np.array(forecasts), np.array(margins)
+
+
+def _series(sales_frame):
+    store = SalesStore(sales_frame)
+    values, _, _ = daily_series(store, parity_specs(sales_frame)[0])
+    # A few real model x region series and a few synthetic ones with a trend and weekly pattern
+    days = values.shape[1]
+    rng = np.random.default_rng(11)
+    synthetic = (
+        100 + 0.5 * np.arange(days) + 20 * np.sin(2 * np.pi * np.arange(days) / SEASON_DAYS)
+        + rng.normal(0, 5, size=(3, days))
+    )
+    return np.vstack([values[:5], synthetic])
+
+
+def test_batched_fit_matches_fitting_each_series_alone(sales_frame):
+    series = _series(sales_frame)
+    forecasts, margins, best = fit_holt_winters(series, 14)
+    for row in range(len(series)):
+        alone = fit_holt_winters(series[row:row + 1], 14)
+        np.testing.assert_allclose(forecasts[row], alone[0][0], rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(margins[row], alone[1][0], rtol=1e-9, atol=1e-9)
+        assert best[row] == alone[2][0]
+
+
+def test_fit_matches_a_day_by_day_reference(sales_frame):
+    series = _series(sales_frame)
+    parameters = (0.3, 0.05, 0.3)
+    forecasts, margins, _ = fit_holt_winters(series, 10, grid=[parameters])
+    for row in range(len(series)):
+        expected_forecasts, expected_margins = _holt_winters(series[row], 10, *parameters)
+        np.testing.assert_allclose(forecasts[row], expected_forecasts, rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(margins[row], expected_margins, rtol=1e-9, atol=1e-6)
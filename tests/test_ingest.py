@@ -0,0 +1,43 @@
+import pytest
+
+from ingest import ingest_drops, store_from_filename
+
+HEADER = 'Date,Model,Category,Region,Units Sold,Unit Price,Total Sales\n'
+SALE = '2025-05-01,574,Running,Europe,2,80.0,160.0\n'
+OTHER = '2025-05-01,990,Running,Europe,1,120.0,120.0\n'
+
+
+def test_store_from_filename():
+    assert store_from_filename('/drops/store_042_2025-05-04.csv') == 'store_042'
+    with pytest.raises(ValueError):
+        store_from_filename('/drops/sales.csv')
+
+
+def test_duplicates_collapse_only_across_files(tmp_path):
+    # Two identical sales in one file are both kept ...
+    (tmp_path / 'north_2025-05-01.csv').write_text(HEADER + SALE + SALE + OTHER)
+    # ... and a later file redelivering one of them adds nothing
+    (tmp_path / 'north_2025-05-02.csv').write_text(HEADER + SALE)
+    # The same sale at another store is a different transaction
+    (tmp_path / 'south_2025-05-01.csv').write_text(HEADER + SALE)
+    merged, _ = ingest_drops(str(tmp_path), workers=1)
+    assert sorted(merged.groupby('store').size().items()) == [('north', 3), ('south', 1)]
+    assert merged['quantity'].sum() == 2 + 2 + 1 + 2
+
+
+def test_removing_one_delivery_keeps_the_other(tmp_path):
+    first = tmp_path / 'north_2025-05-01.csv'
+    second = tmp_path / 'north_2025-05-02.csv'
+    first.write_text(HEADER + SALE)
+    second.write_text(HEADER + SALE)
+    merged, _ = ingest_drops(str(tmp_path), workers=1)
+    assert len(merged) == 1
+
+    # Either copy going away leaves the sale in place
+    second.unlink()
+    merged, stats = ingest_drops(str(tmp_path), workers=1)
+    assert stats['files_removed'] == 1
+    assert len(merged) == 1
+    first.write_text(HEADER + OTHER)
+    merged, _ = ingest_drops(str(tmp_path), workers=1)
+    assert list(merged['model']) == ['990']
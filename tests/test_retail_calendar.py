@@ -0,0 +1,79 @@
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from retail_calendar import RetailCalendar, fiscal_year_end
+
+
+@pytest.fixture(scope='module')
+def cal():
+    return RetailCalendar(2015, 2030, end_month=1)
+
+
+def test_year_ends_on_the_saturday_nearest_month_end():
+    # NRF year ends: the Saturday nearest January 31, falling in early February some years
+    assert fiscal_year_end(2016, 1) == date(2017, 1, 28)
+    assert fiscal_year_end(2017, 1) == date(2018, 2, 3)
+    assert fiscal_year_end(2024, 1) == date(2025, 2, 1)
+    for year in range(2000, 2050):
+        end = fiscal_year_end(year, 1)
+        assert end.weekday() == 5
+        assert abs((end - date(year + 1, 1, 31)).days) <= 3
+    # A December year end names the fiscal year it closes
+    assert fiscal_year_end(2022, 12) == date(2022, 12, 31)
+
+
+def test_53_week_years(cal):
+    lengths = {year: int((cal.year == year).sum()) for year in range(2015, 2031)}
+    assert {length for length in lengths.values()} == {364, 371}
+    assert [year for year, length in lengths.items() if length == 371] == [2017, 2023, 2028]
+    # The 53rd week joins period 12 and quarter 4
+    last = cal.ordinals([fiscal_year_end(2023, 1)])[0]
+    assert (cal.week[last], cal.period[last], cal.quarter[last]) == (53, 12, 4)
+    assert cal.label('period', last) == 'FY2023 P12'
+
+
+def test_comparable_skips_the_53rd_week(cal):
+    # FY2024 day one compares with FY2023 day one, same weekday
+    first = cal.ordinals([date(2024, 2, 4)])[0]
+    assert cal.date(cal.comparable[first]) == pd.Timestamp('2023-01-29')
+    # The 53rd week of FY2023 has no comparable week in FY2022
+    week_53 = cal.ordinals(pd.date_range('2024-01-28', '2024-02-03'))
+    assert (cal.comparable[week_53] == -1).all()
+    # ... and FY2024, after it, compares week for week with FY2023's first 52
+    ordinals = cal.ordinals(pd.date_range('2024-02-04', '2025-02-01'))
+    assert (cal.week[cal.comparable[ordinals]] == cal.week[ordinals]).all()
+    assert (cal.comparable[ordinals] - ordinals == -371).all()
+
+    daily = pd.DataFrame({'date': pd.date_range('2022-12-01', '2024-02-03'), 'total_price': 1.0})
+    comparison = cal.like_for_like(daily, '2024-01-21', '2024-02-03')
+    assert comparison['days'] == 7
+    assert comparison['ratio'] == 1.0
+
+
+def test_fiscal_quarter_to_date(cal):
+    # FY2025 Q2 starts with week 14 on May 4, 2025
+    assert cal.preset_range('FQTD', datetime(2025, 5, 4)) == (datetime(2025, 5, 4), datetime(2025, 5, 4))
+    assert cal.preset_range('FQTD', datetime(2025, 5, 3)) == (datetime(2025, 2, 2), datetime(2025, 5, 3))
+    assert cal.preset_range('FQTD', datetime(2025, 7, 20))[0] == datetime(2025, 5, 4)
+    # Q4 of a 53-week year runs 14 weeks
+    start, end = cal.preset_range('FQTD', datetime(2024, 2, 3))
+    assert start == datetime(2023, 10, 29) and (end - start).days + 1 == 98
+
+
+def test_dates_outside_the_table(cal):
+    with pytest.raises(ValueError, match='outside the retail calendar'):
+        cal.ordinals(['2040-01-01'])
+    # Presets outside the table are worked out from the year-end rule instead
+    assert cal.preset_range('FQTD', datetime(2041, 5, 5)) == RetailCalendar(2040, 2042).preset_range(
+        'FQTD', datetime(2041, 5, 5)
+    )
+
+    daily = pd.DataFrame({'date': pd.date_range('2030-12-01', '2031-03-31'), 'total_price': 1.0})
+    buckets = cal.bucket_totals(daily, 'week')
+    assert buckets['days'].sum() + buckets.attrs['uncovered_days'] == len(daily)
+    assert buckets.attrs['uncovered_days'] == (pd.Timestamp('2031-03-31') - cal.date(len(cal) - 1)).days
+
+    comparison = cal.like_for_like(daily, '2031-01-01', '2031-03-31')
+    assert comparison['days'] + comparison['uncovered_days'] == 90
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_store import SalesStore
+from sampling import STRATUM_DAYS, StratifiedSample
+from sqlite_store import parity_specs
+
+
+@pytest.fixture(scope='module')
+def store(sales_frame):
+    """The sample data repeated 30 times with varied quantities and prices, so a 5% sample is small"""
+    rng = np.random.default_rng(5)
+    frame = pd.concat([sales_frame] * 30, ignore_index=True)
+    frame['quantity'] = rng.integers(1, 50, len(frame))
+    frame['price'] = (frame['price'] * rng.uniform(0.8, 1.2, len(frame))).round(2)
+    frame['total_price'] = frame['price'] * frame['quantity']
+    return SalesStore(frame.sort_values('date', kind='stable').reset_index(drop=True))
+
+
+def test_every_stratum_is_represented(store):
+    sample = StratifiedSample(store, fraction=0.05, seed=1)
+    assert len(sample) < len(store) / 10
+    # Each week x category x region cell of the store has sampled rows: all of
+    # them up to two, otherwise at least two and at least its share
+    weeks = store.days // STRATUM_DAYS
+    cells = pd.DataFrame({
+        'week': weeks, 'category': store.codes['category'], 'region': store.codes['region']
+    }).value_counts().sort_index()
+    assert len(sample.stratum_rows) == len(cells)
+    np.testing.assert_array_equal(sample.stratum_rows, cells.to_numpy())
+    sampled = np.bincount(sample.strata, minlength=len(cells))
+    np.testing.assert_array_equal(sampled, sample.stratum_sampled)
+    assert (sampled >= np.minimum(cells.to_numpy(), 2)).all()
+    assert (sampled >= np.ceil(0.05 * cells.to_numpy())).all()
+    # The expansion weights of each stratum add back up to its rows
+    np.testing.assert_allclose(np.bincount(sample.strata, weights=sample.weights), sample.stratum_rows)
+
+
+def test_weighted_totals_estimate_the_full_data(store):
+    specs = parity_specs(store.frame)[:5]
+    for seed in range(3):
+        sample = StratifiedSample(store, fraction=0.05, seed=seed)
+        for spec in specs:
+            estimate, exact = sample.estimate_kpis(spec), store.kpis(spec)
+            for name in ('total_sales', 'avg_price', 'total_units'):
+                # Within the reported 95% half-width, with room for an unlucky draw
+                assert abs(estimate[name] - exact[name]) <= 3 * estimate['margins'][name], (seed, spec, name)
+        # Without a filter every stratum is counted whole, so the row count is exact
+        assert sample.estimate_kpis(specs[0])['rows'] == len(store)
+        assert sample.estimate_kpis(specs[0])['margins']['rows'] == 0
+        assert sample.estimate_kpis(specs[0])['total_sales'] == pytest.approx(store.frame['total_price'].sum(), rel=0.05)
+        daily = sample.daily_totals(specs[0])
+        assert daily['total_price'].sum() == pytest.approx(store.frame['total_price'].sum(), rel=0.05)
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_store import SalesStore
+from scenarios import Adjustment, evaluate_scenarios, price_sweep, scenario_daily_totals
+from sqlite_store import parity_specs
+
+
+@pytest.fixture(scope='module')
+def small(sales_frame):
+    """A few hundred rows, so the row-by-row recompute stays cheap"""
+    frame = sales_frame.sample(400, random_state=3).sort_values('date', kind='stable').reset_index(drop=True)
+    store = SalesStore(frame)
+    spec = parity_specs(frame)[0]
+    return frame, store, store.aggregation_tree(spec), spec
+
+
+def _scenarios(frame):
+    models = sorted(frame['model'].unique())
+    categories = sorted(frame['category'].unique())
+    regions = sorted(frame['region'].unique())
+    return [
+        [Adjustment([], [], [], 0.10, None)],
+        [Adjustment([], categories[:2], [], -0.15, -2.0), Adjustment([], [], regions[:1], 0.05, -0.5)],
+        # Overlapping adjustments compound on the rows both match
+        [Adjustment(models[:3], [], [], 0.20, None), Adjustment(models[1:4], categories, regions[1:3], -0.10, -1.0)]
+    ]
+
+
+def _row_factors(frame, scenario):
+    """Price and unit multipliers of every row under one scenario, one row at a time"""
+    price_factor, unit_factor = [], []
+    for row in frame.itertuples():
+        price, units = 1.0, 1.0
+        for adjustment in scenario:
+            if (
+                (not adjustment.models or row.model in adjustment.models)
+                and (not adjustment.categories or row.category in adjustment.categories)
+                and (not adjustment.regions or row.region in adjustment.regions)
+            ):
+                elasticity = -1.5 if adjustment.elasticity is None else adjustment.elasticity
+                price *= 1 + adjustment.price_change
+                units *= (1 + adjustment.price_change) ** elasticity
+        price_factor.append(price)
+        unit_factor.append(units)
+    return np.array(price_factor), np.array(unit_factor)
+
+
+def test_scenario_totals_match_row_by_row(small):
+    frame, _, tree, _ = small
+    scenarios = _scenarios(frame)
+    results = evaluate_scenarios(tree, scenarios)
+    assert len(results) == len(scenarios) + 1
+    for index, scenario in enumerate([[]] + scenarios):
+        price_factor, unit_factor = _row_factors(frame, scenario)
+        sales = frame['total_price'] * price_factor * unit_factor
+        row = results.iloc[index]
+        assert row['total_sales'] == pytest.approx(sales.sum(), rel=1e-9)
+        assert row['total_units'] == pytest.approx((frame['quantity'] * unit_factor).sum(), rel=1e-9)
+        assert row['avg_price'] == pytest.approx((frame['price'] * price_factor).mean(), rel=1e-9)
+        assert row['top_model'] == sales.groupby(frame['model']).sum().idxmax()
+        assert row['sales_change'] == pytest.approx(sales.sum() / frame['total_price'].sum() - 1, abs=1e-9)
+
+
+def test_price_sweep_matches_single_scenarios(small):
+    frame, _, tree, _ = small
+    adjustment = _scenarios(frame)[1][0]
+    changes = [-0.2, 0.0, 0.1]
+    sweep = price_sweep(tree, adjustment, changes)
+    for change in changes:
+        expected = evaluate_scenarios(tree, [[adjustment._replace(price_change=change)]]).iloc[1]
+        assert sweep.loc[change, 'total_sales'] == pytest.approx(expected['total_sales'], rel=1e-12)
+        assert sweep.loc[change, 'total_units'] == pytest.approx(expected['total_units'], rel=1e-12)
+
+
+def test_scenario_daily_totals_match_row_by_row(small):
+    frame, store, _, spec = small
+    scenario = _scenarios(frame)[2]
+    price_factor, unit_factor = _row_factors(frame, scenario)
+    expected = (frame['total_price'] * price_factor * unit_factor).groupby(frame['date'].dt.floor('D')).sum()
+    daily = scenario_daily_totals(store, spec, scenario)
+    assert list(daily['date']) == list(pd.to_datetime(expected.index))
+    np.testing.assert_allclose(daily['total_price'], expected.to_numpy(), rtol=1e-9)
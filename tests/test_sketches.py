@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_store import SalesStore
+from parquet_store import ParquetSalesStore, write_partitioned
+from sketches import DistinctSketches, distinct_counts, store_sketches
+from sqlite_store import parity_specs
+
+
+def _everything(frame):
+    return parity_specs(frame)[0]
+
+
+def test_counts_close_to_exact(sales_frame):
+    store = SalesStore(sales_frame)
+    store.sketches = store_sketches(store)
+    estimate, _ = distinct_counts(store, _everything(sales_frame))['model']
+    assert abs(estimate - sales_frame['model'].nunique()) <= 0.05 * sales_frame['model'].nunique()
+
+
+def test_chunked_build_matches_one_pass(sales_frame):
+    whole = DistinctSketches(['model']).extended([sales_frame])
+    chunks = DistinctSketches(['model']).extended(
+        sales_frame.iloc[start:start + 97] for start in range(0, len(sales_frame), 97)
+    )
+    assert np.array_equal(whole.keys['model'], chunks.keys['model'])
+    assert np.array_equal(whole.ranks['model'], chunks.ranks['model'])
+    assert whole.digest.digest() == chunks.digest.digest()
+
+
+def test_appended_rows_extend_incrementally(sales_frame):
+    head, tail = sales_frame.iloc[:600], sales_frame.iloc[600:]
+    previous = DistinctSketches(['model']).extended([head])
+    appended = previous.appended_rows(sales_frame)
+    assert len(appended) == len(tail)
+    incremental = previous.extended([appended])
+    full = DistinctSketches(['model']).extended([sales_frame])
+    assert np.array_equal(incremental.keys['model'], full.keys['model'])
+
+
+def test_changed_dimensions_at_constant_quantity_rebuild(sales_frame):
+    previous_store = SalesStore(sales_frame)
+    previous = store_sketches(previous_store)
+
+    # Same row count and quantities, different dimension values
+    changed = sales_frame.assign(model='574', region='Europe')
+    assert previous.appended_rows(changed) is None
+
+    store = SalesStore(changed)
+    store.sketches = store_sketches(store, previous)
+    estimate, _ = distinct_counts(store, _everything(changed))['model']
+    assert round(estimate) == 1
+
+
+def test_partition_sketches_match_memory_and_reuse_unchanged(sales_frame, tmp_path):
+    write_partitioned(sales_frame, str(tmp_path), row_group_size=64)
+    memory = SalesStore(sales_frame)
+    memory.sketches = store_sketches(memory)
+    store = ParquetSalesStore(str(tmp_path))
+    store.sketches = store_sketches(store)
+    # Built from the partition files, without reading the archive into a window
+    assert len(store._windows) == 0
+    spec = _everything(sales_frame)
+    for column in store.sketches.columns:
+        assert np.array_equal(
+            store.sketches.registers(column, spec.start_date, spec.end_date),
+            memory.sketches.registers(column, spec.start_date, spec.end_date)
+        )
+    categories, regions = sorted(sales_frame['category'].unique())[:2], ['Europe']
+    assert np.array_equal(
+        store.sketches.registers('model', spec.start_date, spec.end_date, categories, regions),
+        memory.sketches.registers('model', spec.start_date, spec.end_date, categories, regions)
+    )
+
+    # A refresh with one rewritten partition re-sketches only that one
+    changed_month, changed_path = store.partitions[-1]
+    month = sales_frame[sales_frame['date'].dt.to_period('M') == pd.Timestamp(changed_month).to_period('M')]
+    os.remove(changed_path)
+    write_partitioned(month.assign(model='574'), str(tmp_path))
+    refreshed = ParquetSalesStore(str(tmp_path))
+    refreshed.sketches = store_sketches(refreshed, store.sketches)
+    reused = [key for key, part in refreshed.sketches.parts.items() if store.sketches.parts.get(key) is part]
+    assert len(reused) == len(store.partitions) - 1
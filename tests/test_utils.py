@@ -0,0 +1,23 @@
+import numpy as np
+
+from utils import format_currency, format_currency_array, format_number, format_number_array
+
+
+def test_currency_array_matches_scalar_at_extremes():
+    values = np.array([
+        0.0, -0.0, -0.001, 0.005, 1.005, 2.675, 1234567.891, -98765.4321,
+        4.5e7 + 0.125, 9.2e16, -9.2e16, 9.3e16, 1e17, -1e18, 1.7e308, -1.7e308,
+        np.inf, -np.inf, np.nan
+    ])
+    rng = np.random.default_rng(0)
+    values = np.concatenate([values, rng.uniform(-1e15, 1e15, 2000), rng.uniform(-1e4, 1e4, 2000).round(3)])
+    assert list(format_currency_array(values)) == [format_currency(v) for v in values]
+
+
+def test_number_array_matches_scalar_at_extremes():
+    info = np.iinfo(np.int64)
+    values = np.array([0, -1, 999, -1000, 1234567, info.max, info.min, info.min + 1], dtype=np.int64)
+    assert list(format_number_array(values)) == [format_number(int(v)) for v in values]
+
+    unsigned = np.array([0, info.max, info.max + 1, np.iinfo(np.uint64).max], dtype=np.uint64)
+    assert list(format_number_array(unsigned)) == [format_number(int(v)) for v in unsigned]
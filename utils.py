@@ -1,5 +1,9 @@
 from datetime import datetime, timedelta
 
+import numpy as np
+
+from retail_calendar import FISCAL_PRESETS, retail_calendar
+
 def format_currency(value):
     """Format a number as currency"""
     return f"${value:,.2f}"
@@ -8,6 +12,127 @@ def format_number(value):
     """Format a number with thousand separators"""
     return f"{value:,}"
 
+# Powers of ten used to count the digits of int64 values
+_POWERS_OF_TEN = 10 ** np.arange(1, 19, dtype=np.int64)
+
+# Largest scaled (cents) magnitude whose whole part float64 holds exactly; larger
+# values would also overflow int64 before long, so they are formatted one at a time
+_EXACT_CENTS_LIMIT = 2.0 ** 53
+
+
+def _thousands_matrix(whole):
+    """Lay out non-negative int64 values as right-aligned ASCII digits with commas.
+
+    Returns a (len(whole), width) uint8 matrix padded with spaces on the left,
+    plus the number of characters each value occupies.
+    """
+    digits = np.searchsorted(_POWERS_OF_TEN, whole, side='right') + 1
+    max_digits = int(digits.max()) if len(whole) else 1
+    width = max_digits + (max_digits - 1) // 3
+    matrix = np.full((len(whole), width), ord(' '), dtype=np.uint8)
+    remaining = whole.copy()
+    column = width - 1
+    for k in range(max_digits):
+        if k and k % 3 == 0:
+            matrix[:, column] = np.where(digits > k, ord(','), ord(' '))
+            column -= 1
+        matrix[:, column] = np.where(digits > k, remaining % 10 + ord('0'), ord(' '))
+        remaining //= 10
+        column -= 1
+    return matrix, digits + (digits - 1) // 3
+
+
+def _matrix_to_strings(matrix):
+    """Turn rows of left-padded ASCII codes into an array of str"""
+    raw = np.ascontiguousarray(matrix).view(f'S{matrix.shape[1]}').ravel()
+    # np.char rather than np.strings, which only exists from numpy 2
+    return np.char.lstrip(raw).astype(str)
+
+
+def format_currency_array(values):
+    """Format an array of numbers as currency in one vectorized pass (same output as format_currency)"""
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
+        return np.array([], dtype=str)
+    with np.errstate(invalid='ignore', over='ignore'):
+        scaled = np.abs(values) * 100
+        fraction = scaled - np.floor(scaled)
+    # Values sitting on a rounding boundary after scaling (allowing for the
+    # product's own rounding error), huge and non-finite ones are formatted one
+    # at a time so the output matches format_currency exactly
+    with np.errstate(invalid='ignore'):
+        exact = (
+            np.isfinite(scaled) & (scaled < _EXACT_CENTS_LIMIT)
+            & (np.abs(fraction - 0.5) > 1e-6 + scaled * 2.0 ** -52)
+        )
+    cents = np.where(exact, np.round(scaled), 0).astype(np.int64)
+
+    whole, used = _thousands_matrix(cents // 100)
+    n, width = whole.shape
+    # Two spare columns on the left for '$' and '-', then '.cc' on the right
+    matrix = np.full((n, width + 5), ord(' '), dtype=np.uint8)
+    matrix[:, 2:width + 2] = whole
+    matrix[:, width + 2] = ord('.')
+    matrix[:, width + 3] = (cents % 100) // 10 + ord('0')
+    matrix[:, width + 4] = cents % 10 + ord('0')
+    # signbit so negative values that round to zero still print '$-0.00' like the scalar version
+    negative = np.signbit(values)
+    first = width + 2 - used
+    rows = np.arange(n)
+    matrix[rows[negative], first[negative] - 1] = ord('-')
+    matrix[rows, first - 1 - negative] = ord('$')
+
+    text = _matrix_to_strings(matrix)
+    if not exact.all():
+        text = text.astype(object)
+        for i in np.flatnonzero(~exact):
+            text[i] = format_currency(values[i])
+        text = text.astype(str)
+    return text
+
+
+def format_number_array(values):
+    """Format an array of numbers with thousand separators in one vectorized pass (same output as format_number)"""
+    values = np.asarray(values)
+    if not np.issubdtype(values.dtype, np.integer):
+        # Floats keep their repr digits, which has no array equivalent
+        return np.array([format_number(v.item()) for v in values], dtype=str)
+    if values.size == 0:
+        return np.array([], dtype=str)
+    # uint64 values past the int64 range and int64's minimum (whose absolute
+    # value does not fit) are formatted one at a time
+    if values.dtype == np.uint64:
+        safe = values <= np.iinfo(np.int64).max
+    else:
+        safe = values > np.iinfo(np.int64).min
+    original = values
+    values = np.where(safe, values, 0).astype(np.int64)
+    whole, used = _thousands_matrix(np.abs(values))
+    matrix = np.concatenate([np.full((len(values), 1), ord(' '), dtype=np.uint8), whole], axis=1)
+    negative = values < 0
+    matrix[np.flatnonzero(negative), matrix.shape[1] - 1 - used[negative]] = ord('-')
+    text = _matrix_to_strings(matrix)
+    if not safe.all():
+        text = text.astype(object)
+        for i in np.flatnonzero(~safe):
+            text[i] = format_number(original[i].item())
+        text = text.astype(str)
+    return text
+
+
+# Dashboard time periods offered by the period selector, code -> label
+TIME_PERIODS = {
+    '7D': '7 Days',
+    '30D': '30 Days',
+    '90D': '90 Days',
+    '6M': '6 Months',
+    '1Y': '1 Year',
+    'ALL': 'All Time',
+    **{code: label for code, (_, label, _) in FISCAL_PRESETS.items()},
+    'CUSTOM': 'Custom Range'
+}
+
+
 def get_date_range(period):
     """Convert time period string to start and end dates"""
     # Force the end date to be May 4, 2025 for consistency with dashboard
@@ -24,6 +149,9 @@ def get_date_range(period):
         start_date = datetime(2024, 12, 1)
     elif period == '1Y':
         start_date = end_date - timedelta(days=365)
+    elif period in FISCAL_PRESETS:
+        # Fiscal to-date windows start where the retail calendar table says
+        return retail_calendar().preset_range(period, end_date)
     elif period == 'CUSTOM':
         # For custom date range, return None to indicate that custom dates should be used
         # The actual custom dates will be stored in session state